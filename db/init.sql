@@ -11,6 +11,7 @@ DROP TABLE IF EXISTS dim_staff;
 DROP TABLE IF EXISTS dim_transaction;
 DROP TABLE IF EXISTS fact_payment;
 DROP TABLE IF EXISTS fact_purchase_order;
+DROP TABLE IF EXISTS load_ledger;
 
 
 CREATE TABLE dim_counterparty (
@@ -117,4 +118,14 @@ CREATE TABLE fact_sales_order (
   FOREIGN KEY (agreed_delivery_date) REFERENCES dim_date(date_id),
   agreed_delivery_location_id INT NOT NULL,
   FOREIGN KEY (agreed_delivery_location_id) REFERENCES dim_location(location_id)
-);
\ No newline at end of file
+);
+
+
+CREATE TABLE load_ledger (
+  table_name VARCHAR NOT NULL,
+  source_key VARCHAR NOT NULL,
+  etag VARCHAR NOT NULL,
+  rows INT NOT NULL,
+  loaded_at TIMESTAMP NOT NULL DEFAULT now(),
+  PRIMARY KEY (table_name, source_key, etag)
+);
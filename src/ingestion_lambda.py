@@ -1,8 +1,16 @@
 import json
+import base64
 import datetime
+import hashlib
+import math
 import boto3
+import gzip
+import io
 import os
-from pg8000.native import Connection, identifier
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pg8000.native import Connection, identifier, literal
 import logging
 
 
@@ -75,32 +83,115 @@ def close_connection(conn):
     conn.close()
 
 
+def create_connection_pool(max_connections):
+    # Slots start empty and are only filled with a live connection on first
+    # use, so at most max_connections are ever open against the OLTP database
+    pool = queue.Queue()
+    for _ in range(max_connections):
+        pool.put(None)
+    return pool
+
+
+@contextmanager
+def pooled_connection(pool):
+    db = pool.get()
+    try:
+        if db is None:
+            db = connect_to_db()
+        yield db
+    except Exception:
+        # Don't hand a connection in an unknown state to the next worker
+        if db is not None:
+            close_connection(db)
+            db = None
+        raise
+    finally:
+        pool.put(db)
+
+
+def close_connection_pool(pool):
+    while not pool.empty():
+        db = pool.get_nowait()
+        if db is not None:
+            close_connection(db)
+
+
+OLTP_TABLES = [
+    "counterparty",
+    "currency",
+    "department",
+    "design",
+    "staff",
+    "sales_order",
+    "address",
+    "payment",
+    "purchase_order",
+    "payment_type",
+    "transaction",
+]
+
+
+def get_table_data(db, table, last_update):
+    logger.info(f"querying table {table}, with last update {last_update}")
+    query = db.run(
+        f"SELECT * FROM {identifier(table)} WHERE last_updated >= :last_update;",
+        last_update=last_update,
+    )
+    return (query, [col["name"] for col in db.columns])
+
+
 def get_data(db, last_update):
     data = {}
 
-    tables = [
-        "counterparty",
-        "currency",
-        "department",
-        "design",
-        "staff",
-        "sales_order",
-        "address",
-        "payment",
-        "purchase_order",
-        "payment_type",
-        "transaction",
-    ]
+    for table in OLTP_TABLES:
+        data[table] = get_table_data(db, table, last_update)
 
-    for table in tables:
-        logger.info(f"querying table {table}, with last update {last_update}")
-        query = db.run(
-            f"SELECT * FROM {identifier(table)} WHERE last_updated >= :last_update;",
+    return data
+
+
+def stream_table_data(db, table, last_update, batch_size):
+    # Rows are held server-side in a named cursor and fetched a batch at a
+    # time, so memory use is bounded by batch_size rather than the delta size
+    cursor_name = identifier(f"{table}_cursor")
+
+    logger.info(
+        f"streaming table {table} in batches of {batch_size}, "
+        + f"with last update {last_update}"
+    )
+    db.run("START TRANSACTION READ ONLY;")
+    try:
+        db.run(
+            f"DECLARE {cursor_name} NO SCROLL CURSOR FOR "
+            + f"SELECT * FROM {identifier(table)} WHERE last_updated >= :last_update;",
             last_update=last_update,
         )
-        data[table] = (query, [col["name"] for col in db.columns])
+        while True:
+            rows = db.run(f"FETCH FORWARD {int(batch_size)} FROM {cursor_name};")
+            if not rows:
+                break
+            yield rows, [col["name"] for col in db.columns]
+        db.run(f"CLOSE {cursor_name};")
+    finally:
+        db.run("COMMIT;")
+
+
+def copy_table_to_stream(db, table, last_update, stream):
+    # COPY can't take bind parameters, so the timestamp is inlined as a
+    # safely quoted literal
+    logger.info(f"copying table {table} as CSV, with last update {last_update}")
+    db.run(
+        f"COPY (SELECT * FROM {identifier(table)} "
+        + f"WHERE last_updated >= {literal(last_update)}) "
+        + "TO STDOUT WITH (FORMAT csv, HEADER true);",
+        stream=stream,
+    )
+    return db.row_count
 
-    return data
+
+def fetch_table_columns(db, table):
+    # COPY output carries no column types, so they're read off an empty query
+    db.run(f"SELECT * FROM {identifier(table)} LIMIT 0;")
+    return db.columns
 
 
 ####################################
@@ -122,14 +213,337 @@ def format_to_json(list_of_dicts):
     return formatted_data
 
 
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+
+class S3StreamWriter:
+    # File-like object that sends whatever is written to it to S3 as a
+    # multipart upload, so at most one part is held in memory and nothing
+    # touches local disk. Objects smaller than one part go up in a single
+    # put_object call when the writer is closed.
+
+    def __init__(
+        self, client, bucket_name, key, part_size=MULTIPART_PART_SIZE, metadata=None
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.part_size = part_size
+        self.metadata = metadata or {}
+        self.buffer = bytearray()
+        self.bytes_written = 0
+        self.upload_id = None
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        self.buffer.extend(data)
+        self.bytes_written += len(data)
+
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[: self.part_size]))
+            del self.buffer[: self.part_size]
+
+        return len(data)
+
+    def tell(self):
+        return self.bytes_written
+
+    def flush(self):
+        pass
+
+    def _upload_part(self, body):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, Metadata=self.metadata
+            )["UploadId"]
+
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def close(self):
+        if self.closed:
+            return
+
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                Body=bytes(self.buffer),
+                Metadata=self.metadata,
+            )
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+
+        self.buffer = bytearray()
+        self.closed = True
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id
+            )
+
+        self.buffer = bytearray()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
 def json_to_s3(client, json_string, bucket_name, folder, file_name):
+    with S3StreamWriter(client, bucket_name, f"{folder}/{file_name}") as writer:
+        writer.write(json_string)
+
 
-    with open(f"/tmp/{file_name}", "w", encoding="UTF-8") as file:
-        file.write(json_string)
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
 
-    client.upload_file(f"/tmp/{file_name}", bucket_name, f"{folder}/{file_name}")
 
-    os.remove(f"/tmp/{file_name}")
+@contextmanager
+def compressed(writer, compression=None):
+    if compression is None:
+        yield writer
+    elif compression == "gzip":
+        with gzip.GzipFile(fileobj=writer, mode="wb") as stream:
+            yield stream
+    elif compression == "zstd":
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor()
+        with compressor.stream_writer(writer, closefd=False) as stream:
+            yield stream
+    else:
+        raise ValueError(f"unsupported compression {compression}")
+
+
+def rows_to_json_in_s3(
+    client, rows, columns, bucket_name, folder, file_name, compression=None
+):
+    # Encodes one row at a time, so the full JSON document is never built in
+    # memory; the output is identical to format_to_json(zip_dictionary(...))
+    key = f"{folder}/{file_name}{COMPRESSION_SUFFIXES[compression]}"
+
+    with S3StreamWriter(client, bucket_name, key) as writer:
+        with compressed(writer, compression) as stream:
+            stream.write(b"[")
+            for i, row in enumerate(rows):
+                if i > 0:
+                    stream.write(b", ")
+                row_json = json.dumps(dict(zip(columns, row)), default=str)
+                stream.write(row_json.encode("utf-8"))
+            stream.write(b"]")
+
+    return key, writer.tell()
+
+
+def arrow_column_types(db_columns):
+    # pyarrow is only needed when writing parquet, so JSON-only runs don't pay
+    # for importing it
+    import pyarrow as pa
+
+    arrow_types = {
+        16: pa.bool_(),
+        20: pa.int64(),
+        21: pa.int16(),
+        23: pa.int32(),
+        25: pa.string(),
+        700: pa.float32(),
+        701: pa.float64(),
+        1043: pa.string(),
+        1082: pa.date32(),
+        1083: pa.time64("us"),
+        1114: pa.timestamp("us"),
+        1184: pa.timestamp("us", tz="UTC"),
+    }
+
+    # None is left for types without a mapping, to be inferred from values
+    column_types = []
+    for column in db_columns:
+        arrow_type = arrow_types.get(column["type_oid"])
+
+        # NUMERIC(p, s) is encoded in the type modifier as ((p << 16) | s) + 4
+        if column["type_oid"] == 1700 and column["type_modifier"] > 4:
+            precision = (column["type_modifier"] - 4) >> 16
+            scale = (column["type_modifier"] - 4) & 0xFFFF
+            arrow_type = pa.decimal128(precision, scale)
+
+        column_types.append(arrow_type)
+    return column_types
+
+
+def rows_to_parquet(rows, db_columns, sink):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    column_values = list(zip(*rows)) if rows else [[] for _ in db_columns]
+    arrays = [
+        pa.array(values, type=arrow_type)
+        for values, arrow_type in zip(column_values, arrow_column_types(db_columns))
+    ]
+
+    table = pa.Table.from_arrays(arrays, names=[col["name"] for col in db_columns])
+    pq.write_table(table, sink)
+
+
+def csv_to_parquet(csv_buffer, db_columns, sink):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    # Columns are typed as rows_to_parquet types them rather than inferred
+    # from the text, which would make numbers of postal codes and phone
+    # numbers; unmapped types stay text. COPY writes NULL as an empty field
+    # and an empty string as "", and booleans as t and f.
+    column_types = {
+        column["name"]: arrow_type or pa.string()
+        for column, arrow_type in zip(db_columns, arrow_column_types(db_columns))
+    }
+    table = pacsv.read_csv(
+        csv_buffer,
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types,
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+            true_values=["t"],
+            false_values=["f"],
+        ),
+    )
+    pq.write_table(table, sink)
+
+
+MANIFEST_PREFIX = "_manifests"
+ID_BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+
+def bloom_positions(value, bit_count, hash_count):
+    # Double hashing over a single blake2b digest. The processing lambda has
+    # an identical copy for testing membership, so the two must stay in step.
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % bit_count for i in range(hash_count)]
+
+
+def build_id_bloom(ids):
+    n = max(len(ids), 1)
+    bit_count = max(
+        64, math.ceil(-n * math.log(ID_BLOOM_FALSE_POSITIVE_RATE) / math.log(2) ** 2)
+    )
+    hash_count = max(1, round(bit_count / n * math.log(2)))
+
+    bits = bytearray((bit_count + 7) // 8)
+    for value in ids:
+        for position in bloom_positions(value, bit_count, hash_count):
+            bits[position // 8] |= 1 << (position % 8)
+
+    return {
+        "bits": base64.b64encode(bits).decode("ascii"),
+        "m": bit_count,
+        "k": hash_count,
+    }
+
+
+def manifest_entry(table, key, byte_size, rows=None, columns=None, row_count=None):
+    # One line of a table's manifest. Row-based writers know the ids and
+    # last_updated range of what they wrote, so their entries also carry a
+    # bloom filter of the ids; COPY output is never decoded, so its entries
+    # only carry counts and sizes
+    entry = {
+        "key": key,
+        "rows": len(rows) if rows is not None else row_count,
+        "bytes": byte_size,
+        "min_id": None,
+        "max_id": None,
+        "min_last_updated": None,
+        "max_last_updated": None,
+        "id_bloom": None,
+    }
+
+    if rows and f"{table}_id" in columns:
+        ids = [row[columns.index(f"{table}_id")] for row in rows]
+        entry["min_id"], entry["max_id"] = min(ids), max(ids)
+        entry["id_bloom"] = build_id_bloom(ids)
+    if rows and "last_updated" in columns:
+        last_updated = [row[columns.index("last_updated")] for row in rows]
+        entry["min_last_updated"] = str(min(last_updated))
+        entry["max_last_updated"] = str(max(last_updated))
+
+    return entry
+
+
+def list_table_objects(s3_client, s3_bucket_name, table):
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=s3_bucket_name, Prefix=f"{table}/"):
+        yield from page.get("Contents", [])
+
+
+MANIFEST_CONFLICT_CODES = {"PreconditionFailed", "ConditionalRequestConflict"}
+
+
+def append_to_manifest(s3_client, s3_bucket_name, table, entries, attempts=5):
+    # The manifest is a JSON Lines file per table that only ever grows, so the
+    # processing stage can list a table's history in a single GET. Objects
+    # written before the manifest existed are added from a listing first.
+    # The compaction job rewrites manifests too, so the PUT only succeeds if
+    # the manifest is unchanged since it was read; on a conflict the append is
+    # retried against the manifest as it now is.
+    manifest_key = f"{MANIFEST_PREFIX}/{table}.jsonl"
+
+    for _ in range(attempts):
+        try:
+            manifest = s3_client.get_object(Bucket=s3_bucket_name, Key=manifest_key)
+            body = manifest["Body"].read()
+            new_entries = entries
+            condition = {"IfMatch": manifest["ETag"]}
+        except s3_client.exceptions.NoSuchKey:
+            new_keys = {entry["key"] for entry in entries}
+            new_entries = [
+                manifest_entry(table, obj["Key"], obj["Size"])
+                for obj in list_table_objects(s3_client, s3_bucket_name, table)
+                if obj["Key"] not in new_keys
+            ] + entries
+            body = b""
+            condition = {"IfNoneMatch": "*"}
+
+        lines = "".join(json.dumps(entry, default=str) + "\n" for entry in new_entries)
+        try:
+            s3_client.put_object(
+                Bucket=s3_bucket_name,
+                Key=manifest_key,
+                Body=body + lines.encode("utf-8"),
+                **condition,
+            )
+            return
+        except s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] not in MANIFEST_CONFLICT_CODES:
+                raise
+            logger.info(f"Manifest for {table} changed while appending, retrying")
+
+    raise RuntimeError(f"could not append to the manifest for {table}")
 
 
 #######################
@@ -161,31 +575,254 @@ def fetch_and_update_last_update_time(sm_client, s3_bucket_name):
     return {"last_update": last_update, "current_update": current_update}
 
 
-def ingest_latest_rows(s3_client, s3_bucket_name, last_update, current_update):
-    db = connect_to_db()
-    data = get_data(db, last_update)
-    close_connection(db)
-
-    output = {"HasNewRows": {}, "LastCheckedTime": current_update}
-
-    for table in data:
-        rows = data[table][0]
-        columns = data[table][1]
+def save_table_rows(
+    s3_client,
+    s3_bucket_name,
+    table,
+    rows,
+    columns,
+    file_stem,
+    db_columns=None,
+    compression=None,
+):
+    if db_columns is not None:
+        logger.info(f"saving table {table} to parquet file")
+        key = f"{table}/{file_stem}.parquet"
+        with S3StreamWriter(s3_client, s3_bucket_name, key) as writer:
+            rows_to_parquet(rows, db_columns, writer)
+        return manifest_entry(table, key, writer.tell(), rows, columns)
+
+    logger.info(f"saving table {table} to file")
+    key, byte_size = rows_to_json_in_s3(
+        s3_client,
+        rows,
+        columns,
+        s3_bucket_name,
+        table,
+        f"{file_stem}.json",
+        compression,
+    )
+    return manifest_entry(table, key, byte_size, rows, columns)
+
+
+def ingest_table_in_parts(
+    db,
+    s3_client,
+    s3_bucket_name,
+    table,
+    last_update,
+    current_update,
+    batch_size,
+    output_format="json",
+    compression=None,
+):
+    entries = []
+
+    for rows, columns in stream_table_data(db, table, last_update, batch_size):
+        logger.info(f"saving table {table} part {len(entries)}")
+        entries.append(
+            save_table_rows(
+                s3_client,
+                s3_bucket_name,
+                table,
+                rows,
+                columns,
+                f"{current_update}.part-{len(entries):05d}",
+                db.columns if output_format == "parquet" else None,
+                compression,
+            )
+        )
 
+    return entries
+
+
+def ingest_table_with_copy(
+    db,
+    s3_client,
+    s3_bucket_name,
+    table,
+    last_update,
+    current_update,
+    output_format="json",
+    compression=None,
+):
+    # CSV bytes go from the wire straight into the S3 upload without being
+    # decoded into Python rows. The parquet path buffers the whole CSV in
+    # memory first, and types its columns as the table's own.
+    if output_format == "parquet":
+        db_columns = fetch_table_columns(db, table)
+        csv_buffer = io.BytesIO()
+        row_count = copy_table_to_stream(db, table, last_update, csv_buffer)
+
+        if row_count == 0:
+            return []
+
+        csv_buffer.seek(0)
+        logger.info(f"saving table {table} to parquet file")
+        key = f"{table}/{current_update}.parquet"
+        with S3StreamWriter(s3_client, s3_bucket_name, key) as writer:
+            csv_to_parquet(csv_buffer, db_columns, writer)
+
+        return [manifest_entry(table, key, writer.tell(), row_count=row_count)]
+
+    key = f"{table}/{current_update}.csv{COMPRESSION_SUFFIXES[compression]}"
+    writer = S3StreamWriter(s3_client, s3_bucket_name, key)
+    try:
+        with compressed(writer, compression) as stream:
+            row_count = copy_table_to_stream(db, table, last_update, stream)
+    except Exception:
+        writer.abort()
+        raise
+
+    if row_count == 0:
+        writer.abort()
+        return []
+
+    logger.info(f"saving table {table} to file")
+    writer.close()
+
+    return [manifest_entry(table, key, writer.tell(), row_count=row_count)]
+
+
+def ingest_table(
+    db,
+    s3_client,
+    s3_bucket_name,
+    table,
+    last_update,
+    current_update,
+    batch_size=None,
+    use_copy=False,
+    output_format="json",
+    compression=None,
+    write_manifest=False,
+):
+    if use_copy:
+        entries = ingest_table_with_copy(
+            db,
+            s3_client,
+            s3_bucket_name,
+            table,
+            last_update,
+            current_update,
+            output_format,
+            compression,
+        )
+    elif batch_size:
+        entries = ingest_table_in_parts(
+            db,
+            s3_client,
+            s3_bucket_name,
+            table,
+            last_update,
+            current_update,
+            batch_size,
+            output_format,
+            compression,
+        )
+    else:
+        entries = []
+        rows, columns = get_table_data(db, table, last_update)
         if rows:
-            output["HasNewRows"][table] = True
-
-            logger.info("zipping table {table} to dictionary")
-            zipped_dict = zip_dictionary(rows, columns)
-
-            json_data = format_to_json(zipped_dict)
-            dir_name = table
-            file_name = f"{current_update}.json"
+            entries.append(
+                save_table_rows(
+                    s3_client,
+                    s3_bucket_name,
+                    table,
+                    rows,
+                    columns,
+                    current_update,
+                    db.columns if output_format == "parquet" else None,
+                    compression,
+                )
+            )
+
+    if write_manifest and entries:
+        append_to_manifest(s3_client, s3_bucket_name, table, entries)
+
+    return bool(entries)
+
+
+def ingest_table_from_pool(pool, *args):
+    with pooled_connection(pool) as db:
+        return ingest_table(db, *args)
+
+
+def ingest_tables_concurrently(
+    s3_client,
+    s3_bucket_name,
+    last_update,
+    current_update,
+    workers,
+    max_connections,
+    batch_size=None,
+    copy_tables=(),
+    output_format="json",
+    compression=None,
+    write_manifest=False,
+):
+    logger.info(
+        f"ingesting tables with {workers} workers "
+        + f"and at most {max_connections} connections"
+    )
+    pool = create_connection_pool(max_connections)
 
-            logger.info(f"saving table {table} to file")
-            json_to_s3(s3_client, json_data, s3_bucket_name, dir_name, file_name)
-        else:
-            output["HasNewRows"][table] = False
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                table: executor.submit(
+                    ingest_table_from_pool,
+                    pool,
+                    s3_client,
+                    s3_bucket_name,
+                    table,
+                    last_update,
+                    current_update,
+                    batch_size,
+                    table in copy_tables,
+                    output_format,
+                    compression,
+                    write_manifest,
+                )
+                for table in OLTP_TABLES
+            }
+            # Collect in table order so the output matches sequential ingestion
+            has_new_rows = {table: futures[table].result() for table in OLTP_TABLES}
+    finally:
+        close_connection_pool(pool)
+
+    return has_new_rows
+
+
+def ingest_latest_rows(
+    s3_client,
+    s3_bucket_name,
+    last_update,
+    current_update,
+    batch_size=None,
+    workers=1,
+    max_connections=None,
+    copy_tables=(),
+    output_format="json",
+    compression=None,
+    write_manifest=False,
+):
+    # A sequential run is a run with one worker, so every table is ingested
+    # by ingest_table whatever the options
+    has_new_rows = ingest_tables_concurrently(
+        s3_client,
+        s3_bucket_name,
+        last_update,
+        current_update,
+        workers,
+        max_connections or workers,
+        batch_size,
+        copy_tables,
+        output_format,
+        compression,
+        write_manifest,
+    )
+    output = {"HasNewRows": has_new_rows, "LastCheckedTime": current_update}
 
     logger.info(output)
     return output
@@ -201,13 +838,36 @@ def ingest_latest_rows(s3_client, s3_bucket_name, last_update, current_update):
 def ingestion_lambda_handler(event, context):
     try:
         BUCKET_NAME = os.environ["INGESTION_BUCKET_NAME"]
+        BATCH_SIZE = int(os.environ.get("INGESTION_BATCH_SIZE", 0))
+        WORKERS = int(os.environ.get("INGESTION_WORKERS", 1))
+        MAX_CONNECTIONS = int(os.environ.get("INGESTION_MAX_CONNECTIONS", 0))
+        COPY_TABLES = [
+            table.strip()
+            for table in os.environ.get("INGESTION_COPY_TABLES", "").split(",")
+            if table.strip()
+        ]
+        OUTPUT_FORMAT = os.environ.get("INGESTION_OUTPUT_FORMAT", "json")
+        COMPRESSION = os.environ.get("INGESTION_COMPRESSION") or None
+        WRITE_MANIFEST = (
+            os.environ.get("INGESTION_WRITE_MANIFEST", "true").lower() == "true"
+        )
 
         sm_client = boto3.client("secretsmanager")
         updates = fetch_and_update_last_update_time(sm_client, BUCKET_NAME)
 
         s3_client = boto3.client("s3")
         output = ingest_latest_rows(
-            s3_client, BUCKET_NAME, updates["last_update"], updates["current_update"]
+            s3_client,
+            BUCKET_NAME,
+            updates["last_update"],
+            updates["current_update"],
+            BATCH_SIZE,
+            WORKERS,
+            MAX_CONNECTIONS,
+            COPY_TABLES,
+            OUTPUT_FORMAT,
+            COMPRESSION,
+            WRITE_MANIFEST,
         )
 
         logger.info(output)
@@ -1,12 +1,31 @@
-import logging, os, json
+import logging, os, json, io, csv, gzip, base64, hashlib, math, threading, time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
+from botocore.config import Config
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
 from iso4217 import Currency
 
 
 logger = logging.getLogger("logger")
 logger.setLevel(logging.INFO)
 
+# History reads fetch up to READ_PREFETCH_DEPTH objects ahead of the one being
+# parsed, over READ_WORKERS threads sharing the S3 client's connection pool
+READ_WORKERS = int(os.environ.get("PROCESSING_READ_WORKERS", 8))
+READ_PREFETCH_DEPTH = int(os.environ.get("PROCESSING_READ_PREFETCH_DEPTH", 16))
+
+# Independent groups of processed tables are built, and saved, concurrently
+# over BUILD_WORKERS threads
+BUILD_WORKERS = int(os.environ.get("PROCESSING_BUILD_WORKERS", 5))
+
 
 ###################################
 ####                           ####
@@ -16,45 +35,916 @@ logger.setLevel(logging.INFO)
 
 
 def fetch_latest_row_versions(s3_client, bucket_name, table_name, list_of_ids):
+    return fetch_snapshot_rows(
+        s3_client, bucket_name, table_name, f"{table_name}_id", list_of_ids
+    )
+
+
+def json_typed_df(table):
+    # Converts decoded rows to the DataFrame pd.DataFrame.from_dict gives for
+    # the same rows as JSON: temporal and decimal columns hold the strings the
+    # ingestion lambda writes for them, str() of the value from the database,
+    # and a column without a single value holds None objects
+    for i, field in enumerate(table.schema):
+        if pa.types.is_temporal(field.type) or pa.types.is_decimal(field.type):
+            values = table.column(i)
+            if pa.types.is_timestamp(field.type):
+                values = values.cast(pa.timestamp("us", field.type.tz))
+            elif pa.types.is_time(field.type):
+                values = values.cast(pa.time64("us"))
+
+            strings = values.cast(pa.string())
+            if pa.types.is_timestamp(field.type) or pa.types.is_time(field.type):
+                # str() leaves off a fraction of a second that is zero
+                strings = pc.replace_substring_regex(strings, r"\.0+$", "")
+            table = table.set_column(i, field.name, strings)
+
+    row_count = table.num_rows
+    empty_col_names = [
+        col_name
+        for col_name in table.column_names
+        if table.column(col_name).null_count == row_count
+    ]
+
+    # Each column's Arrow buffers are freed once it is converted
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+
+    for col_name in empty_col_names:
+        df[col_name] = pd.Series([None] * row_count, dtype=object)
+    return df
+
+
+def parquet_to_json_typed_df(parquet_bytes):
+    return json_typed_df(pq.read_table(io.BytesIO(parquet_bytes)))
+
+
+def decompressed(body, key):
+    # Compressed objects carry a .gz or .zst suffix after their format
+    # extension; the body is decompressed as it is read off the wire
+    if key.endswith(".gz"):
+        return gzip.GzipFile(fileobj=body, mode="rb"), key[: -len(".gz")]
+    if key.endswith(".zst"):
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(body), key[: -len(".zst")]
+    return body, key
+
+
+def string_columns(*col_names):
+    return [(col_name, pa.string()) for col_name in col_names]
+
+
+# The columns of each source table as the ingestion lambda writes them to
+# JSON, in table order; timestamps, dates and numerics arrive as strings
+INGESTED_JSON_SCHEMAS = {
+    "address": pa.schema(
+        [("address_id", pa.int64())]
+        + string_columns(
+            "address_line_1",
+            "address_line_2",
+            "district",
+            "city",
+            "postal_code",
+            "country",
+            "phone",
+            "created_at",
+            "last_updated",
+        )
+    ),
+    "counterparty": pa.schema(
+        [("counterparty_id", pa.int64())]
+        + string_columns("counterparty_legal_name")
+        + [("legal_address_id", pa.int64())]
+        + string_columns(
+            "commercial_contact", "delivery_contact", "created_at", "last_updated"
+        )
+    ),
+    "currency": pa.schema(
+        [("currency_id", pa.int64())]
+        + string_columns("currency_code", "created_at", "last_updated")
+    ),
+    "department": pa.schema(
+        [("department_id", pa.int64())]
+        + string_columns(
+            "department_name", "location", "manager", "created_at", "last_updated"
+        )
+    ),
+    "design": pa.schema(
+        [("design_id", pa.int64())]
+        + string_columns(
+            "created_at", "design_name", "file_location", "file_name", "last_updated"
+        )
+    ),
+    "sales_order": pa.schema(
+        [("sales_order_id", pa.int64())]
+        + string_columns("created_at", "last_updated")
+        + [
+            ("design_id", pa.int64()),
+            ("staff_id", pa.int64()),
+            ("counterparty_id", pa.int64()),
+            ("units_sold", pa.int64()),
+            ("unit_price", pa.string()),
+            ("currency_id", pa.int64()),
+            ("agreed_delivery_date", pa.string()),
+            ("agreed_payment_date", pa.string()),
+            ("agreed_delivery_location_id", pa.int64()),
+        ]
+    ),
+    "staff": pa.schema(
+        [("staff_id", pa.int64())]
+        + string_columns("first_name", "last_name")
+        + [("department_id", pa.int64())]
+        + string_columns("email_address", "created_at", "last_updated")
+    ),
+}
+
+
+def read_ingested_json(payload, table_name):
+    # The ingestion lambda writes a run's rows as a one-line JSON array with
+    # ", " between rows. For tables with a schema, each row is moved onto a
+    # line of its own and decoded straight into Arrow columns, rather than
+    # into a Python object per value. JSON strings can't hold a raw newline,
+    # so a "}, {" inside a value makes the decode fail instead of splitting a
+    # row there; payloads the schema doesn't fit are decoded as before.
+    schema = INGESTED_JSON_SCHEMAS.get(table_name)
+    payload = payload.strip()
+
+    if schema is not None and payload.startswith(b"[{") and payload.endswith(b"}]"):
+        # The brackets are sliced off the Arrow buffer, which doesn't copy it
+        lines = pa.py_buffer(payload.replace(b"}, {", b"}\n{"))
+        try:
+            table = pa_json.read_json(
+                pa.BufferReader(lines.slice(1, lines.size - 2)),
+                parse_options=pa_json.ParseOptions(
+                    explicit_schema=schema, unexpected_field_behavior="error"
+                ),
+            )
+        except pa.ArrowInvalid:
+            table = None
+        del lines
+
+        if table is not None:
+            # pd.DataFrame.from_dict leaves out a column no row has at all
+            absent_col_names = [
+                col_name
+                for col_name in table.column_names
+                if table.column(col_name).null_count == table.num_rows
+                and f'"{col_name}": '.encode("utf-8") not in payload
+            ]
+            return json_typed_df(table).drop(columns=absent_col_names)
+
+    return pd.DataFrame.from_dict(json.loads(payload))
+
+
+TIMESTAMP_COLUMNS = {"created_at", "last_updated"}
+
+
+def read_ingested_csv(payload, table_name):
+    # Tables extracted with COPY arrive as CSV with a header row. Inferring
+    # the column types would turn text such as a postal code of "01803" into
+    # a number, so every column gets its type from the table's schema; those
+    # it doesn't cover are read as text, bar ids. Timestamps are parsed, to
+    # be written out as the JSON path writes them. COPY writes NULL as an
+    # empty field and an empty string as "", so only the first is null.
+    schema = INGESTED_JSON_SCHEMAS.get(table_name, pa.schema([]))
+    header = payload.split(b"\n", 1)[0].decode("utf-8")
+
+    column_types = {}
+    for col_name in next(csv.reader([header])):
+        if col_name in TIMESTAMP_COLUMNS:
+            column_types[col_name] = pa.timestamp("us")
+        elif col_name in schema.names:
+            column_types[col_name] = schema.field(col_name).type
+        elif col_name.endswith("_id"):
+            column_types[col_name] = pa.int64()
+        else:
+            column_types[col_name] = pa.string()
+
+    table = pa_csv.read_csv(
+        pa.BufferReader(payload),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    return json_typed_df(table)
+
+
+def read_ingested_object(s3_client, bucket_name, key):
+    body = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"]
+    body, key = decompressed(body, key)
+
+    if key.endswith(".parquet"):
+        return parquet_to_json_typed_df(body.read())
+
+    if key.endswith(".csv"):
+        return read_ingested_csv(body.read(), key.split("/", 1)[0])
+
+    return read_ingested_json(body.read(), key.split("/", 1)[0])
+
+
+def fetch_ingested_rows(s3_client, bucket_name, table_name, check_time):
+    # A run writes a single {check_time}.json file or, depending on how the
+    # table was extracted and encoded, a {check_time}.csv or .parquet file or
+    # numbered {check_time}.part-NNNNN.json/.parquet files
+    try:
+        return read_ingested_object(
+            s3_client, bucket_name, f"{table_name}/{check_time}.json"
+        )
+    except s3_client.exceptions.NoSuchKey:
+        keys = list_ingested_keys(
+            s3_client, bucket_name, table_name, key_prefix=f"{check_time}."
+        )
+        if not keys:
+            segment_key = find_compacted_segment(
+                s3_client, bucket_name, table_name, check_time
+            )
+            if segment_key is not None:
+                raise RuntimeError(
+                    f"'{table_name}' objects ingested at {check_time} were "
+                    + f"compacted into {segment_key}, so the run can't be replayed"
+                )
+            raise
+
+    return pd.concat(
+        [df for _, df in prefetch_ingested_objects(s3_client, bucket_name, keys)],
+        ignore_index=True,
+    )
+
+
+def create_s3_client():
+    # Sized so every prefetch thread of every builder gets its own pooled
+    # connection
+    return boto3.client(
+        "s3",
+        config=Config(
+            max_pool_connections=max(READ_WORKERS * BUILD_WORKERS, 10),
+            retries={"max_attempts": 5, "mode": "standard"},
+            tcp_keepalive=True,
+        ),
+    )
+
+
+def prefetch_ingested_objects(
+    s3_client,
+    bucket_name,
+    keys,
+    workers=None,
+    prefetch_depth=None,
+):
+    # Yields (key, df) for each key in the order given, while the objects
+    # after it are downloaded and parsed concurrently. Stopping iteration
+    # early cancels every fetch that hasn't started yet.
+    workers = workers or READ_WORKERS
+    prefetch_depth = prefetch_depth or READ_PREFETCH_DEPTH
+
+    keys = iter(keys)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit_next():
+        key = next(keys, None)
+        if key is not None:
+            pending.append(
+                (
+                    key,
+                    executor.submit(read_ingested_object, s3_client, bucket_name, key),
+                )
+            )
+
+    try:
+        for _ in range(prefetch_depth):
+            submit_next()
+
+        while pending:
+            key, future = pending.popleft()
+            submit_next()
+            yield key, future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ThreadLogBuffer(logging.Filter):
+    # Holds back the records logged on threads that have a buffer set, so
+    # concurrent tasks' logs can be emitted task by task in a fixed order
+    def __init__(self):
+        super().__init__()
+        self.local = threading.local()
+
+    def filter(self, record):
+        records = getattr(self.local, "records", None)
+        if records is None:
+            return True
+        records.append(record)
+        return False
+
+
+def run_concurrently(tasks, workers=None):
+    # Runs each task on a pool of threads and returns their results in task
+    # order. Each task's log records are emitted once it and every task
+    # before it has finished, so the log reads as if they had run in turn.
+    workers = workers or BUILD_WORKERS
+    log_buffer = ThreadLogBuffer()
+
+    def run_buffered(task, records):
+        log_buffer.local.records = records
+        try:
+            return task()
+        finally:
+            log_buffer.local.records = None
+
+    logger.addFilter(log_buffer)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            runs = []
+            for task in tasks:
+                records = []
+                runs.append((executor.submit(run_buffered, task, records), records))
+
+            results = []
+            for future, records in runs:
+                exception = future.exception()
+                for record in records:
+                    logger.handle(record)
+                if exception is not None:
+                    raise exception
+                results.append(future.result())
+    finally:
+        logger.removeFilter(log_buffer)
+
+    return results
+
+
+ID_BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+
+def bloom_positions(value, bit_count, hash_count):
+    # Must match the ingestion lambda's copy, which builds the filters
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % bit_count for i in range(hash_count)]
+
+
+def build_id_bloom(ids):
+    # Copied from the ingestion lambda, for the manifest entries of compacted
+    # ingestion segments
+    n = max(len(ids), 1)
+    bit_count = max(
+        64, math.ceil(-n * math.log(ID_BLOOM_FALSE_POSITIVE_RATE) / math.log(2) ** 2)
+    )
+    hash_count = max(1, round(bit_count / n * math.log(2)))
+
+    bits = bytearray((bit_count + 7) // 8)
+    for value in ids:
+        for position in bloom_positions(value, bit_count, hash_count):
+            bits[position // 8] |= 1 << (position % 8)
+
+    return {
+        "bits": base64.b64encode(bits).decode("ascii"),
+        "m": bit_count,
+        "k": hash_count,
+    }
+
+
+def may_contain_ids(manifest_entry, ids):
+    # False only if the entry's id range or bloom filter rules out every id
+    if manifest_entry.get("min_id") is not None:
+        ids = [
+            value
+            for value in ids
+            if manifest_entry["min_id"] <= value <= manifest_entry["max_id"]
+        ]
+
+    bloom = manifest_entry.get("id_bloom")
+    if bloom is None or not ids:
+        return bool(ids)
+
+    bits = base64.b64decode(bloom["bits"])
+    return any(
+        all(
+            bits[position // 8] >> (position % 8) & 1
+            for position in bloom_positions(value, bloom["m"], bloom["k"])
+        )
+        for value in ids
+    )
+
+
+def list_keys_for_ids(s3_client, bucket_name, table_name, ids):
+    # Keys of the objects that may hold any of ids, judged by the id stats in
+    # the table's manifest; objects without stats, as those written by COPY or
+    # missing from the manifest, are always candidates
+    manifest = read_ingestion_manifest(s3_client, bucket_name, table_name)
+    all_keys = keys_from_manifest_and_listing(
+        s3_client, bucket_name, manifest, f"{table_name}/"
+    )
+
+    entries = {entry["key"]: entry for entry in manifest or []}
+    keys = [
+        key
+        for key in all_keys
+        if key not in entries or may_contain_ids(entries[key], ids)
+    ]
+
+    skipped = len(all_keys) - len(keys)
+    logger.info(
+        f"Skipped {skipped} of {len(all_keys)} '{table_name}' objects using "
+        + f"manifest id stats (skip rate {skipped / max(len(all_keys), 1):.1%})."
+    )
+
+    return keys
+
+
+def scan_latest_row_versions(s3_client, bucket_name, table_name, list_of_ids):
+    # Scans a table's history newest first without using its snapshot,
+    # stopping as soon as every requested id has been found
+    id_col_name = f"{table_name}_id"
+    ids_to_find = {int(value) for value in list_of_ids}
+    keys = list_keys_for_ids(s3_client, bucket_name, table_name, ids_to_find)
+
+    latest_rows = []
+    for _, df in prefetch_ingested_objects(s3_client, bucket_name, reversed(keys)):
+        found_df = df.iloc[::-1]
+        found_df = found_df[found_df[id_col_name].isin(ids_to_find)]
+        found_df = found_df.drop_duplicates(subset=id_col_name)
+
+        latest_rows.append(found_df)
+        ids_to_find -= set(found_df[id_col_name])
+        if not ids_to_find:
+            break
+
+    if not latest_rows:
+        return pd.DataFrame(columns=[id_col_name])
+    return pd.concat(latest_rows, ignore_index=True)
+
+
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+# Processed tables are uploaded through one transfer manager per save, which
+# caps the requests in flight across every table being uploaded
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_PART_SIZE,
+    multipart_chunksize=MULTIPART_PART_SIZE,
+    max_concurrency=10,
+)
+
+
+class S3StreamWriter:
+    # File-like object that sends whatever is written to it to S3 as a
+    # multipart upload, so at most one part is held in memory and nothing
+    # touches local disk. Objects smaller than one part go up in a single
+    # put_object call when the writer is closed.
+
+    def __init__(
+        self, client, bucket_name, key, part_size=MULTIPART_PART_SIZE, metadata=None
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.part_size = part_size
+        self.metadata = metadata or {}
+        self.buffer = bytearray()
+        self.bytes_written = 0
+        self.upload_id = None
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        self.buffer.extend(data)
+        self.bytes_written += len(data)
+
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[: self.part_size]))
+            del self.buffer[: self.part_size]
+
+        return len(data)
+
+    def tell(self):
+        return self.bytes_written
+
+    def flush(self):
+        pass
+
+    def _upload_part(self, body):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, Metadata=self.metadata
+            )["UploadId"]
+
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def close(self):
+        if self.closed:
+            return
+
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                Body=bytes(self.buffer),
+                Metadata=self.metadata,
+            )
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+
+        self.buffer = bytearray()
+        self.closed = True
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id
+            )
+
+        self.buffer = bytearray()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+SNAPSHOT_TABLES = ["address", "department", "counterparty", "staff"]
+
+# Snapshots of these tables are kept sorted by the column that references
+# another table, so they double as a reverse index: the row group statistics
+# let a lookup by that column skip every row group without a match
+REVERSE_INDEXES = {"counterparty": "legal_address_id", "staff": "department_id"}
+SNAPSHOT_ROW_GROUP_SIZE = 10000
+# Rows sorted by a reverse index keep their newest-first position here, so
+# reads can restore the order the history scan gave them
+SNAPSHOT_SEQUENCE_COLUMN = "_snapshot_sequence"
+
+
+def read_ingestion_manifest(s3_client, bucket_name, table_name):
+    # The ingestion lambda appends an entry to _manifests/{table}.jsonl for
+    # every object it writes; returns None for tables without a manifest
+    try:
+        manifest = s3_client.get_object(
+            Bucket=bucket_name, Key=f"_manifests/{table_name}.jsonl"
+        )
+    except s3_client.exceptions.NoSuchKey:
+        return None
+
+    lines = manifest["Body"].read().decode("utf-8").splitlines()
+    return [json.loads(line) for line in lines if line]
+
+
+def list_ingested_keys(
+    s3_client, bucket_name, table_name, start_after="", key_prefix=""
+):
+    # Sorted keys of a table's ingested objects after start_after, from the
+    # manifest where there is one and a paginated listing otherwise
+    manifest = read_ingestion_manifest(s3_client, bucket_name, table_name)
+    return keys_from_manifest_and_listing(
+        s3_client, bucket_name, manifest, f"{table_name}/{key_prefix}", start_after
+    )
+
+
+def keys_from_manifest_and_listing(
+    s3_client, bucket_name, manifest, prefix, start_after=""
+):
+    # Keys sort chronologically, so objects written while manifest writing
+    # was switched off all come after the manifest's newest key, and a
+    # listing from there picks them up
+    keys = []
+    if manifest is not None:
+        manifest_keys = [entry["key"] for entry in manifest]
+        keys = sorted(
+            key for key in manifest_keys if key.startswith(prefix) and key > start_after
+        )
+        start_after = max([start_after] + manifest_keys)
+
+    paginator = s3_client.get_paginator("list_objects_v2")
+    pages = paginator.paginate(
+        Bucket=bucket_name, Prefix=prefix, StartAfter=start_after
+    )
+
+    for page in pages:
+        keys.extend(obj["Key"] for obj in page.get("Contents", []))
+    return keys
+
+
+def read_snapshot_source_key(s3_client, bucket_name, table_name):
+    try:
+        response = s3_client.head_object(
+            Bucket=bucket_name, Key=f"_snapshots/{table_name}.parquet"
+        )
+    except s3_client.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] == "404":
+            return None
+        raise
+
+    return response["Metadata"]["source-key"]
+
+
+def read_latest_rows_snapshot(s3_client, bucket_name, table_name, filters=None):
+    snapshot_object = s3_client.get_object(
+        Bucket=bucket_name, Key=f"_snapshots/{table_name}.parquet"
+    )
+
+    snapshot_table = pq.read_table(
+        io.BytesIO(snapshot_object["Body"].read()), filters=filters
+    )
+    json_columns = json.loads(snapshot_table.schema.metadata[b"json_columns"])
+    snapshot_df = snapshot_table.to_pandas()
+
+    for col_name in json_columns:
+        snapshot_df[col_name] = snapshot_df[col_name].map(json.loads)
+
+    if SNAPSHOT_SEQUENCE_COLUMN in snapshot_df.columns:
+        snapshot_df = (
+            snapshot_df.sort_values(SNAPSHOT_SEQUENCE_COLUMN, kind="stable")
+            .drop(columns=SNAPSHOT_SEQUENCE_COLUMN)
+            .reset_index(drop=True)
+        )
+
+    return snapshot_df
+
+
+def write_latest_rows_snapshot(
+    s3_client, bucket_name, table_name, snapshot_df, source_key
+):
+    # Columns holding values of mixed types (e.g. a price ingested both as a
+    # number and as a string) have no parquet type, so they are stored as
+    # JSON text and decoded again when the snapshot is read
+    snapshot_df = snapshot_df.copy()
+    json_columns = []
+    for col_name in snapshot_df.columns[snapshot_df.dtypes == object]:
+        try:
+            pa.array(snapshot_df[col_name], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            snapshot_df[col_name] = snapshot_df[col_name].map(
+                lambda value: json.dumps(value, default=str)
+            )
+            json_columns.append(col_name)
+
+    if table_name in REVERSE_INDEXES:
+        snapshot_df[SNAPSHOT_SEQUENCE_COLUMN] = range(len(snapshot_df.index))
+        snapshot_df = snapshot_df.sort_values(
+            REVERSE_INDEXES[table_name], kind="stable"
+        )
+
+    snapshot_table = pa.Table.from_pandas(snapshot_df, preserve_index=False)
+    snapshot_table = snapshot_table.replace_schema_metadata(
+        {
+            **(snapshot_table.schema.metadata or {}),
+            b"json_columns": json.dumps(json_columns).encode("utf-8"),
+        }
+    )
+
+    # The last ingested key folded into the snapshot is kept in the object
+    # metadata, so checking for newer files only needs a HEAD request
+    with S3StreamWriter(
+        s3_client,
+        bucket_name,
+        f"_snapshots/{table_name}.parquet",
+        metadata={"source-key": source_key},
+    ) as writer:
+        pq.write_table(snapshot_table, writer, row_group_size=SNAPSHOT_ROW_GROUP_SIZE)
+
+
+def latest_row_versions(frames, id_col_name):
+    # Given history frames oldest first, keeps the newest version of each row,
+    # ordered newest first as a backwards scan of the history would find them
+    history_df = pd.concat(frames, ignore_index=True)
+    return (
+        history_df.iloc[::-1]
+        .drop_duplicates(subset=id_col_name, keep="first")
+        .reset_index(drop=True)
+    )
+
+
+def update_latest_rows_snapshot(s3_client, bucket_name, table_name):
+    # The snapshot holds the newest version of every row of a source table,
+    # so only objects ingested since it was last written have to be read to
+    # bring it up to date. Returns the number of objects folded in.
     id_col_name = f"{table_name}_id"
 
-    # eliminating repeats from list of ids
-    set_of_ids = set(list_of_ids)
-    list_of_ids = list(set_of_ids)
+    source_key = read_snapshot_source_key(s3_client, bucket_name, table_name)
+    new_keys = list_ingested_keys(s3_client, bucket_name, table_name, source_key or "")
+
+    if not new_keys:
+        return 0
 
-    # look in folder of S3 bucket
-    file_list = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=f"{table_name}/")[
-        "Contents"
+    # The snapshot is stored newest first, so it's turned around to come
+    # before the new objects as the oldest part of the history
+    frames = []
+    if source_key is not None:
+        snapshot_df = read_latest_rows_snapshot(s3_client, bucket_name, table_name)
+        frames.append(snapshot_df.iloc[::-1])
+    frames += [
+        df for _, df in prefetch_ingested_objects(s3_client, bucket_name, new_keys)
     ]
 
-    latest_row_dicts = []
+    snapshot_df = latest_row_versions(frames, id_col_name)
+    write_latest_rows_snapshot(
+        s3_client, bucket_name, table_name, snapshot_df, new_keys[-1]
+    )
 
-    for i in range(len(file_list), 0, -1):
-        cur_filename = file_list[i - 1]["Key"]
+    logger.info(
+        f"Latest-rows snapshot for '{table_name}' updated from "
+        + f"{len(new_keys)} new files."
+    )
 
-        json_object = s3_client.get_object(Bucket=bucket_name, Key=cur_filename)
-        json_string = json_object["Body"].read().decode("utf-8")
+    return len(new_keys)
 
-        row_dicts = json.loads(json_string)
-        for j in range(len(row_dicts), 0, -1):
-            if row_dicts[j - 1][id_col_name] in list_of_ids:
-                latest_row_dicts.append(row_dicts[j - 1])
-                list_of_ids.remove(row_dicts[j - 1][id_col_name])
 
-    return pd.DataFrame(latest_row_dicts)
+def fetch_snapshot_rows(s3_client, bucket_name, table_name, col_name, values):
+    # Reads only the snapshot rows whose col_name is one of values. The
+    # handler brings the snapshots up to date once per run, so lookups only
+    # read them.
+    values = list(set(values))
+    try:
+        snapshot_df = read_latest_rows_snapshot(
+            s3_client, bucket_name, table_name, filters=[(col_name, "in", values)]
+        )
+    except s3_client.exceptions.NoSuchKey:
+        return pd.DataFrame(columns=[col_name])
+
+    return snapshot_df.reset_index(drop=True)
+
+
+# Write options for processed tables' Parquet files, read from the JSON in
+# PROCESSING_PARQUET_OPTIONS at cold start. "default" applies to every table
+# and "tables" overrides it per table. Options are compression,
+# compression_level, row_group_size, use_dictionary and write_statistics (as
+# for pyarrow's write_table; the last two take true/false or a list of
+# columns) and sort_by, a list of columns to sort rows by before writing.
+PARQUET_OPTION_NAMES = {
+    "compression",
+    "compression_level",
+    "row_group_size",
+    "use_dictionary",
+    "write_statistics",
+    "sort_by",
+}
+DEFAULT_PARQUET_OPTIONS = {
+    "default": {"compression": "snappy"},
+    # Sorted by date, each row group covers a narrow range of dates, so
+    # readers filtering on created_date can skip by min/max statistics
+    "tables": {
+        "fact_sales_order": {"sort_by": ["created_date"], "row_group_size": 100000}
+    },
+}
+
+
+def load_parquet_options(options_json=None):
+    options = json.loads(options_json) if options_json else DEFAULT_PARQUET_OPTIONS
+
+    for table_options in [options.get("default", {})] + list(
+        options.get("tables", {}).values()
+    ):
+        unknown_names = set(table_options) - PARQUET_OPTION_NAMES
+        if unknown_names:
+            raise ValueError(f"Unknown Parquet options: {sorted(unknown_names)}")
+
+    return options
+
+
+PARQUET_OPTIONS = load_parquet_options(os.environ.get("PROCESSING_PARQUET_OPTIONS"))
+
+
+def parquet_options_for(table_name):
+    return {
+        **PARQUET_OPTIONS.get("default", {}),
+        **PARQUET_OPTIONS.get("tables", {}).get(table_name, {}),
+    }
 
 
-def df_to_parquet_in_s3(client, df, bucket_name, folder, file_name):
-    if not os.path.exists("/tmp"):
-        os.mkdir("/tmp")
-    df.to_parquet(f"/tmp/{file_name}.parquet")
+def write_processed_parquet(df, file, table_name):
+    options = parquet_options_for(table_name)
+    # sort columns missing from the frame are passed over
+    sort_by = [col for col in options.pop("sort_by", []) if col in df.columns]
+    if sort_by:
+        df = df.sort_values(sort_by, kind="stable", ignore_index=True)
+
+    df.to_parquet(file, **options)
+
 
-    client.upload_file(
-        f"/tmp/{file_name}.parquet", bucket_name, f"{folder}/{file_name}.parquet"
+# With PROCESSING_PARTITION_FACT_SALES_ORDER set to true, fact_sales_order is
+# written as a hive-style dataset, one part per created_date and run:
+#   fact_sales_order/created_date=YYYY-MM-DD/part-{check_time}.parquet
+# Each part keeps its created_date column, so it loads on its own. A run
+# manifest at fact_sales_order/_runs/{check_time}.json lists a run's parts.
+PARTITION_COLUMNS = (
+    {"fact_sales_order": "created_date"}
+    if os.environ.get("PROCESSING_PARTITION_FACT_SALES_ORDER", "false").lower()
+    == "true"
+    else {}
+)
+
+
+def partition_part_key(table_name, value, part_name):
+    return (
+        f"{table_name}/{PARTITION_COLUMNS[table_name]}={value}/part-{part_name}.parquet"
     )
+
+
+def run_manifest_key(table_name, check_time):
+    return f"{table_name}/_runs/{check_time}.json"
+
+
+def processed_output_key(table_name, check_time):
+    # The object whose presence means a run's output for a table is complete
+    if table_name in PARTITION_COLUMNS:
+        return run_manifest_key(table_name, check_time)
+    return f"{table_name}/{check_time}.parquet"
+
+
+def df_to_parquet_in_s3(client, df, bucket_name, folder, file_name):
+    with S3StreamWriter(client, bucket_name, f"{folder}/{file_name}.parquet") as writer:
+        write_processed_parquet(df, writer, folder)
     logger.info(f"{folder}/{file_name}.parquet uploaded to processing")
 
-    os.remove(f"/tmp/{file_name}.parquet")
+
+# Each processed table is built from this run's objects of these ingested
+# tables; their keys and ETags make up the input fingerprint stored in the
+# metadata of its Parquet output
+PROCESSED_TABLE_SOURCES = {
+    "dim_counterparty": ["counterparty", "address"],
+    "dim_currency": ["currency"],
+    "dim_design": ["design"],
+    "dim_staff": ["staff", "department"],
+    "dim_location": ["address"],
+    "fact_sales_order": ["sales_order"],
+}
+
+
+def fingerprint_processing_inputs(s3_client, bucket_name, has_new_rows, check_time):
+    # Returns a fingerprint for each processed table this run will produce
+    source_digests = {}
+    for table_name in {
+        t for sources in PROCESSED_TABLE_SOURCES.values() for t in sources
+    }:
+        if not has_new_rows[table_name]:
+            continue
+
+        digest = hashlib.sha256()
+        paginator = s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=bucket_name, Prefix=f"{table_name}/{check_time}."
+        ):
+            for obj in page.get("Contents", []):
+                digest.update(f"{obj['Key']} {obj['ETag']}\n".encode("utf-8"))
+        source_digests[table_name] = digest.hexdigest()
+
+    fingerprints = {}
+    for processed_table, sources in PROCESSED_TABLE_SOURCES.items():
+        if any(source in source_digests for source in sources):
+            fingerprint = hashlib.sha256()
+            for source in sources:
+                fingerprint.update(f"{source} {source_digests.get(source)}\n".encode())
+            fingerprints[processed_table] = fingerprint.hexdigest()
+    return fingerprints
+
+
+def find_already_processed_tables(
+    s3_client, bucket_name, input_fingerprints, check_time
+):
+    # Tables whose output for this run already exists, written from the same
+    # inputs, as on a retry or a replayed event
+    already_processed = set()
+    for table_name, fingerprint in input_fingerprints.items():
+        try:
+            response = s3_client.head_object(
+                Bucket=bucket_name, Key=processed_output_key(table_name, check_time)
+            )
+        except s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == "404":
+                continue
+            raise
+
+        if response["Metadata"].get("input-fingerprint") == fingerprint:
+            already_processed.add(table_name)
+
+    return already_processed
 
 
 #######################
@@ -67,10 +957,9 @@ def df_to_parquet_in_s3(client, df, bucket_name, folder, file_name):
 def process_counterparty_updates(s3_client, bucket_name, current_checK_time):
     logger.info("Processing new rows for table 'counterparty'.")
 
-    file_name = f"counterparty/{current_checK_time}.json"
-    json_object = s3_client.get_object(Bucket=bucket_name, Key=file_name)
-    json_string = json_object["Body"].read().decode("utf-8")
-    counterparty_df = pd.DataFrame.from_dict(json.loads(json_string))
+    counterparty_df = fetch_ingested_rows(
+        s3_client, bucket_name, "counterparty", current_checK_time
+    )
 
     address_ids_to_fetch = counterparty_df["legal_address_id"].tolist()
     addresses_df = fetch_latest_row_versions(
@@ -116,19 +1005,51 @@ def process_counterparty_updates(s3_client, bucket_name, current_checK_time):
     return dim_counterparty_df
 
 
+def join_address_updates(counterparty_df, address_df, already_updated_list):
+    # Joins updated addresses onto the latest versions of the counterparty
+    # rows referencing them, leaving out counterparties already processed
+    counterparty_df = counterparty_df[
+        counterparty_df["legal_address_id"].isin(address_df["address_id"])
+        & ~counterparty_df["counterparty_id"].isin(already_updated_list)
+    ]
+
+    new_rows_df = counterparty_df.merge(
+        address_df, left_on="legal_address_id", right_on="address_id"
+    )
+    new_rows_df = new_rows_df.drop(
+        columns=[
+            "legal_address_id",
+            "commercial_contact",
+            "delivery_contact",
+            "created_at_x",
+            "last_updated_x",
+            "address_id",
+            "created_at_y",
+            "last_updated_y",
+        ]
+    )
+    return new_rows_df.rename(
+        columns={
+            "address_line_1": "counterparty_legal_address_line_1",
+            "address_line_2": "counterparty_legal_address_line_2",
+            "district": "counterparty_legal_district",
+            "city": "counterparty_legal_city",
+            "postal_code": "counterparty_legal_postal_code",
+            "country": "counterparty_legal_country",
+            "phone": "counterparty_legal_phone_number",
+        }
+    )
+
+
 def process_address_updates(
     s3_client, bucket_name, last_checked_time, dim_counterparty_df=None
 ):
     logger.info("Processing new rows for table 'address'.")
 
     # Fetch updated address table rows
-    file_name = f"address/{last_checked_time}.json"
-    json_string = (
-        s3_client.get_object(Bucket=bucket_name, Key=file_name)["Body"]
-        .read()
-        .decode("utf-8")
+    address_df = fetch_ingested_rows(
+        s3_client, bucket_name, "address", last_checked_time
     )
-    address_df = pd.DataFrame.from_dict(json.loads(json_string))
     updated_address_ids = address_df["address_id"].tolist()
 
     # Create dim_location table
@@ -149,58 +1070,21 @@ def process_address_updates(
     except KeyError:
         already_updated_list = []
 
-    file_list = s3_client.list_objects(Bucket=bucket_name, Prefix="counterparty/")[
-        "Contents"
-    ]
+    # Look up the latest counterparty rows that reference an updated address
+    # in the counterparty reverse index, minus those already in dim_counterparty_df
+    counterparty_df = fetch_snapshot_rows(
+        s3_client, bucket_name, "counterparty", "legal_address_id", updated_address_ids
+    )
     new_row_count = 0
 
-    # Iterate over files in the counterparty/ dir from newest to oldest
-    for i in range(len(file_list) - 1, -1, -1):
-        cur_filename = file_list[i]["Key"]
-
-        json_object = s3_client.get_object(Bucket=bucket_name, Key=cur_filename)
-        json_string = json_object["Body"].read().decode("utf-8")
-
-        working_df = pd.DataFrame.from_dict(json.loads(json_string))
-
-        # Iterate over rows in the current file from newest to oldest
-        for j in range(len(working_df.index) - 1, -1, -1):
-            # Find and update all counterparty rows that reference an updated
-            # address id and aren't already present in dim_counterparty_df
-            if working_df.loc[j, "counterparty_id"] not in already_updated_list:
-                if working_df.loc[j, "legal_address_id"] in updated_address_ids:
-                    current_row = working_df.loc[[j]]
-                    current_row = current_row.merge(
-                        address_df, left_on="legal_address_id", right_on="address_id"
-                    )
-                    current_row = current_row.drop(
-                        columns=[
-                            "legal_address_id",
-                            "commercial_contact",
-                            "delivery_contact",
-                            "created_at_x",
-                            "last_updated_x",
-                            "address_id",
-                            "created_at_y",
-                            "last_updated_y",
-                        ]
-                    )
-                    current_row = current_row.rename(
-                        columns={
-                            "address_line_1": "counterparty_legal_address_line_1",
-                            "address_line_2": "counterparty_legal_address_line_2",
-                            "district": "counterparty_legal_district",
-                            "city": "counterparty_legal_city",
-                            "postal_code": "counterparty_legal_postal_code",
-                            "country": "counterparty_legal_country",
-                            "phone": "counterparty_legal_phone_number",
-                        }
-                    )
-                    dim_counterparty_df = pd.concat(
-                        [dim_counterparty_df, current_row], ignore_index=True
-                    )
-                    already_updated_list.append(working_df.loc[j, "counterparty_id"])
-                    new_row_count += 1
+    if not counterparty_df.empty:
+        new_rows_df = join_address_updates(
+            counterparty_df, address_df, already_updated_list
+        )
+        dim_counterparty_df = pd.concat(
+            [dim_counterparty_df, new_rows_df], ignore_index=True
+        )
+        new_row_count = len(new_rows_df.index)
 
     logger.info(
         f"Added {new_row_count} rows with updated address info "
@@ -213,13 +1097,9 @@ def process_address_updates(
 def process_currency_updates(s3_client, bucket_name, current_check_time):
     print(__name__)
     logger.info("Processing new rows for table 'currency'.")
-    file_name = f"currency/{current_check_time}.json"
-    json_string = (
-        s3_client.get_object(Bucket=bucket_name, Key=file_name)["Body"]
-        .read()
-        .decode("utf-8")
+    currency_df = fetch_ingested_rows(
+        s3_client, bucket_name, "currency", current_check_time
     )
-    currency_df = pd.DataFrame.from_dict(json.loads(json_string))
     dim_currency_df = currency_df.drop(columns=["last_updated", "created_at"])
 
     dim_currency_df["currency_name"] = dim_currency_df["currency_code"].apply(
@@ -236,13 +1116,9 @@ def process_currency_updates(s3_client, bucket_name, current_check_time):
 
 def process_design_updates(s3_client, bucket_name, current_check_time):
     logger.info("Processing new rows for table 'design'.")
-    file_name = f"design/{current_check_time}.json"
-    json_string = (
-        s3_client.get_object(Bucket=bucket_name, Key=file_name)["Body"]
-        .read()
-        .decode("utf-8")
+    design_df = fetch_ingested_rows(
+        s3_client, bucket_name, "design", current_check_time
     )
-    design_df = pd.DataFrame.from_dict(json.loads(json_string))
     dim_design_df = design_df.drop(columns=["last_updated", "created_at"])
 
     logger.info(
@@ -254,13 +1130,7 @@ def process_design_updates(s3_client, bucket_name, current_check_time):
 
 def process_staff_updates(s3_client, bucket_name, current_check_time):
     logger.info("Processing new rows for table 'address'.")
-    file_name = f"staff/{current_check_time}.json"
-    json_string = (
-        s3_client.get_object(Bucket=bucket_name, Key=file_name)["Body"]
-        .read()
-        .decode("utf-8")
-    )
-    staff_df = pd.DataFrame.from_dict(json.loads(json_string))
+    staff_df = fetch_ingested_rows(s3_client, bucket_name, "staff", current_check_time)
 
     department_ids_to_fetch = staff_df["department_id"].tolist()
     departments_df = fetch_latest_row_versions(
@@ -286,19 +1156,40 @@ def process_staff_updates(s3_client, bucket_name, current_check_time):
     return dim_staff_df
 
 
+def join_department_updates(staff_df, department_df, already_updated_list):
+    # Joins updated departments onto the latest versions of the staff rows
+    # referencing them, leaving out staff already processed
+    staff_df = staff_df[
+        staff_df["department_id"].isin(department_df["department_id"])
+        & ~staff_df["staff_id"].isin(already_updated_list)
+    ]
+
+    new_rows_df = staff_df.merge(
+        department_df, left_on="department_id", right_on="department_id"
+    )
+    new_rows_df = new_rows_df[
+        [
+            "staff_id",
+            "first_name",
+            "last_name",
+            "department_name",
+            "location",
+            "email_address",
+        ]
+    ]
+    new_rows_df["location"] = new_rows_df["location"].fillna("Undefined")
+    return new_rows_df
+
+
 def process_department_updates(
     s3_client, bucket_name, last_checked_time, dim_staff_df=None
 ):
     logger.info("Processing new rows for table 'department'.")
 
     # Fetch updated department table rows
-    file_name = f"department/{last_checked_time}.json"
-    json_string = (
-        s3_client.get_object(Bucket=bucket_name, Key=file_name)["Body"]
-        .read()
-        .decode("utf-8")
+    department_df = fetch_ingested_rows(
+        s3_client, bucket_name, "department", last_checked_time
     )
-    department_df = pd.DataFrame.from_dict(json.loads(json_string))
     updated_department_ids = department_df["department_id"].tolist()
 
     if dim_staff_df is None:
@@ -310,46 +1201,19 @@ def process_department_updates(
     except KeyError:
         already_updated_list = []
 
-    file_list = s3_client.list_objects(Bucket=bucket_name, Prefix="staff/")["Contents"]
+    # Look up the latest staff rows that reference an updated department in
+    # the staff reverse index, minus those already in dim_staff_df
+    staff_df = fetch_snapshot_rows(
+        s3_client, bucket_name, "staff", "department_id", updated_department_ids
+    )
     new_row_count = 0
 
-    # Iterate over files in the staff/ dir from newest to oldest
-    for i in range(len(file_list) - 1, -1, -1):
-        cur_filename = file_list[i]["Key"]
-
-        json_object = s3_client.get_object(Bucket=bucket_name, Key=cur_filename)
-        json_string = json_object["Body"].read().decode("utf-8")
-
-        working_df = pd.DataFrame.from_dict(json.loads(json_string))
-
-        # Iterate over rows in the current file from newest to oldest
-        for j in range(len(working_df.index) - 1, -1, -1):
-            # Find and update all staff rows that reference an updated department row
-            # and aren't already present in dim_staff_df
-            if working_df.loc[j, "staff_id"] not in already_updated_list:
-                if working_df.loc[j, "department_id"] in updated_department_ids:
-                    current_row = working_df.loc[[j]]
-                    current_row = current_row.merge(
-                        department_df, left_on="department_id", right_on="department_id"
-                    )
-                    current_row = current_row[
-                        [
-                            "staff_id",
-                            "first_name",
-                            "last_name",
-                            "department_name",
-                            "location",
-                            "email_address",
-                        ]
-                    ]
-                    current_row["location"] = current_row["location"].fillna(
-                        "Undefined"
-                    )
-                    dim_staff_df = pd.concat(
-                        [dim_staff_df, current_row], ignore_index=True
-                    )
-                    already_updated_list.append(working_df.loc[j, "staff_id"])
-                    new_row_count += 1
+    if not staff_df.empty:
+        new_rows_df = join_department_updates(
+            staff_df, department_df, already_updated_list
+        )
+        dim_staff_df = pd.concat([dim_staff_df, new_rows_df], ignore_index=True)
+        new_row_count = len(new_rows_df.index)
 
     logger.info(
         f"Added {new_row_count} rows with updated department info to dim_staff_df."
@@ -360,13 +1224,9 @@ def process_department_updates(
 
 def process_sales_order_updates(s3_client, bucket_name, current_check_time):
     logger.info("Processing new rows for table 'sales_order'.")
-    file_name = f"sales_order/{current_check_time}.json"
-    json_string = (
-        s3_client.get_object(Bucket=bucket_name, Key=file_name)["Body"]
-        .read()
-        .decode("utf-8")
+    sales_order_df = fetch_ingested_rows(
+        s3_client, bucket_name, "sales_order", current_check_time
     )
-    sales_order_df = pd.DataFrame.from_dict(json.loads(json_string))
 
     # Split dates and times
     sales_order_df["created_date"] = sales_order_df["created_at"].str.split(" ").str[0]
@@ -412,34 +1272,435 @@ def process_sales_order_updates(s3_client, bucket_name, current_check_time):
     return fact_sales_order_df
 
 
-def save_processed_tables(s3_client, bucket_name, tables_to_save, current_check_time):
-    if not os.path.exists("/tmp"):
-        os.mkdir("/tmp")
-
-    for table_name, df_to_convert in tables_to_save.items():
-        if df_to_convert is None:
-            continue
+def save_processed_tables(
+    s3_client, bucket_name, tables_to_save, current_check_time, input_fingerprints=None
+):
+    input_fingerprints = input_fingerprints or {}
+
+    # Each file is encoded into memory, then uploaded through the shared
+    # transfer manager
+    def upload_parquet(transfer_manager, key, df, table_name, metadata):
+        encode_start = time.perf_counter()
+        buffer = io.BytesIO()
+        write_processed_parquet(df, buffer, table_name)
+        byte_size = buffer.tell()
+        buffer.seek(0)
+
+        upload_start = time.perf_counter()
+        transfer_manager.upload(
+            buffer, bucket_name, key, extra_args={"Metadata": metadata}
+        ).result()
+        upload_end = time.perf_counter()
+
+        logger.info(
+            f"{key}: {byte_size} bytes, encoded in "
+            + f"{upload_start - encode_start:.3f}s, uploaded in "
+            + f"{upload_end - upload_start:.3f}s"
+        )
 
-        local_file_name = f"/tmp/{current_check_time}.parquet"
-        destination_file_name = f"{table_name}/{current_check_time}.parquet"
+    def save_table(transfer_manager, table_name, df_to_convert):
+        metadata = {}
+        if table_name in input_fingerprints:
+            metadata["input-fingerprint"] = input_fingerprints[table_name]
 
-        logger.info(f"Saving {table_name} DataFrame to {destination_file_name} ...")
+        if table_name in PARTITION_COLUMNS:
+            column = PARTITION_COLUMNS[table_name]
+            logger.info(
+                f"Saving {table_name} DataFrame to {table_name}/{column}=*/"
+                + f"part-{current_check_time}.parquet ..."
+            )
 
-        df_to_convert.to_parquet(local_file_name)
+            parts = []
+            for value, part_df in df_to_convert.groupby(column, dropna=False):
+                key = partition_part_key(table_name, value, current_check_time)
+                upload_parquet(
+                    transfer_manager,
+                    key,
+                    part_df.reset_index(drop=True),
+                    table_name,
+                    {},
+                )
+                parts.append({"key": key, column: value, "rows": len(part_df.index)})
+
+            # Written last, so a run manifest only exists once all its parts do
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Key=run_manifest_key(table_name, current_check_time),
+                Body=json.dumps({"parts": parts}).encode("utf-8"),
+                Metadata=metadata,
+            )
+        else:
+            destination_file_name = f"{table_name}/{current_check_time}.parquet"
+            logger.info(f"Saving {table_name} DataFrame to {destination_file_name} ...")
+            upload_parquet(
+                transfer_manager,
+                destination_file_name,
+                df_to_convert,
+                table_name,
+                metadata,
+            )
 
-        s3_client.upload_file(local_file_name, bucket_name, destination_file_name)
         logger.info("Parquet file uploaded to processing bucket. Save successful.")
 
+    with create_transfer_manager(s3_client, UPLOAD_TRANSFER_CONFIG) as transfer_manager:
+        run_concurrently(
+            [
+                lambda table_name=table_name, df=df: save_table(
+                    transfer_manager, table_name, df
+                )
+                for table_name, df in tables_to_save.items()
+                if df is not None
+            ]
+        )
+
 
-def generate_processing_output(tables_to_report, current_check_time):
+def generate_processing_output(
+    tables_to_report, current_check_time, already_processed=()
+):
     output = {"HasNewRows": {}, "LastCheckedTime": current_check_time}
 
     for table_name, df in tables_to_report.items():
-        output["HasNewRows"][table_name] = df is not None
+        output["HasNewRows"][table_name] = (
+            df is not None or table_name in already_processed
+        )
 
     return output
 
 
+def compact_partitions(s3_client, bucket_name, table_name, min_age_hours=24):
+    # Merges each partition's parts written over min_age_hours ago, long past
+    # any retry of the runs that wrote them, into a single part. Readers
+    # listing a partition mid-compaction can briefly see both the new part
+    # and the old ones. Run manifests keep listing the merged parts; the
+    # uploader loads the compacted parts in their place when a run is
+    # replayed. Returns the number of partitions compacted.
+    column = PARTITION_COLUMNS[table_name]
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(hours=min_age_hours)
+
+    partitions = {}
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket_name, Prefix=f"{table_name}/{column}="
+    ):
+        for obj in page.get("Contents", []):
+            if obj["Key"].endswith(".parquet") and obj["LastModified"] < cutoff:
+                partition = obj["Key"].rsplit("/", 1)[0]
+                partitions.setdefault(partition, []).append(obj)
+
+    compacted_count = 0
+    for partition, objects in sorted(partitions.items()):
+        if len(objects) < 2:
+            continue
+
+        # Oldest first, so rows keep the order the runs wrote them in
+        keys = [obj["Key"] for obj in sorted(objects, key=lambda o: o["LastModified"])]
+        part_df = pd.concat(
+            [
+                pd.read_parquet(
+                    io.BytesIO(
+                        s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+                    )
+                )
+                for key in keys
+            ],
+            ignore_index=True,
+        )
+
+        buffer = io.BytesIO()
+        write_processed_parquet(part_df, buffer, table_name)
+        compacted_key = (
+            f"{partition}/part-compacted-{now.strftime('%Y-%m-%d %H_%M_%S.%f')}.parquet"
+        )
+        s3_client.put_object(
+            Bucket=bucket_name, Key=compacted_key, Body=buffer.getvalue()
+        )
+        s3_client.delete_objects(
+            Bucket=bucket_name, Delete={"Objects": [{"Key": key} for key in keys]}
+        )
+
+        logger.info(
+            f"Compacted {len(keys)} parts of {partition} into {compacted_key} "
+            + f"({len(part_df.index)} rows)."
+        )
+        compacted_count += 1
+
+    return compacted_count
+
+
+# Objects replaced by a compacted ingestion segment are deleted this long after
+# the manifest stopped listing them, so a run that read the manifest before
+# the swap can still fetch every object it lists
+RETIRED_OBJECT_GRACE_HOURS = 1
+MANIFEST_CONFLICT_CODES = {"PreconditionFailed", "ConditionalRequestConflict"}
+
+
+def ingestion_period(table_name, key, granularity):
+    # The day (YYYY-MM-DD) or month (YYYY-MM) of the run that wrote a key,
+    # with the time the period ends, or None for keys not named after a run
+    period = key[len(table_name) + 1 :][: 10 if granularity == "day" else 7]
+    try:
+        if granularity == "day":
+            end = datetime.strptime(period, "%Y-%m-%d") + timedelta(days=1)
+        else:
+            end = (datetime.strptime(period, "%Y-%m") + timedelta(days=32)).replace(
+                day=1
+            )
+    except ValueError:
+        return None
+    return period, end.replace(tzinfo=timezone.utc)
+
+
+def find_compacted_segment(s3_client, bucket_name, table_name, check_time):
+    # The segment that replaced a run's objects, if its period was compacted.
+    # Segments keep only the newest version of each row, so the run's own
+    # rows can't be told apart in it.
+    manifest = read_ingestion_manifest(s3_client, bucket_name, table_name) or []
+    for entry in manifest:
+        if "-segment" not in entry["key"]:
+            continue
+        granularity = entry["key"].rsplit("~", 1)[1].split("-segment")[0]
+        segment_period = ingestion_period(table_name, entry["key"], granularity)
+        run_period = ingestion_period(
+            table_name, f"{table_name}/{check_time}", granularity
+        )
+        if segment_period is not None and segment_period == run_period:
+            return entry["key"]
+    return None
+
+
+def encode_ingestion_segment(df):
+    # Parquet, unless a column holds values of mixed types (e.g. a price
+    # ingested both as a number and as a string), which parquet can't store;
+    # those segments are written as gzipped JSON instead
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return ".json.gz", gzip.compress(df.to_json(orient="records").encode("utf-8"))
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    return ".parquet", buffer.getvalue()
+
+
+def segment_manifest_entry(
+    table_name, key, byte_size, segment_df, source_objects, source_rows
+):
+    # The same fields as the ingestion lambda's entries, so id lookups can
+    # still skip the segment, plus audit counts of what it replaced
+    entry = {
+        "key": key,
+        "rows": len(segment_df.index),
+        "bytes": byte_size,
+        "min_id": None,
+        "max_id": None,
+        "min_last_updated": None,
+        "max_last_updated": None,
+        "id_bloom": None,
+        "source_objects": source_objects,
+        "source_rows": source_rows,
+    }
+
+    id_col_name = f"{table_name}_id"
+    if id_col_name in segment_df.columns and not segment_df.empty:
+        ids = [int(value) for value in segment_df[id_col_name]]
+        entry["min_id"], entry["max_id"] = min(ids), max(ids)
+        entry["id_bloom"] = build_id_bloom(ids)
+    if (
+        "last_updated" in segment_df.columns
+        and segment_df["last_updated"].notna().any()
+    ):
+        last_updated = segment_df["last_updated"].dropna().astype(str)
+        entry["min_last_updated"] = last_updated.min()
+        entry["max_last_updated"] = last_updated.max()
+
+    return entry
+
+
+def swap_manifest_entries(s3_client, bucket_name, table_name, replacements, attempts=5):
+    # Replaces the entries of each segment's source keys with the segment's
+    # entry in one PUT, so a run reading the manifest sees either the old
+    # objects or the segments. The PUT only succeeds if the manifest is
+    # unchanged since it was read; if the ingestion lambda appended to it
+    # meanwhile, the swap is applied again to the new manifest.
+    manifest_key = f"_manifests/{table_name}.jsonl"
+    replaced_keys = {key for _, keys in replacements for key in keys}
+
+    for _ in range(attempts):
+        manifest = s3_client.get_object(Bucket=bucket_name, Key=manifest_key)
+        lines = manifest["Body"].read().decode("utf-8").splitlines()
+        entries = [json.loads(line) for line in lines if line]
+
+        if not replaced_keys <= {entry["key"] for entry in entries}:
+            raise RuntimeError(f"manifest for {table_name} compacted concurrently")
+
+        entries = [entry for entry in entries if entry["key"] not in replaced_keys]
+        entries += [segment_entry for segment_entry, _ in replacements]
+        entries.sort(key=lambda entry: entry["key"])
+
+        body = "".join(json.dumps(entry, default=str) + "\n" for entry in entries)
+        try:
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Key=manifest_key,
+                Body=body.encode("utf-8"),
+                IfMatch=manifest["ETag"],
+            )
+            return
+        except s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] not in MANIFEST_CONFLICT_CODES:
+                raise
+            logger.info(f"Manifest for {table_name} changed while swapping, retrying")
+
+    raise RuntimeError(f"could not swap the manifest for {table_name}")
+
+
+def read_retired_objects(s3_client, bucket_name, table_name):
+    try:
+        retired = s3_client.get_object(
+            Bucket=bucket_name, Key=f"_compaction/{table_name}-retired.json"
+        )
+    except s3_client.exceptions.NoSuchKey:
+        return []
+    return json.loads(retired["Body"].read())
+
+
+def write_retired_objects(s3_client, bucket_name, table_name, retired):
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=f"_compaction/{table_name}-retired.json",
+        Body=json.dumps(retired).encode("utf-8"),
+    )
+
+
+def delete_retired_objects(s3_client, bucket_name, table_name, now):
+    # Deletes objects retired over RETIRED_OBJECT_GRACE_HOURS ago, bar any
+    # the manifest lists again. Returns the number deleted.
+    retired = read_retired_objects(s3_client, bucket_name, table_name)
+    cutoff = now - timedelta(hours=RETIRED_OBJECT_GRACE_HOURS)
+    due = [r for r in retired if datetime.fromisoformat(r["retired_at"]) <= cutoff]
+    if not due:
+        return 0
+
+    listed_keys = {
+        entry["key"]
+        for entry in read_ingestion_manifest(s3_client, bucket_name, table_name) or []
+    }
+    keys = [r["key"] for r in due if r["key"] not in listed_keys]
+    for i in range(0, len(keys), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={"Objects": [{"Key": key} for key in keys[i : i + 1000]]},
+        )
+
+    write_retired_objects(
+        s3_client, bucket_name, table_name, [r for r in retired if r not in due]
+    )
+    return len(keys)
+
+
+def compact_ingested_objects(
+    s3_client, bucket_name, table_name, granularity="day", min_age_hours=24
+):
+    # Merges the objects a table's manifest lists for each day or month that
+    # ended over min_age_hours ago into one segment holding the newest version
+    # of each row, then swaps the segments into the manifest. The objects
+    # they replace are deleted by a later compaction, once no run can still
+    # be reading them. Returns audit counts of what was merged.
+    if granularity not in ("day", "month"):
+        raise ValueError(f"Unknown compaction granularity: {granularity}")
+
+    id_col_name = f"{table_name}_id"
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(hours=min_age_hours)
+
+    counts = {
+        "deleted_objects": delete_retired_objects(
+            s3_client, bucket_name, table_name, now
+        ),
+        "segments": 0,
+        "source_objects": 0,
+        "source_rows": 0,
+        "rows": 0,
+    }
+
+    manifest = read_ingestion_manifest(s3_client, bucket_name, table_name)
+    periods = {}
+    for entry in manifest or []:
+        period = ingestion_period(table_name, entry["key"], granularity)
+        if period is not None and period[1] <= cutoff:
+            periods.setdefault(period[0], []).append(entry)
+
+    replacements = []
+    for period, entries in sorted(periods.items()):
+        if len(entries) < 2:
+            continue
+
+        entries = sorted(entries, key=lambda entry: entry["key"])
+        keys = [entry["key"] for entry in entries]
+        history_df = pd.concat(
+            [df for _, df in prefetch_ingested_objects(s3_client, bucket_name, keys)],
+            ignore_index=True,
+        )
+
+        # Oldest first, each row where its newest version was written, so the
+        # segment reads like the history it replaces
+        segment_df = history_df
+        if id_col_name in history_df.columns:
+            segment_df = history_df.drop_duplicates(
+                subset=id_col_name, keep="last"
+            ).reset_index(drop=True)
+
+        # Named after the newest key it replaces, so it sorts after all of
+        # them and before anything ingested later
+        suffix, body = encode_ingestion_segment(segment_df)
+        timestamp = keys[-1][len(table_name) + 1 :][:26]
+        segment_key = f"{table_name}/{timestamp}~{granularity}-segment{suffix}"
+        s3_client.put_object(Bucket=bucket_name, Key=segment_key, Body=body)
+
+        replacements.append(
+            (
+                segment_manifest_entry(
+                    table_name,
+                    segment_key,
+                    len(body),
+                    segment_df,
+                    len(keys),
+                    len(history_df.index),
+                ),
+                keys,
+            )
+        )
+
+        logger.info(
+            f"Compacted {len(keys)} '{table_name}' objects for {period} "
+            + f"({len(history_df.index)} rows) into {segment_key}, keeping "
+            + f"{len(segment_df.index)} rows."
+        )
+        counts["segments"] += 1
+        counts["source_objects"] += len(keys)
+        counts["source_rows"] += len(history_df.index)
+        counts["rows"] += len(segment_df.index)
+
+    if replacements:
+        swap_manifest_entries(s3_client, bucket_name, table_name, replacements)
+
+        retired_at = now.isoformat()
+        write_retired_objects(
+            s3_client,
+            bucket_name,
+            table_name,
+            read_retired_objects(s3_client, bucket_name, table_name)
+            + [
+                {"key": key, "retired_at": retired_at}
+                for _, keys in replacements
+                for key in keys
+            ],
+        )
+
+    return counts
+
+
 ###################################
 ####                           ####
 ####      LAMBDA  HANDLER      ####
@@ -453,7 +1714,7 @@ def processing_lambda_handler(event, context):
 
         has_new_rows = event["HasNewRows"]
         last_checked_time = event["LastCheckedTime"]
-        s3_client = boto3.client("s3")
+        s3_client = create_s3_client()
         INGESTION_BUCKET_NAME = os.environ["INGESTION_BUCKET_NAME"]
         PROCESSING_BUCKET_NAME = os.environ["PROCESSING_BUCKET_NAME"]
 
@@ -470,74 +1731,138 @@ def processing_lambda_handler(event, context):
         logger.info(f"Ingestion bucket is {INGESTION_BUCKET_NAME}.")
         logger.info(f"Processing bucket is {PROCESSING_BUCKET_NAME}.")
 
+        # Outputs already written from the same inputs aren't built again
+        input_fingerprints = fingerprint_processing_inputs(
+            s3_client, INGESTION_BUCKET_NAME, has_new_rows, last_checked_time
+        )
+        already_processed = find_already_processed_tables(
+            s3_client, PROCESSING_BUCKET_NAME, input_fingerprints, last_checked_time
+        )
+        for table_name in sorted(already_processed):
+            logger.info(f"{table_name} already processed from the same inputs.")
+
+        rebuild = {
+            table_name: table_name not in already_processed
+            for table_name in input_fingerprints
+        }
+        rebuild_counterparty = rebuild.get("dim_counterparty") or rebuild.get(
+            "dim_location"
+        )
+
+        # Fold newly ingested rows into the latest-row snapshots once per
+        # run; the lookups made while building the tables only read them
+        if any(rebuild.values()):
+            for table_name in SNAPSHOT_TABLES:
+                update_latest_rows_snapshot(
+                    s3_client, INGESTION_BUCKET_NAME, table_name
+                )
+
+        # Each builder returns the processed tables of one group of source
+        # tables; only the tables within a group depend on each other, so
+        # the groups are built concurrently
+        builders = []
+
         ####################################################
         ## PROCESS COUNTERPARTY and ADDRESS TABLE UPDATES ##
         ####################################################
 
-        if has_new_rows["counterparty"]:
-            processed_tables["dim_counterparty"] = process_counterparty_updates(
-                s3_client, INGESTION_BUCKET_NAME, last_checked_time
-            )
+        def build_counterparty_tables():
+            tables = {}
+            if has_new_rows["counterparty"]:
+                tables["dim_counterparty"] = process_counterparty_updates(
+                    s3_client, INGESTION_BUCKET_NAME, last_checked_time
+                )
 
-        if has_new_rows["address"]:
-            processed_tables["dim_counterparty"], processed_tables["dim_location"] = (
-                process_address_updates(
-                    s3_client,
-                    INGESTION_BUCKET_NAME,
-                    last_checked_time,
-                    processed_tables["dim_counterparty"],
+            if has_new_rows["address"]:
+                tables["dim_counterparty"], tables["dim_location"] = (
+                    process_address_updates(
+                        s3_client,
+                        INGESTION_BUCKET_NAME,
+                        last_checked_time,
+                        tables.get("dim_counterparty"),
+                    )
                 )
-            )
+            return tables
+
+        if rebuild_counterparty:
+            builders.append(build_counterparty_tables)
 
         ####################################
         ## PROCESS CURRENCY TABLE UPDATES ##
         ####################################
 
-        if has_new_rows["currency"]:
-            processed_tables["dim_currency"] = process_currency_updates(
-                s3_client, INGESTION_BUCKET_NAME, last_checked_time
+        if has_new_rows["currency"] and rebuild["dim_currency"]:
+            builders.append(
+                lambda: {
+                    "dim_currency": process_currency_updates(
+                        s3_client, INGESTION_BUCKET_NAME, last_checked_time
+                    )
+                }
             )
 
         ##################################
         ## PROCESS DESIGN TABLE UPDATES ##
         ##################################
 
-        if has_new_rows["design"]:
-            processed_tables["dim_design"] = process_design_updates(
-                s3_client, INGESTION_BUCKET_NAME, last_checked_time
+        if has_new_rows["design"] and rebuild["dim_design"]:
+            builders.append(
+                lambda: {
+                    "dim_design": process_design_updates(
+                        s3_client, INGESTION_BUCKET_NAME, last_checked_time
+                    )
+                }
             )
 
         ################################################
         ## PROCESS STAFF and DEPARTMENT TABLE UPDATES ##
         ################################################
 
-        if has_new_rows["staff"]:
-            processed_tables["dim_staff"] = process_staff_updates(
-                s3_client, INGESTION_BUCKET_NAME, last_checked_time
-            )
+        def build_staff_tables():
+            tables = {}
+            if has_new_rows["staff"]:
+                tables["dim_staff"] = process_staff_updates(
+                    s3_client, INGESTION_BUCKET_NAME, last_checked_time
+                )
 
-        if has_new_rows["department"]:
-            processed_tables["dim_staff"] = process_department_updates(
-                s3_client,
-                INGESTION_BUCKET_NAME,
-                last_checked_time,
-                processed_tables["dim_staff"],
-            )
+            if has_new_rows["department"]:
+                tables["dim_staff"] = process_department_updates(
+                    s3_client,
+                    INGESTION_BUCKET_NAME,
+                    last_checked_time,
+                    tables.get("dim_staff"),
+                )
+            return tables
+
+        if rebuild.get("dim_staff"):
+            builders.append(build_staff_tables)
 
         #######################################
         ## PROCESS SALES ORDER TABLE UPDATES ##
         #######################################
 
-        if has_new_rows["sales_order"]:
-            processed_tables["fact_sales_order"] = process_sales_order_updates(
-                s3_client, INGESTION_BUCKET_NAME, last_checked_time
+        if has_new_rows["sales_order"] and rebuild["fact_sales_order"]:
+            builders.append(
+                lambda: {
+                    "fact_sales_order": process_sales_order_updates(
+                        s3_client, INGESTION_BUCKET_NAME, last_checked_time
+                    )
+                }
             )
 
+        for tables in run_concurrently(builders):
+            processed_tables.update(tables)
+
         save_processed_tables(
-            s3_client, PROCESSING_BUCKET_NAME, processed_tables, last_checked_time
+            s3_client,
+            PROCESSING_BUCKET_NAME,
+            processed_tables,
+            last_checked_time,
+            input_fingerprints,
         )
 
-        output = generate_processing_output(processed_tables, last_checked_time)
+        output = generate_processing_output(
+            processed_tables, last_checked_time, already_processed
+        )
 
         logger.info(output)
         print(output)
@@ -549,6 +1874,76 @@ def processing_lambda_handler(event, context):
         return {"Error found": e}
 
 
+def compaction_lambda_handler(event, context):
+    # Run periodically, e.g. daily, to merge partitioned tables' small
+    # per-run parts; {"MinAgeHours": n} overrides the default age of 24 hours
+    try:
+        PROCESSING_BUCKET_NAME = os.environ["PROCESSING_BUCKET_NAME"]
+        min_age_hours = event.get("MinAgeHours", 24)
+        s3_client = create_s3_client()
+
+        output = {
+            "CompactedPartitions": {
+                table_name: compact_partitions(
+                    s3_client, PROCESSING_BUCKET_NAME, table_name, min_age_hours
+                )
+                for table_name in PARTITION_COLUMNS
+            }
+        }
+
+        logger.info(output)
+        return output
+
+    except Exception as e:
+        logger.error({"Error found": e})
+        return {"Error found": e}
+
+
+def ingestion_compaction_lambda_handler(event, context):
+    # Run periodically, e.g. daily, to merge the ingestion bucket's small
+    # per-run objects; {"Granularity": "month"} merges by month rather than
+    # by day and {"MinAgeHours": n} overrides how long after a period ends
+    # it is left alone, 24 hours by default
+    try:
+        INGESTION_BUCKET_NAME = os.environ["INGESTION_BUCKET_NAME"]
+        granularity = event.get("Granularity", "day")
+        min_age_hours = event.get("MinAgeHours", 24)
+        s3_client = create_s3_client()
+
+        # Only tables with a manifest are compacted, as runs reading a table
+        # by listing it would see both the segments and the objects they
+        # replace until those are deleted
+        paginator = s3_client.get_paginator("list_objects_v2")
+        table_names = [
+            obj["Key"][len("_manifests/") : -len(".jsonl")]
+            for page in paginator.paginate(
+                Bucket=INGESTION_BUCKET_NAME, Prefix="_manifests/"
+            )
+            for obj in page.get("Contents", [])
+            if obj["Key"].endswith(".jsonl")
+        ]
+
+        output = {
+            "CompactedObjects": {
+                table_name: compact_ingested_objects(
+                    s3_client,
+                    INGESTION_BUCKET_NAME,
+                    table_name,
+                    granularity,
+                    min_age_hours,
+                )
+                for table_name in table_names
+            }
+        }
+
+        logger.info(output)
+        return output
+
+    except Exception as e:
+        logger.error({"Error found": e})
+        return {"Error found": e}
+
+
 if __name__ == "__main__":
     test_event = {
         "HasNewRows": {
@@ -1,6 +1,11 @@
 import boto3, os, logging, json, io
 import pg8000
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 logger = logging.getLogger("logger")
 logger.setLevel(logging.INFO)
@@ -33,44 +38,590 @@ def close_connection(conn):
 
 
 # PARQUET TO DF
+S3_READ_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+class S3ObjectFile(io.RawIOBase):
+    # A seekable, read-only view of an S3 object that GETs only the byte
+    # ranges read from it, so a Parquet reader can fetch the footer and then
+    # one row group at a time instead of the whole object. Reads are pinned
+    # to the ETag seen on opening, so an overwrite can't mix two versions.
+    def __init__(self, s3_client, bucket, key):
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.etag = head["ETag"]
+        self.size = head["ContentLength"]
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        return self.position
+
+    def readinto(self, buffer):
+        end = min(self.position + len(buffer), self.size)
+        if end <= self.position:
+            return 0
+
+        response = self.s3_client.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f"bytes={self.position}-{end - 1}",
+            IfMatch=self.etag,
+        )
+        data = response["Body"].read()
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def open_s3_object(s3_client, BUCKET_NAME, file_key):
+    # Buffered so the small reads pyarrow makes are served by one ranged GET
+    return io.BufferedReader(
+        S3ObjectFile(s3_client, BUCKET_NAME, file_key),
+        buffer_size=S3_READ_BUFFER_SIZE,
+    )
+
+
 def read_parquet_from_s3(s3_client, BUCKET_NAME, file_key):
-    response = s3_client.get_object(Bucket=BUCKET_NAME, Key=file_key)
-    buffer = io.BytesIO(response["Body"].read())
-    df = pd.read_parquet(buffer)
+    df = pd.read_parquet(open_s3_object(s3_client, BUCKET_NAME, file_key))
     return df
 
 
-# INSERT INTO DW
-def insert_into_dw(df, db, table_name):
-    column_names = ", ".join(df.columns)
-    placeholders = ", ".join(["%s"] * len(df.columns))
-    cursor = db.cursor()
+def read_parquet_file_from_s3(s3_client, BUCKET_NAME, file_key):
+    # Also returns the ETag of the object version being read, which the load
+    # ledger records the file by
+    s3_file = open_s3_object(s3_client, BUCKET_NAME, file_key)
+    return pq.ParquetFile(s3_file), s3_file.raw.etag
+
+
+# STAGING
+def df_to_copy_csv(df):
+    csv_buffer = io.StringIO()
+    df.to_csv(csv_buffer, index=False, header=False, na_rep="\\N")
+    return io.BytesIO(csv_buffer.getvalue().encode("utf-8"))
+
+
+def create_staging_table(cursor, table_name, columns):
+    # A temporary table with just the loaded columns and the target's column
+    # types, dropped when the load commits. staging_row_number keeps the
+    # source's row order for the set-based insert.
+    staging_table = f"staging_{table_name}"
+    column_names = ", ".join(columns)
+
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+        + f"SELECT {column_names} FROM {table_name} WITH NO DATA;"
+    )
+    cursor.execute(
+        f"ALTER TABLE {staging_table} ADD COLUMN staging_row_number BIGSERIAL;"
+    )
+
+    return staging_table
+
+
+def copy_df_to_staging(cursor, df, table_name):
+    staging_table = create_staging_table(cursor, table_name, df.columns)
+    cursor.execute(
+        f"COPY {staging_table} ({', '.join(df.columns)}) FROM STDIN "
+        + "WITH (FORMAT csv, NULL '\\N');",
+        stream=df_to_copy_csv(df),
+    )
+
+    return staging_table
+
+
+def merge_staging_table(cursor, table_name, columns, staging_table):
+    # Returns the number of rows inserted, updated and skipped as unchanged
+    column_names = ", ".join(columns)
     if table_name == "fact_sales_order":
         logger.info(f"adding new row(s) to {table_name}")
         insert_statement = f"""
             INSERT INTO {table_name} ({column_names})
-            VALUES ({placeholders});
+            SELECT {column_names} FROM {staging_table}
+            ORDER BY staging_row_number;
             """
-        for index, row in df.iterrows():
-            cursor.execute(insert_statement, row)
+        cursor.execute(insert_statement)
+        row_counts = {"inserted": cursor.rowcount, "updated": 0, "skipped": 0}
         logger.info(f"new rows added to {table_name}")
     else:
         logger.info(f"updating / adding row(s) to {table_name}")
         column_id_name = table_name[4:] + "_id"
-        update_statement = ", ".join([f"{col} = EXCLUDED.{col}" for col in df.columns])
+        update_statement = ", ".join([f"{col} = EXCLUDED.{col}" for col in columns])
+        compared_columns = [col for col in columns if col != column_id_name]
+        current_values = ", ".join([f"{table_name}.{col}" for col in compared_columns])
+        new_values = ", ".join([f"EXCLUDED.{col}" for col in compared_columns])
+        # Row by row, a later row for the same id overwrote an earlier one; a
+        # single upsert can only touch each row once, so keep the last. Rows
+        # whose values haven't changed are left alone rather than rewritten.
+        # xmax is 0 only on the row versions the insert itself created.
         insert_statement = f"""
-            INSERT INTO {table_name} ({column_names})
-            VALUES ({placeholders})
-            ON CONFLICT ({column_id_name})
-            DO UPDATE SET {update_statement};
+            WITH merged AS (
+                INSERT INTO {table_name} ({column_names})
+                SELECT DISTINCT ON ({column_id_name}) {column_names}
+                FROM {staging_table}
+                ORDER BY {column_id_name}, staging_row_number DESC
+                ON CONFLICT ({column_id_name})
+                DO UPDATE SET {update_statement}
+                WHERE ROW({current_values}) IS DISTINCT FROM ROW({new_values})
+                RETURNING xmax = 0 AS inserted
+            )
+            SELECT
+                (SELECT count(DISTINCT {column_id_name}) FROM {staging_table}),
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted)
+            FROM merged;
             """
-        for index, row in df.iterrows():
-            cursor.execute(insert_statement, row)
+        cursor.execute(insert_statement)
+        staged, inserted, updated = cursor.fetchone()
+        row_counts = {
+            "inserted": inserted,
+            "updated": updated,
+            "skipped": staged - inserted - updated,
+        }
         logger.info(f"rows updated / added to {table_name}")
+
+    logger.info({table_name: row_counts})
+    return row_counts
+
+
+# BINARY COPY
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + bytes(8)
+PGCOPY_TRAILER = b"\xff\xff"
+POSTGRES_EPOCH_DAYS = 10957  # 2000-01-01, counted from 1970-01-01
+
+
+def join_row_segments(segments, row_count):
+    # Each segment holds one byte string per row, as a flat uint8 array plus
+    # the per-row lengths; returns the row-wise concatenation of them all
+    row_lengths = np.zeros(row_count, dtype=np.int64)
+    for _, lengths in segments:
+        row_lengths += lengths
+
+    output = np.empty(int(row_lengths.sum()), dtype=np.uint8)
+    position = np.cumsum(row_lengths) - row_lengths
+    for data, lengths in segments:
+        byte_rows = np.repeat(np.arange(row_count), lengths)
+        shift = position - (np.cumsum(lengths) - lengths)
+        output[np.arange(len(data)) + shift[byte_rows]] = data
+        position += lengths
+
+    return output, row_lengths
+
+
+def fixed_width_cells(payload, valid):
+    # payload holds each row's big-endian value; a null cell is only its -1
+    # length word
+    row_count, width = payload.shape
+    cells = np.empty((row_count, 4 + width), dtype=np.uint8)
+    lengths = np.where(valid, width, -1).astype(">i4")
+    cells[:, :4] = lengths.view(np.uint8).reshape(row_count, 4)
+    cells[:, 4:] = payload
+
+    if valid.all():
+        return cells.ravel(), np.full(row_count, 4 + width)
+
+    keep = np.ones(cells.shape, dtype=bool)
+    keep[~valid, 4:] = False
+    return cells[keep], np.where(valid, 4 + width, 4)
+
+
+def validity(array):
+    return pc.is_valid(array).to_numpy(zero_copy_only=False)
+
+
+def encode_integers(array, width):
+    values = pc.fill_null(pc.cast(array, pa.int64()), 0).to_numpy()
+    limit = 2 ** (8 * width - 1)
+    if values.size and (values.min() < -limit or values.max() >= limit):
+        raise ValueError(f"value out of range for a {width}-byte integer column")
+
+    payload = values.astype(f">i{width}").view(np.uint8).reshape(-1, width)
+    return fixed_width_cells(payload, validity(array))
+
+
+def encode_strings(array, typmod):
+    valid = validity(array)
+    array = pc.fill_null(pc.cast(array, pa.string()), "")
+
+    offsets = np.frombuffer(array.buffers()[1], dtype=np.int32)
+    offsets = offsets[array.offset : array.offset + len(array) + 1]
+    data = np.frombuffer(array.buffers()[2] or b"", dtype=np.uint8)
+    lengths = np.diff(offsets).astype(np.int64)
+
+    headers = np.where(valid, lengths, -1).astype(">i4").view(np.uint8)
+    return join_row_segments(
+        [(headers, np.full(len(array), 4)), (data[offsets[0] : offsets[-1]], lengths)],
+        len(array),
+    )
+
+
+def encode_dates(array, typmod):
+    valid = validity(array)
+    days = pc.cast(pc.cast(array, pa.date32()), pa.int32())
+    days = pc.fill_null(days, 0).to_numpy() - POSTGRES_EPOCH_DAYS
+    payload = days.astype(">i4").view(np.uint8).reshape(-1, 4)
+    return fixed_width_cells(payload, valid)
+
+
+def encode_times(array, typmod):
+    valid = validity(array)
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        # HH:MM with optional seconds and a fraction of up to six digits
+        array = pc.fill_null(array, "00:00")
+        fields = [
+            pc.cast(
+                pc.utf8_rpad(pc.utf8_slice_codeunits(array, start, stop), 2, "0"),
+                pa.int64(),
+            )
+            for start, stop in [(0, 2), (3, 5), (6, 8)]
+        ]
+        fraction = pc.utf8_rpad(pc.utf8_slice_codeunits(array, 9, 15), 6, "0")
+        micros = pc.add(
+            pc.multiply(
+                pc.add(
+                    pc.multiply(pc.add(pc.multiply(fields[0], 60), fields[1]), 60),
+                    fields[2],
+                ),
+                1000000,
+            ),
+            pc.cast(fraction, pa.int64()),
+        )
+    else:
+        micros = pc.cast(pc.cast(array, pa.time64("us")), pa.int64())
+
+    payload = pc.fill_null(micros, 0).to_numpy().astype(">i8")
+    return fixed_width_cells(payload.view(np.uint8).reshape(-1, 8), valid)
+
+
+def encode_numerics(array, typmod):
+    # Values are rounded half away from zero to the column's scale, as when
+    # Postgres parses text, then written as base-10000 digit groups
+    precision, scale = (typmod - 4) >> 16, (typmod - 4) & 0xFFFF
+    valid = validity(array)
+
+    if not pa.types.is_decimal(array.type):
+        array = pc.cast(pc.cast(array, pa.string()), pa.decimal128(38, 18))
+    array = pc.round(array, ndigits=scale, round_mode="half_towards_infinity")
+    array = pc.cast(array, pa.decimal128(38, scale))
+
+    # the low word of each 128-bit value is the whole unscaled value
+    words = np.frombuffer(array.buffers()[1], dtype="<i8")
+    unscaled = words[2 * array.offset : 2 * (array.offset + len(array)) : 2]
+    if (np.abs(unscaled[valid]) >= 10**precision).any():
+        raise ValueError(
+            f"value out of range for a NUMERIC({precision},{scale}) column"
+        )
+
+    int_groups = max(-(-(precision - scale) // 4), 1)
+    frac_groups = -(-scale // 4)
+    integer_part, fraction = np.divmod(np.abs(unscaled), 10**scale)
+    fraction = fraction * 10 ** (4 * frac_groups - scale)
+
+    numeric = np.empty((len(array), 4 + int_groups + frac_groups), dtype=">i2")
+    numeric[:, 0] = int_groups + frac_groups
+    numeric[:, 1] = int_groups - 1
+    numeric[:, 2] = np.where(unscaled < 0, 0x4000, 0)
+    numeric[:, 3] = scale
+    for k in range(int_groups):
+        numeric[:, 4 + k] = integer_part // 10000 ** (int_groups - 1 - k) % 10000
+    for k in range(frac_groups):
+        numeric[:, 4 + int_groups + k] = (
+            fraction // 10000 ** (frac_groups - 1 - k) % 10000
+        )
+
+    payload = numeric.view(np.uint8).reshape(len(array), -1)
+    return fixed_width_cells(payload, valid)
+
+
+BINARY_ENCODERS = {
+    21: lambda array, typmod: encode_integers(array, 2),
+    23: lambda array, typmod: encode_integers(array, 4),
+    20: lambda array, typmod: encode_integers(array, 8),
+    25: encode_strings,
+    1043: encode_strings,
+    1082: encode_dates,
+    1083: encode_times,
+    1700: encode_numerics,
+}
+
+
+def has_binary_encoder(type_oid, typmod):
+    # unconstrained NUMERIC has no fixed scale to encode to
+    return type_oid in BINARY_ENCODERS and not (type_oid == 1700 and typmod == -1)
+
+
+def encode_binary_copy(batches, column_types):
+    # Yields a PostgreSQL binary COPY stream, one chunk per record batch
+    yield PGCOPY_HEADER
+    for batch in batches:
+        row_count = batch.num_rows
+        field_count = np.array([batch.num_columns], dtype=">i2").view(np.uint8)
+        segments = [(np.tile(field_count, row_count), np.full(row_count, 2))]
+        for array, (type_oid, typmod) in zip(batch.columns, column_types):
+            segments.append(BINARY_ENCODERS[type_oid](array, typmod))
+        yield join_row_segments(segments, row_count)[0].tobytes()
+    yield PGCOPY_TRAILER
+
+
+def fetch_column_types(cursor, table_name):
+    cursor.execute(
+        """
+        SELECT attname, atttypid, atttypmod FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped;
+        """,
+        (table_name,),
+    )
+    return {name: (type_oid, typmod) for name, type_oid, typmod in cursor.fetchall()}
+
+
+# LOAD LEDGER
+def create_load_ledger(db):
+    cursor = db.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS load_ledger (
+            table_name VARCHAR NOT NULL,
+            source_key VARCHAR NOT NULL,
+            etag VARCHAR NOT NULL,
+            rows INT NOT NULL,
+            loaded_at TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (table_name, source_key, etag)
+        );
+        """)
     db.commit()
     cursor.close()
 
 
+def claim_load(cursor, table_name, source_key, etag, row_count):
+    # Recorded in the load's own transaction, so the entry commits or rolls
+    # back with the rows. A concurrent load of the same file waits on the
+    # primary key, then finds the entry once the first commits.
+    cursor.execute(
+        """
+        INSERT INTO load_ledger (table_name, source_key, etag, rows)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT DO NOTHING
+        RETURNING rows;
+        """,
+        (table_name, source_key, etag, row_count),
+    )
+    return bool(cursor.fetchall())
+
+
+# INSERT INTO DW
+def insert_into_dw(df, db, table_name):
+    cursor = db.cursor()
+    staging_table = copy_df_to_staging(cursor, df, table_name)
+    row_counts = merge_staging_table(
+        cursor, table_name, list(df.columns), staging_table
+    )
+    db.commit()
+    cursor.close()
+
+    return row_counts
+
+
+def insert_parquet_into_dw(parquet_file, db, table_name, batch_size=65536, source=None):
+    # Streams the file's record batches into staging, reading only the
+    # columns the table has. Batches are encoded straight from Arrow into
+    # binary COPY; a table with a column type that has no encoder copies
+    # each batch as CSV instead. With a (source_key, etag) source, the load
+    # is recorded in the ledger and skipped if it has already committed. Its
+    # rows are then counted as already_loaded, apart from the unchanged rows
+    # a load counts as skipped.
+    cursor = db.cursor()
+    row_count = parquet_file.metadata.num_rows
+    if source is not None and not claim_load(cursor, table_name, *source, row_count):
+        db.rollback()
+        cursor.close()
+        logger.info(f"{source[0]} already loaded into {table_name}, skipping")
+        return {"inserted": 0, "updated": 0, "skipped": 0, "already_loaded": row_count}
+
+    table_column_types = fetch_column_types(cursor, table_name)
+    columns = [
+        name for name in parquet_file.schema_arrow.names if name in table_column_types
+    ]
+    column_types = [table_column_types[col] for col in columns]
+    batches = parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+
+    staging_table = create_staging_table(cursor, table_name, columns)
+    if all(has_binary_encoder(*column_type) for column_type in column_types):
+        cursor.execute(
+            f"COPY {staging_table} ({', '.join(columns)}) FROM STDIN "
+            + "WITH (FORMAT binary);",
+            stream=encode_binary_copy(batches, column_types),
+        )
+    else:
+        for batch in batches:
+            cursor.execute(
+                f"COPY {staging_table} ({', '.join(columns)}) FROM STDIN "
+                + "WITH (FORMAT csv, NULL '\\N');",
+                stream=df_to_copy_csv(batch.to_pandas()),
+            )
+    row_counts = merge_staging_table(cursor, table_name, columns, staging_table)
+    db.commit()
+    cursor.close()
+
+    return {**row_counts, "already_loaded": 0}
+
+
+# LOAD SCHEDULING
+LOAD_WORKERS = int(os.environ.get("UPLOADING_LOAD_WORKERS", 4))
+
+
+def fetch_table_dependencies(db, table_names):
+    # Foreign keys between the tables being loaded; a reference to a table
+    # with nothing new this run is already satisfied
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT conrelid::regclass::text, confrelid::regclass::text
+        FROM pg_constraint WHERE contype = 'f';
+        """)
+    dependencies = {table_name: set() for table_name in table_names}
+    for table_name, referenced_table in cursor.fetchall():
+        if (
+            table_name in dependencies
+            and referenced_table in dependencies
+            and referenced_table != table_name
+        ):
+            dependencies[table_name].add(referenced_table)
+    cursor.close()
+    db.commit()
+
+    return dependencies
+
+
+def load_tables_in_dependency_order(
+    table_names, dependencies, load_table, workers=None
+):
+    # Runs load_table(table_name) on a pool of workers, starting each table
+    # once every table it depends on has loaded. Returns a status per table,
+    # "loaded", "failed: <error>" or "skipped: <reason>", and what load_table
+    # returned for each table that loaded.
+    workers = workers or LOAD_WORKERS
+    status = {}
+    results = {}
+    pending = list(table_names)
+    running = {}
+
+    def skip_dependents(table_name):
+        for dependent in [t for t in pending if table_name in dependencies[t]]:
+            pending.remove(dependent)
+            status[dependent] = f"skipped: {table_name} did not load"
+            logger.error(f"{dependent} not loaded, as {table_name} did not load")
+            skip_dependents(dependent)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for table_name in list(pending):
+                if all(status.get(dep) == "loaded" for dep in dependencies[table_name]):
+                    pending.remove(table_name)
+                    running[executor.submit(load_table, table_name)] = table_name
+
+            if not running:
+                for table_name in pending:
+                    status[table_name] = "skipped: circular foreign keys"
+                    logger.error(
+                        f"{table_name} not loaded, as its foreign keys form a cycle"
+                    )
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                table_name = running.pop(future)
+                try:
+                    results[table_name] = future.result()
+                    status[table_name] = "loaded"
+                except Exception as e:
+                    status[table_name] = f"failed: {e}"
+                    logger.error({"Error loading": table_name, "Error found": e})
+                    skip_dependents(table_name)
+
+    return status, results
+
+
+def list_run_files(s3_client, BUCKET_NAME, table_name, last_checked_time):
+    # A partitioned table's run manifest lists the parts the run wrote, so
+    # only the partitions it touched are read; other tables have one file
+    try:
+        response = s3_client.get_object(
+            Bucket=BUCKET_NAME, Key=f"{table_name}/_runs/{last_checked_time}.json"
+        )
+    except s3_client.exceptions.NoSuchKey:
+        return [f"{table_name}/{last_checked_time}.parquet"]
+
+    file_keys = []
+    for part in json.loads(response["Body"].read())["parts"]:
+        for file_key in resolve_run_part(s3_client, BUCKET_NAME, part["key"]):
+            if file_key not in file_keys:
+                file_keys.append(file_key)
+    return file_keys
+
+
+def resolve_run_part(s3_client, BUCKET_NAME, part_key):
+    # Compaction merges a partition's old parts into part-compacted-* parts
+    # and deletes them, leaving run manifests listing keys that are gone. A
+    # replayed run then loads the partition's compacted parts, oldest first,
+    # which hold its rows along with those of the other runs merged with it.
+    partition = part_key.rsplit("/", 1)[0]
+    paginator = s3_client.get_paginator("list_objects_v2")
+    partition_keys = [
+        obj["Key"]
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=f"{partition}/")
+        for obj in page.get("Contents", [])
+    ]
+
+    if part_key in partition_keys:
+        return [part_key]
+
+    compacted_keys = sorted(
+        key for key in partition_keys if key.startswith(f"{partition}/part-compacted-")
+    )
+    if not compacted_keys:
+        raise FileNotFoundError(f"{part_key} is missing and was not compacted")
+
+    logger.info(f"{part_key} was compacted, loading {compacted_keys} instead")
+    return compacted_keys
+
+
+def load_table_from_s3(s3_client, BUCKET_NAME, table_name, last_checked_time):
+    # Each table loads over its own connection, each file committing
+    # independently, with its own load ledger entry
+    row_counts = {"inserted": 0, "updated": 0, "skipped": 0, "already_loaded": 0}
+    db = connect_to_db()
+    try:
+        for file_key in list_run_files(
+            s3_client, BUCKET_NAME, table_name, last_checked_time
+        ):
+            parquet_file, etag = read_parquet_file_from_s3(
+                s3_client, BUCKET_NAME, file_key
+            )
+            file_row_counts = insert_parquet_into_dw(
+                parquet_file, db, table_name, source=(file_key, etag)
+            )
+            for count_name in row_counts:
+                row_counts[count_name] += file_row_counts[count_name]
+    finally:
+        close_connection(db)
+
+    return row_counts
+
+
 # LAMBDA HANDLER
 def uploading_lambda_handler(event, context):
     logger.info(f"LCT: {event['LastCheckedTime']}")
@@ -81,20 +632,29 @@ def uploading_lambda_handler(event, context):
 
         last_checked_time = event["LastCheckedTime"]
         s3_client = boto3.client("s3")
-        db = connect_to_db()
 
         has_new_rows = event["HasNewRows"]
-
+        tables_to_load = [t for t in has_new_rows if has_new_rows[t]]
         for table_name in has_new_rows:
-            if has_new_rows[table_name]:
-                file_key = f"{table_name}/{last_checked_time}.parquet"
-                df = read_parquet_from_s3(s3_client, BUCKET_NAME, file_key)
-                insert_into_dw(df, db, table_name)
-            else:
+            if not has_new_rows[table_name]:
                 logger.info(f"no new rows to add to {table_name}")
 
+        db = connect_to_db()
+        create_load_ledger(db)
+        dependencies = fetch_table_dependencies(db, tables_to_load)
         close_connection(db)
 
+        table_status, row_counts = load_tables_in_dependency_order(
+            tables_to_load,
+            dependencies,
+            lambda table_name: load_table_from_s3(
+                s3_client, BUCKET_NAME, table_name, last_checked_time
+            ),
+        )
+        logger.info({"Table status": table_status, "Row counts": row_counts})
+
+        return {"TableStatus": table_status, "RowCounts": row_counts}
+
     except Exception as e:
         logger.error({"Error found": e})
         return {"Error found": e}
@@ -0,0 +1,131 @@
+import argparse, io, time
+import numpy as np
+import pandas as pd
+import pg8000
+import pyarrow.parquet as pq
+
+from src.uploading_lambda import insert_into_dw, insert_parquet_into_dw
+
+# Loads a synthetic fact_sales_order Parquet file into a local Postgres twice,
+# through the pandas + CSV COPY path and through the Arrow binary COPY path,
+# and reports rows/s for each. The table is created as a temporary table
+# (without the warehouse's foreign keys), so any empty database will do.
+#
+#   python src/utils/benchmark_binary_copy.py --rows 100000 1000000 \
+#       --user postgres --database postgres
+
+FACT_SALES_ORDER_DDL = """
+CREATE TEMP TABLE fact_sales_order (
+    sales_record_id SERIAL PRIMARY KEY,
+    sales_order_id INT NOT NULL,
+    created_date DATE NOT NULL,
+    created_time TIME NOT NULL,
+    last_updated_date DATE NOT NULL,
+    last_updated_time TIME NOT NULL,
+    sales_staff_id INT NOT NULL,
+    counterparty_id INT NOT NULL,
+    units_sold INT NOT NULL,
+    unit_price NUMERIC(10, 2) NOT NULL,
+    currency_id INT NOT NULL,
+    design_id INT NOT NULL,
+    agreed_payment_date DATE NOT NULL,
+    agreed_delivery_date DATE NOT NULL,
+    agreed_delivery_location_id INT NOT NULL
+);
+"""
+
+
+def make_fact_sales_order_parquet(row_count, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(0, 365, row_count), unit="D"
+    )
+    times = pd.to_timedelta(rng.integers(0, 86400 * 10**6, row_count), unit="us")
+    date_strings = dates.strftime("%Y-%m-%d")
+    time_strings = (pd.Timestamp("2024-01-01") + times).strftime("%H:%M:%S.%f")
+
+    df = pd.DataFrame(
+        {
+            "sales_order_id": np.arange(1, row_count + 1),
+            "created_date": date_strings,
+            "created_time": time_strings,
+            "last_updated_date": date_strings,
+            "last_updated_time": time_strings,
+            "sales_staff_id": rng.integers(1, 21, row_count),
+            "counterparty_id": rng.integers(1, 21, row_count),
+            "units_sold": rng.integers(1000, 100000, row_count),
+            "unit_price": rng.integers(100, 400, row_count) / 100,
+            "currency_id": rng.integers(1, 4, row_count),
+            "design_id": rng.integers(1, 400, row_count),
+            "agreed_payment_date": date_strings,
+            "agreed_delivery_date": date_strings,
+            "agreed_delivery_location_id": rng.integers(1, 31, row_count),
+        }
+    )
+    buffer = io.BytesIO()
+    df.to_parquet(buffer)
+    return buffer.getvalue()
+
+
+def csv_load(db, parquet_bytes):
+    df = pd.read_parquet(io.BytesIO(parquet_bytes))
+    insert_into_dw(df, db, "fact_sales_order")
+
+
+def binary_load(db, parquet_bytes):
+    parquet_file = pq.ParquetFile(io.BytesIO(parquet_bytes))
+    insert_parquet_into_dw(parquet_file, db, "fact_sales_order")
+
+
+def time_load(db, load, parquet_bytes):
+    cursor = db.cursor()
+    cursor.execute("TRUNCATE fact_sales_order;")
+    db.commit()
+    cursor.close()
+
+    start = time.perf_counter()
+    load(db, parquet_bytes)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password")
+    parser.add_argument("--database", default="postgres")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--unix-sock", help="connect over a unix socket instead")
+    args = parser.parse_args()
+
+    connection_args = {"user": args.user, "database": args.database}
+    if args.password:
+        connection_args["password"] = args.password
+    if args.unix_sock:
+        connection_args["unix_sock"] = args.unix_sock
+    else:
+        connection_args.update(host=args.host, port=args.port)
+
+    db = pg8000.connect(**connection_args)
+    cursor = db.cursor()
+    cursor.execute(FACT_SALES_ORDER_DDL)
+    db.commit()
+    cursor.close()
+
+    for row_count in args.rows:
+        parquet_bytes = make_fact_sales_order_parquet(row_count)
+        csv_time = time_load(db, csv_load, parquet_bytes)
+        binary_time = time_load(db, binary_load, parquet_bytes)
+        print(
+            f"{row_count:>9} rows"
+            + f"  csv {row_count / csv_time:>10,.0f} rows/s"
+            + f"  binary {row_count / binary_time:>10,.0f} rows/s"
+            + f"  speedup {csv_time / binary_time:5.2f}x"
+        )
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
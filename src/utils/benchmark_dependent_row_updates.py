@@ -0,0 +1,136 @@
+import argparse, time
+import numpy as np
+import pandas as pd
+
+from src.processing_lambda import latest_row_versions, join_address_updates
+
+# Times the propagation of address updates to dim_counterparty over a
+# synthetic counterparty history, comparing the original per-row scan with
+# the vectorized latest_row_versions + join_address_updates path.
+#
+#   python src/utils/benchmark_dependent_row_updates.py --rows 10000 1000000
+#
+# Both paths run at every size given, so the 1M row timing of the per-row
+# scan is measured, not extrapolated. It takes a while.
+
+ROWS_PER_FILE = 1000
+UPDATED_ADDRESS_COUNT = 50
+
+
+def make_counterparty_history(row_count, seed=0):
+    rng = np.random.default_rng(seed)
+    counterparty_count = max(row_count // 4, 1)
+    address_count = max(counterparty_count // 2, 1)
+
+    # Each version of a counterparty is given its own address, so some move
+    # on to or away from an updated address between versions
+    counterparty_ids = rng.integers(1, counterparty_count + 1, row_count)
+    legal_address_ids = rng.integers(1, address_count + 1, row_count)
+    history_df = pd.DataFrame(
+        {
+            "counterparty_id": counterparty_ids,
+            "counterparty_legal_name": "Name",
+            "legal_address_id": legal_address_ids,
+            "commercial_contact": "Contact",
+            "delivery_contact": "Contact",
+            "created_at": "2024-11-20 15:22:10.531518",
+            "last_updated": "2024-11-20 15:22:10.531518",
+        }
+    )
+    frames = [
+        history_df.iloc[i : i + ROWS_PER_FILE].reset_index(drop=True)
+        for i in range(0, row_count, ROWS_PER_FILE)
+    ]
+
+    address_ids = rng.choice(
+        address_count, min(UPDATED_ADDRESS_COUNT, address_count), replace=False
+    )
+    address_df = pd.DataFrame(
+        {
+            "address_id": address_ids + 1,
+            "address_line_1": "Line 1",
+            "address_line_2": None,
+            "district": None,
+            "city": "City",
+            "postal_code": "00000",
+            "country": "Country",
+            "phone": "0000 000000",
+            "created_at": "2024-11-21 09:38:15.221234",
+            "last_updated": "2024-11-21 09:38:15.221234",
+        }
+    )
+    return frames, address_df
+
+
+def per_row_scan(frames, address_df, already_updated_list):
+    # The loop process_address_updates used before it was vectorized. It
+    # takes the newest version of a counterparty that references an updated
+    # address, even when a newer version has since moved to another address
+    updated_address_ids = address_df["address_id"].tolist()
+    already_updated_list = list(already_updated_list)
+    dim_counterparty_df = pd.DataFrame()
+
+    for i in range(len(frames) - 1, -1, -1):
+        working_df = frames[i]
+        for j in range(len(working_df.index) - 1, -1, -1):
+            if working_df.loc[j, "counterparty_id"] not in already_updated_list:
+                if working_df.loc[j, "legal_address_id"] in updated_address_ids:
+                    current_row = working_df.loc[[j]].merge(
+                        address_df, left_on="legal_address_id", right_on="address_id"
+                    )
+                    dim_counterparty_df = pd.concat(
+                        [dim_counterparty_df, current_row], ignore_index=True
+                    )
+                    already_updated_list.append(working_df.loc[j, "counterparty_id"])
+
+    return dim_counterparty_df
+
+
+def vectorized(frames, address_df, already_updated_list):
+    counterparty_df = latest_row_versions(frames, "counterparty_id")
+    return join_address_updates(counterparty_df, address_df, already_updated_list)
+
+
+def newest_versions_only(old_df, frames):
+    # Drops the stale versions the per-row scan picks up for counterparties
+    # whose newest version no longer references an updated address, which the
+    # vectorized path leaves out
+    if old_df.empty:
+        return old_df
+    latest_df = latest_row_versions(frames, "counterparty_id")
+    newest_address_ids = latest_df.set_index("counterparty_id")["legal_address_id"]
+    is_newest = (
+        old_df["counterparty_id"].map(newest_address_ids) == old_df["legal_address_id"]
+    )
+    return old_df[is_newest]
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000])
+    args = parser.parse_args()
+
+    for row_count in args.rows:
+        frames, address_df = make_counterparty_history(row_count)
+
+        new_df, new_time = time_call(vectorized, frames, address_df, [])
+        old_df, old_time = time_call(per_row_scan, frames, address_df, [])
+
+        old_ids = newest_versions_only(old_df, frames)["counterparty_id"].tolist()
+        assert old_ids == new_df["counterparty_id"].tolist()
+
+        print(
+            f"{row_count:>9} rows  vectorized {new_time:8.3f}s  "
+            + f"per-row {old_time:8.3f}s  speedup {old_time / new_time:7.1f}x  "
+            + f"stale versions dropped {len(old_df.index) - len(old_ids)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse, json, multiprocessing, os, resource, tempfile, time
+import pandas as pd
+
+from src.processing_lambda import read_ingested_json
+
+# Times decoding a synthetic sales_order ingestion payload of the given size,
+# comparing json.loads + pd.DataFrame.from_dict with read_ingested_json, and
+# reports how far each raises the peak memory of a fresh process.
+#
+#   python src/utils/benchmark_json_to_arrow.py --megabytes 100
+
+
+def make_sales_order_payload(megabytes):
+    # Written as the ingestion lambda writes it: one JSON array, ", " between
+    # rows, timestamps, dates and numerics as strings
+    rows = []
+    size = 0
+    sales_order_id = 0
+    while size < megabytes * 1024 * 1024:
+        sales_order_id += 1
+        row = json.dumps(
+            {
+                "sales_order_id": sales_order_id,
+                "created_at": "2024-11-21 13:21:09.941000",
+                "last_updated": "2024-11-21 13:21:09.941000",
+                "design_id": sales_order_id % 300 + 1,
+                "staff_id": sales_order_id % 20 + 1,
+                "counterparty_id": sales_order_id % 20 + 1,
+                "units_sold": sales_order_id % 100000,
+                "unit_price": f"{sales_order_id % 400 / 100 + 2:.2f}",
+                "currency_id": sales_order_id % 3 + 1,
+                "agreed_delivery_date": "2024-11-26",
+                "agreed_payment_date": "2024-11-25",
+                "agreed_delivery_location_id": sales_order_id % 30 + 1,
+            }
+        )
+        rows.append(row)
+        size += len(row) + 2
+    return ("[" + ", ".join(rows) + "]").encode("utf-8"), sales_order_id
+
+
+def decode_with_from_dict(payload):
+    return pd.DataFrame.from_dict(json.loads(payload))
+
+
+def decode_with_arrow(payload):
+    return read_ingested_json(payload, "sales_order")
+
+
+DECODERS = {"from_dict": decode_with_from_dict, "arrow": decode_with_arrow}
+
+
+def measure(decoder_name, file_path, results):
+    # Run in a process of its own, so the peak memory is this decode's alone
+    with open(file_path, "rb") as f:
+        payload = f.read()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = DECODERS[decoder_name](payload)
+    seconds = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results.put((decoder_name, len(df.index), seconds, (rss_after - rss_before) / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=100)
+    args = parser.parse_args()
+
+    payload, row_count = make_sales_order_payload(args.megabytes)
+    print(f"{len(payload) / 1024 / 1024:.0f} MB sales_order payload, {row_count} rows")
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        f.write(payload)
+    del payload
+
+    try:
+        results = multiprocessing.Queue()
+        for decoder_name in DECODERS:
+            process = multiprocessing.Process(
+                target=measure, args=(decoder_name, f.name, results)
+            )
+            process.start()
+            decoder_name, rows, seconds, peak_mb = results.get()
+            process.join()
+            print(
+                f"  {decoder_name:>9}: {rows} rows in {seconds:.2f}s, "
+                + f"peak memory +{peak_mb:.0f} MB"
+            )
+    finally:
+        os.remove(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,12 @@
 import pandas as pd
-import pyarrow
-import os
 import logging
 
+from src.processing_lambda import S3StreamWriter, write_processed_parquet
+
 logger = logging.getLogger("logger")
 logger.setLevel(logging.INFO)
 
 def df_to_parquet_in_s3(client, df, bucket_name, folder, file_name):
-    if not os.path.exists("tmp"):
-        os.mkdir("tmp")
-    df.to_parquet(f"./tmp/{file_name}.parquet") 
-
-    client.upload_file(f"./tmp/{file_name}.parquet", bucket_name, f"{folder}/{file_name}.parquet")
+    with S3StreamWriter(client, bucket_name, f"{folder}/{file_name}.parquet") as writer:
+        write_processed_parquet(df, writer, folder)
     logger.info(f'{folder}/{file_name}.parquet uploaded to processing')
-
-    os.remove(f"./tmp/{file_name}.parquet")
\ No newline at end of file
@@ -0,0 +1,58 @@
+import argparse
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+# Reads the rows of the partitioned fact_sales_order dataset created within a
+# date range, opening only the created_date=YYYY-MM-DD partitions in range.
+#
+#   python src/utils/read_fact_sales_order.py <processing-bucket> \
+#       --start 2024-11-01 --end 2024-11-30 --output sales.csv
+
+# Partition values are read as strings, matching the created_date column
+# kept inside each part
+PARTITIONING = ds.partitioning(
+    pa.schema([("created_date", pa.string())]), flavor="hive"
+)
+
+
+def read_fact_sales_order(root, start_date=None, end_date=None, filesystem=None):
+    # root is the fact_sales_order directory, e.g. "bucket/fact_sales_order"
+    # on S3; files directly under it (the unpartitioned layout) and the _runs
+    # manifests are passed over
+    dataset = ds.dataset(
+        root,
+        format="parquet",
+        partitioning=PARTITIONING,
+        filesystem=filesystem or fs.S3FileSystem(),
+    )
+
+    date_filter = ds.field("created_date").is_valid()
+    if start_date:
+        date_filter &= ds.field("created_date") >= start_date
+    if end_date:
+        date_filter &= ds.field("created_date") <= end_date
+
+    return dataset.to_table(filter=date_filter)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("bucket")
+    parser.add_argument("--start", help="first created_date, as YYYY-MM-DD")
+    parser.add_argument("--end", help="last created_date, as YYYY-MM-DD")
+    parser.add_argument("--output", help="CSV file to write the rows to")
+    args = parser.parse_args()
+
+    table = read_fact_sales_order(
+        f"{args.bucket}/fact_sales_order", args.start, args.end
+    )
+    df = table.to_pandas()
+    if args.output:
+        df.to_csv(args.output, index=False)
+    else:
+        print(df)
+
+
+if __name__ == "__main__":
+    main()
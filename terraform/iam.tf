@@ -27,6 +27,20 @@ resource "aws_iam_role" "processing_lambda_role" {
   assume_role_policy = data.aws_iam_policy_document.lambda_trust_policy.json
 }
 
+# INGESTION COMPACTION LAMBDA #
+
+resource "aws_iam_role" "ingestion_compaction_lambda_role" {
+  name_prefix        = "role-${var.project_prefix}${var.ingestion_compaction_lambda_name}"
+  assume_role_policy = data.aws_iam_policy_document.lambda_trust_policy.json
+}
+
+# PARTITION COMPACTION LAMBDA #
+
+resource "aws_iam_role" "partition_compaction_lambda_role" {
+  name_prefix        = "role-${var.project_prefix}${var.partition_compaction_lambda_name}"
+  assume_role_policy = data.aws_iam_policy_document.lambda_trust_policy.json
+}
+
 # UPLOADING LAMBDA #
 
 resource "aws_iam_role" "uploading_lambda_role" {
@@ -67,9 +81,17 @@ resource "aws_iam_role_policy_attachment" "uploading_lambda_secrets_manager_read
 
 data "aws_iam_policy_document" "ingestion_s3_data_policy_doc" {
   statement {
-    actions   = ["s3:PutObject"]
+    actions   = ["s3:PutObject", "s3:AbortMultipartUpload"]
     resources = ["${aws_s3_bucket.ingestion_bucket.arn}/*"]
   }
+  statement {
+    actions   = ["s3:ListBucket"]
+    resources = ["${aws_s3_bucket.ingestion_bucket.arn}"]
+  }
+  statement {
+    actions   = ["s3:GetObject"]
+    resources = ["${aws_s3_bucket.ingestion_bucket.arn}/_manifests/*"]
+  }
 }
 
 resource "aws_iam_policy" "ingestion_s3_write_policy" {
@@ -95,9 +117,17 @@ data "aws_iam_policy_document" "processing_s3_data_policy_doc" {
     resources = ["${aws_s3_bucket.ingestion_bucket.arn}/*"]
   }
   statement {
-    actions   = ["s3:PutObject"]
+    actions   = ["s3:PutObject", "s3:GetObject", "s3:DeleteObject", "s3:AbortMultipartUpload"]
     resources = ["${aws_s3_bucket.processing_bucket.arn}/*"]
   }
+  statement {
+    actions   = ["s3:ListBucket"]
+    resources = ["${aws_s3_bucket.processing_bucket.arn}"]
+  }
+  statement {
+    actions   = ["s3:PutObject", "s3:AbortMultipartUpload"]
+    resources = ["${aws_s3_bucket.ingestion_bucket.arn}/_snapshots/*"]
+  }
 }
 
 resource "aws_iam_policy" "processing_s3_write_policy" {
@@ -111,6 +141,56 @@ resource "aws_iam_role_policy_attachment" "processing_lambda_s3_write_policy_att
   policy_arn = aws_iam_policy.processing_s3_write_policy.arn
 }
 
+# INGESTION COMPACTION LAMBDA S3 PERMISSIONS AND ATTACHMENT
+
+# Writes segments, manifests and retired-object lists to the ingestion
+# bucket, and deletes the objects segments replaced
+data "aws_iam_policy_document" "ingestion_compaction_s3_data_policy_doc" {
+  statement {
+    actions   = ["s3:ListBucket"]
+    resources = ["${aws_s3_bucket.ingestion_bucket.arn}"]
+  }
+  statement {
+    actions   = ["s3:GetObject", "s3:PutObject", "s3:DeleteObject", "s3:AbortMultipartUpload"]
+    resources = ["${aws_s3_bucket.ingestion_bucket.arn}/*"]
+  }
+}
+
+resource "aws_iam_policy" "ingestion_compaction_s3_write_policy" {
+  name_prefix = "s3-policy-${var.project_prefix}${var.ingestion_compaction_lambda_name}-write"
+  policy      = data.aws_iam_policy_document.ingestion_compaction_s3_data_policy_doc.json
+}
+
+resource "aws_iam_role_policy_attachment" "ingestion_compaction_lambda_s3_write_policy_attachment" {
+  role       = aws_iam_role.ingestion_compaction_lambda_role.name
+  policy_arn = aws_iam_policy.ingestion_compaction_s3_write_policy.arn
+}
+
+# PARTITION COMPACTION LAMBDA S3 PERMISSIONS AND ATTACHMENT
+
+# Writes compacted parts and run manifests to the processing bucket, and
+# deletes the parts they replaced
+data "aws_iam_policy_document" "partition_compaction_s3_data_policy_doc" {
+  statement {
+    actions   = ["s3:ListBucket"]
+    resources = ["${aws_s3_bucket.processing_bucket.arn}"]
+  }
+  statement {
+    actions   = ["s3:GetObject", "s3:PutObject", "s3:DeleteObject", "s3:AbortMultipartUpload"]
+    resources = ["${aws_s3_bucket.processing_bucket.arn}/*"]
+  }
+}
+
+resource "aws_iam_policy" "partition_compaction_s3_write_policy" {
+  name_prefix = "s3-policy-${var.project_prefix}${var.partition_compaction_lambda_name}-write"
+  policy      = data.aws_iam_policy_document.partition_compaction_s3_data_policy_doc.json
+}
+
+resource "aws_iam_role_policy_attachment" "partition_compaction_lambda_s3_write_policy_attachment" {
+  role       = aws_iam_role.partition_compaction_lambda_role.name
+  policy_arn = aws_iam_policy.partition_compaction_s3_write_policy.arn
+}
+
 # UPLOADING LAMBDA S3 PERMISSIONS AND ATTACHMENT
 
 data "aws_iam_policy_document" "retrieving_data_from_s3_processing_bucket_policy_doc" {
@@ -118,6 +198,10 @@ data "aws_iam_policy_document" "retrieving_data_from_s3_processing_bucket_policy
     actions   = ["s3:GetObject"]
     resources = ["${aws_s3_bucket.processing_bucket.arn}/*"]
   }
+  statement {
+    actions   = ["s3:ListBucket"]
+    resources = ["${aws_s3_bucket.processing_bucket.arn}"]
+  }
 }
 
 resource "aws_iam_policy" "uploading_s3_read_policy" {
@@ -214,6 +298,56 @@ resource "aws_iam_role_policy_attachment" "uploading_lambda_cloudwatch_logs_poli
   policy_arn = aws_iam_policy.uploading_cloudwatch_logs_policy.arn
 }
 
+# INGESTION COMPACTION CLOUDWATCH LOGS POLICY AND ATTACHMENT TO LAMBDA ROLE
+
+data "aws_iam_policy_document" "ingestion_compaction_cloudwatch_logs_policy_document" {
+  statement {
+    actions = ["logs:CreateLogGroup"]
+    resources = [
+      "arn:aws:logs:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:*"
+    ]
+  }
+  statement {
+    actions   = ["logs:CreateLogStream", "logs:PutLogEvents"]
+    resources = ["arn:aws:logs:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:log-group:/aws/lambda/${var.project_prefix}${var.ingestion_compaction_lambda_name}:*"]
+  }
+}
+
+resource "aws_iam_policy" "ingestion_compaction_cloudwatch_logs_policy" {
+  name   = "ingestion_compaction_cloudwatch_logs_policy"
+  policy = data.aws_iam_policy_document.ingestion_compaction_cloudwatch_logs_policy_document.json
+}
+
+resource "aws_iam_role_policy_attachment" "ingestion_compaction_lambda_cloudwatch_logs_policy_attachment" {
+  role       = aws_iam_role.ingestion_compaction_lambda_role.name
+  policy_arn = aws_iam_policy.ingestion_compaction_cloudwatch_logs_policy.arn
+}
+
+# PARTITION COMPACTION CLOUDWATCH LOGS POLICY AND ATTACHMENT TO LAMBDA ROLE
+
+data "aws_iam_policy_document" "partition_compaction_cloudwatch_logs_policy_document" {
+  statement {
+    actions = ["logs:CreateLogGroup"]
+    resources = [
+      "arn:aws:logs:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:*"
+    ]
+  }
+  statement {
+    actions   = ["logs:CreateLogStream", "logs:PutLogEvents"]
+    resources = ["arn:aws:logs:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:log-group:/aws/lambda/${var.project_prefix}${var.partition_compaction_lambda_name}:*"]
+  }
+}
+
+resource "aws_iam_policy" "partition_compaction_cloudwatch_logs_policy" {
+  name   = "partition_compaction_cloudwatch_logs_policy"
+  policy = data.aws_iam_policy_document.partition_compaction_cloudwatch_logs_policy_document.json
+}
+
+resource "aws_iam_role_policy_attachment" "partition_compaction_lambda_cloudwatch_logs_policy_attachment" {
+  role       = aws_iam_role.partition_compaction_lambda_role.name
+  policy_arn = aws_iam_policy.partition_compaction_cloudwatch_logs_policy.arn
+}
+
 ########################################################################## 
 
 ## STATE MACHINE ##
@@ -298,6 +432,14 @@ data "aws_iam_policy_document" "scheduler_policy_document" {
     resources = [aws_sfn_state_machine.sfn_state_machine.arn]
   }
 
+  statement {
+    actions   = ["lambda:InvokeFunction"]
+    resources = [
+      aws_lambda_function.ingestion_compaction_lambda.arn,
+      aws_lambda_function.partition_compaction_lambda.arn
+    ]
+  }
+
 }
 
 resource "aws_iam_policy" "scheduler_policy" {
@@ -10,7 +10,9 @@ resource "aws_lambda_function" "ingestion_lambda" {
   memory_size      = 512
   source_code_hash = filebase64sha256("${path.module}/../src/${var.ingestion_lambda_filename}.py")
   publish          = true
-  layers           = [aws_lambda_layer_version.dependencies.arn]
+  # Later layers take precedence, so the pinned boto3 in the dependencies
+  # layer is the one imported
+  layers           = ["arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python39:26", aws_lambda_layer_version.dependencies.arn]
 
   depends_on = [
     aws_s3_object.ingestion_lambda_code,
@@ -38,18 +40,21 @@ resource "aws_lambda_function" "processing_lambda" {
   publish          = true
   layers = [
     "arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python39:26",
-    aws_lambda_layer_version.processing_dependencies.arn
+    aws_lambda_layer_version.processing_dependencies.arn,
+    aws_lambda_layer_version.dependencies.arn
   ]
 
   depends_on = [
     aws_s3_object.processing_lambda_code,
-    aws_s3_object.processing_lambda_layer
+    aws_s3_object.processing_lambda_layer,
+    aws_s3_object.lambda_layer
   ]
 
   environment {
     variables = {
-      INGESTION_BUCKET_NAME  = aws_s3_bucket.ingestion_bucket.id,
-      PROCESSING_BUCKET_NAME = aws_s3_bucket.processing_bucket.id
+      INGESTION_BUCKET_NAME                 = aws_s3_bucket.ingestion_bucket.id,
+      PROCESSING_BUCKET_NAME                = aws_s3_bucket.processing_bucket.id,
+      PROCESSING_PARTITION_FACT_SALES_ORDER = var.partition_fact_sales_order
     }
   }
 }
@@ -80,3 +85,70 @@ resource "aws_lambda_function" "uploading_lambda" {
   }
 }
 
+# Merges the ingestion bucket's small per-run objects into day segments. It
+# ships in the processing lambda's package, and reads every object of a day,
+# so it gets more time and memory than the ETL lambdas.
+resource "aws_lambda_function" "ingestion_compaction_lambda" {
+
+  function_name    = "${var.project_prefix}${var.ingestion_compaction_lambda_name}"
+  role             = aws_iam_role.ingestion_compaction_lambda_role.arn
+  s3_bucket        = aws_s3_bucket.code_bucket.id
+  s3_key           = aws_s3_object.processing_lambda_code.key
+  handler          = "${var.processing_lambda_filename}.ingestion_compaction_lambda_handler"
+  runtime          = var.python_runtime
+  timeout          = 900
+  memory_size      = 1024
+  source_code_hash = data.archive_file.processing_lambda_zip.output_base64sha256
+  publish          = true
+  layers = [
+    "arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python39:26",
+    aws_lambda_layer_version.processing_dependencies.arn,
+    aws_lambda_layer_version.dependencies.arn
+  ]
+
+  depends_on = [
+    aws_s3_object.processing_lambda_code,
+    aws_s3_object.processing_lambda_layer,
+    aws_s3_object.lambda_layer
+  ]
+
+  environment {
+    variables = {
+      INGESTION_BUCKET_NAME = aws_s3_bucket.ingestion_bucket.id
+    }
+  }
+}
+
+# Merges the small per-run parts of partitioned processed tables. It ships in
+# the processing lambda's package, like the ingestion compaction job.
+resource "aws_lambda_function" "partition_compaction_lambda" {
+
+  function_name    = "${var.project_prefix}${var.partition_compaction_lambda_name}"
+  role             = aws_iam_role.partition_compaction_lambda_role.arn
+  s3_bucket        = aws_s3_bucket.code_bucket.id
+  s3_key           = aws_s3_object.processing_lambda_code.key
+  handler          = "${var.processing_lambda_filename}.compaction_lambda_handler"
+  runtime          = var.python_runtime
+  timeout          = 900
+  memory_size      = 1024
+  source_code_hash = data.archive_file.processing_lambda_zip.output_base64sha256
+  publish          = true
+  layers = [
+    "arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python39:26",
+    aws_lambda_layer_version.processing_dependencies.arn,
+    aws_lambda_layer_version.dependencies.arn
+  ]
+
+  depends_on = [
+    aws_s3_object.processing_lambda_code,
+    aws_s3_object.processing_lambda_layer,
+    aws_s3_object.lambda_layer
+  ]
+
+  environment {
+    variables = {
+      PROCESSING_BUCKET_NAME                = aws_s3_bucket.processing_bucket.id,
+      PROCESSING_PARTITION_FACT_SALES_ORDER = var.partition_fact_sales_order
+    }
+  }
+}
@@ -11,4 +11,14 @@ resource "aws_cloudwatch_log_group" "processing_lambda_log_group" {
 resource "aws_cloudwatch_log_group" "uploading_lambda_log_group" {
   name              = "/aws/lambda/${var.project_prefix}${var.uploading_lambda_name}"
   retention_in_days = 7
-}
\ No newline at end of file
+}
+
+resource "aws_cloudwatch_log_group" "ingestion_compaction_lambda_log_group" {
+  name              = "/aws/lambda/${var.project_prefix}${var.ingestion_compaction_lambda_name}"
+  retention_in_days = 7
+}
+
+resource "aws_cloudwatch_log_group" "partition_compaction_lambda_log_group" {
+  name              = "/aws/lambda/${var.project_prefix}${var.partition_compaction_lambda_name}"
+  retention_in_days = 7
+}
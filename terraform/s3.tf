@@ -15,6 +15,39 @@ resource "aws_s3_bucket" "processing_bucket" {
   bucket_prefix = "${var.project_prefix}${var.processing_bucket_prefix}"
 }
 
+# Streamed uploads abort themselves when they fail, but not when the lambda
+# times out or is killed, so leftover parts are cleaned up here as well
+
+resource "aws_s3_bucket_lifecycle_configuration" "ingestion_bucket_lifecycle" {
+  bucket = aws_s3_bucket.ingestion_bucket.id
+
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "processing_bucket_lifecycle" {
+  bucket = aws_s3_bucket.processing_bucket.id
+
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
+
 ##LAMBDA CODE##
 
 resource "aws_s3_object" "ingestion_lambda_code" {
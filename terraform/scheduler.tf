@@ -13,3 +13,39 @@ resource "aws_scheduler_schedule" "state_machine_scheduler" {
     role_arn = aws_iam_role.scheduler_role.arn
   }
 }
+
+resource "aws_scheduler_schedule" "ingestion_compaction_scheduler" {
+  name       = "${var.project_prefix}${var.ingestion_compaction_scheduler_name}"
+  group_name = "default"
+
+  flexible_time_window {
+    mode = "OFF"
+  }
+
+  # Early each morning, once the previous day has been ingested
+  schedule_expression = "cron(30 2 * * ? *)"
+
+  target {
+    arn      = aws_lambda_function.ingestion_compaction_lambda.arn
+    role_arn = aws_iam_role.scheduler_role.arn
+    input    = jsonencode({ Granularity = "day" })
+  }
+}
+
+resource "aws_scheduler_schedule" "partition_compaction_scheduler" {
+  name       = "${var.project_prefix}${var.partition_compaction_scheduler_name}"
+  group_name = "default"
+
+  flexible_time_window {
+    mode = "OFF"
+  }
+
+  # Early each morning, once the previous day's parts have all been written
+  schedule_expression = "cron(0 3 * * ? *)"
+
+  target {
+    arn      = aws_lambda_function.partition_compaction_lambda.arn
+    role_arn = aws_iam_role.scheduler_role.arn
+    input    = jsonencode({ MinAgeHours = 24 })
+  }
+}
@@ -96,4 +96,30 @@ variable "processing_lambda_name" {
 variable "uploading_lambda_name" {
   type    = string
   default = "uploading-lambda"
-}
\ No newline at end of file
+}
+
+variable "ingestion_compaction_lambda_name" {
+  type    = string
+  default = "ingestion-compaction-lambda"
+}
+
+variable "ingestion_compaction_scheduler_name" {
+  type    = string
+  default = "ingestion-compaction-scheduler"
+}
+
+variable "partition_compaction_lambda_name" {
+  type    = string
+  default = "partition-compaction-lambda"
+}
+
+variable "partition_compaction_scheduler_name" {
+  type    = string
+  default = "partition-compaction-scheduler"
+}
+
+# "true" writes fact_sales_order as one part per created_date and run
+variable "partition_fact_sales_order" {
+  type    = string
+  default = "false"
+}
@@ -0,0 +1,193 @@
+from src.processing_lambda import (
+    compact_ingested_objects,
+    fetch_ingested_rows,
+    scan_latest_row_versions,
+    read_ingestion_manifest,
+)
+from src.ingestion_lambda import save_table_rows, append_to_manifest
+import src.processing_lambda
+import pytest, os, boto3, datetime
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_bucket(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(
+            Bucket="test_bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3
+
+
+columns = ["address_id", "city", "last_updated"]
+TODAY = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def ingest(s3_client, file_stem, rows):
+    entry = save_table_rows(
+        s3_client, "test_bucket", "address", rows, columns, file_stem
+    )
+    append_to_manifest(s3_client, "test_bucket", "address", [entry])
+
+
+@pytest.fixture
+def ingested_history(s3_bucket):
+    ingest(
+        s3_bucket,
+        "2024-11-20 09:00:00.000000",
+        [[1, "Leeds", "2024-11-20 08:59:00.000000"], [2, "York", "2024-11-20"]],
+    )
+    ingest(
+        s3_bucket,
+        "2024-11-20 15:00:00.000000",
+        [[1, "Hull", "2024-11-20 14:59:00.000000"]],
+    )
+    ingest(
+        s3_bucket,
+        "2024-11-21 09:00:00.000000",
+        [[3, "Bath", "2024-11-21 08:59:00.000000"]],
+    )
+    ingest(s3_bucket, TODAY, [[1, "Ely", TODAY]])
+    yield s3_bucket
+
+
+def manifest_keys(s3_client):
+    return [
+        entry["key"]
+        for entry in read_ingestion_manifest(s3_client, "test_bucket", "address")
+    ]
+
+
+def test_compacts_each_ended_day_into_a_segment_in_the_manifest(ingested_history):
+    counts = compact_ingested_objects(ingested_history, "test_bucket", "address")
+
+    assert counts == {
+        "deleted_objects": 0,
+        "segments": 1,
+        "source_objects": 2,
+        "source_rows": 3,
+        "rows": 2,
+    }
+    assert manifest_keys(ingested_history) == [
+        "address/2024-11-20 15:00:00.000000~day-segment.parquet",
+        "address/2024-11-21 09:00:00.000000.json",
+        f"address/{TODAY}.json",
+    ]
+
+    manifest = read_ingestion_manifest(ingested_history, "test_bucket", "address")
+    segment_entry = manifest[0]
+    assert segment_entry["source_objects"] == 2
+    assert segment_entry["source_rows"] == 3
+    assert (segment_entry["min_id"], segment_entry["max_id"]) == (1, 2)
+
+
+def test_compacted_history_gives_the_same_latest_rows(ingested_history):
+    before = scan_latest_row_versions(
+        ingested_history, "test_bucket", "address", [1, 2, 3]
+    )
+
+    compact_ingested_objects(ingested_history, "test_bucket", "address")
+    after = scan_latest_row_versions(
+        ingested_history, "test_bucket", "address", [1, 2, 3]
+    )
+
+    assert after.sort_values("address_id")["city"].tolist() == ["Ely", "York", "Bath"]
+    assert (
+        after.sort_values("address_id")
+        .reset_index(drop=True)
+        .equals(before.sort_values("address_id").reset_index(drop=True))
+    )
+
+
+def test_replaced_objects_are_deleted_after_the_grace_period(
+    ingested_history, monkeypatch
+):
+    compact_ingested_objects(ingested_history, "test_bucket", "address")
+    assert ingested_history.head_object(
+        Bucket="test_bucket", Key="address/2024-11-20 09:00:00.000000.json"
+    )
+
+    monkeypatch.setattr(src.processing_lambda, "RETIRED_OBJECT_GRACE_HOURS", 0)
+    counts = compact_ingested_objects(ingested_history, "test_bucket", "address")
+
+    assert counts["deleted_objects"] == 2
+    listed = ingested_history.list_objects_v2(Bucket="test_bucket", Prefix="address/")
+    assert "address/2024-11-20 09:00:00.000000.json" not in [
+        obj["Key"] for obj in listed["Contents"]
+    ]
+
+
+def test_replaying_a_compacted_run_raises_a_clear_error(ingested_history, monkeypatch):
+    monkeypatch.setattr(src.processing_lambda, "RETIRED_OBJECT_GRACE_HOURS", 0)
+    compact_ingested_objects(ingested_history, "test_bucket", "address")
+    compact_ingested_objects(ingested_history, "test_bucket", "address")
+
+    with pytest.raises(RuntimeError, match="compacted into address/2024-11-20 15"):
+        fetch_ingested_rows(
+            ingested_history, "test_bucket", "address", "2024-11-20 09:00:00.000000"
+        )
+
+    # Runs of periods not yet compacted still read as before
+    output_df = fetch_ingested_rows(
+        ingested_history, "test_bucket", "address", "2024-11-21 09:00:00.000000"
+    )
+    assert output_df["city"].tolist() == ["Bath"]
+
+
+def test_monthly_compaction_merges_day_segments(ingested_history):
+    compact_ingested_objects(ingested_history, "test_bucket", "address")
+    counts = compact_ingested_objects(
+        ingested_history, "test_bucket", "address", granularity="month"
+    )
+
+    assert counts["source_objects"] == 2
+    assert manifest_keys(ingested_history) == [
+        "address/2024-11-21 09:00:00.000000~month-segment.parquet",
+        f"address/{TODAY}.json",
+    ]
+
+
+def test_swap_is_reapplied_when_the_manifest_changes_meanwhile(
+    ingested_history, monkeypatch
+):
+    put_object = ingested_history.put_object
+    conflicts = []
+
+    def conflicting_put_object(**kwargs):
+        # An ingestion run appends to the manifest between the compaction
+        # reading it and swapping it
+        if "IfMatch" in kwargs and not conflicts:
+            conflicts.append(kwargs["Key"])
+            ingest(
+                ingested_history,
+                "2099-01-01 00:00:00.000000",
+                [[4, "Wells", "2099-01-01"]],
+            )
+            raise ClientError(
+                {"Error": {"Code": "PreconditionFailed", "Message": ""}}, "PutObject"
+            )
+        return put_object(**kwargs)
+
+    monkeypatch.setattr(ingested_history, "put_object", conflicting_put_object)
+    compact_ingested_objects(ingested_history, "test_bucket", "address")
+
+    assert conflicts == ["_manifests/address.jsonl"]
+    assert manifest_keys(ingested_history) == [
+        "address/2024-11-20 15:00:00.000000~day-segment.parquet",
+        "address/2024-11-21 09:00:00.000000.json",
+        f"address/{TODAY}.json",
+        "address/2099-01-01 00:00:00.000000.json",
+    ]
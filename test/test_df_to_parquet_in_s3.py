@@ -1,6 +1,5 @@
-from unittest.mock import patch, Mock
 from moto import mock_aws
-import pytest, os, boto3, io, random, string
+import pytest, os, boto3, io
 import pandas as pd
 
 from src.processing_lambda import df_to_parquet_in_s3
@@ -75,47 +74,3 @@ def test_df_to_parquet_in_s3_creates_parquet_and_uploads_to_s3(s3_with_bucket):
     )
     assert all(df["currency_code"].isin(["GBP", "EUR", "USD"]).values)
     assert len(df.index) == 3
-
-
-def test_df_to_parquet_in_s3_makes_root_tmp_dir_if_none_exists(s3_with_bucket):
-    # Create patch for os.path.exists
-    path_exists_patcher = patch(
-        "src.processing_lambda.os.path.exists", return_value=False
-    )
-
-    # Create patch for os.mkdir
-    while True:
-        rand_dir = "".join(
-            random.choice(string.ascii_uppercase + string.digits) for _ in range(3)
-        )
-        if not os.path.exists(rand_dir):
-            break
-
-    def prepend_path(func):
-        def function_invoker(path):
-            func(rand_dir)
-            func(rand_dir + path)
-
-        return function_invoker
-
-    mkdir_patcher = patch(
-        "src.processing_lambda.os.mkdir", side_effect=prepend_path(os.mkdir)
-    )
-
-    # Begin testing
-    path_exists_patcher.start()
-    mkdir_patcher.start()
-
-    test_dict = [{"column": "value"}]
-    test_df = pd.DataFrame.from_dict(test_dict)
-    df_to_parquet_in_s3(
-        s3_with_bucket, test_df, "test-bucket", "test-folder", "test-file-name"
-    )
-
-    path_exists_patcher.stop()
-    mkdir_patcher.stop()
-
-    assert os.path.exists(f"{rand_dir}/tmp")
-
-    os.rmdir(f"{rand_dir}/tmp")
-    os.rmdir(rand_dir)
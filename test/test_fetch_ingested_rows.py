@@ -0,0 +1,319 @@
+from src.processing_lambda import fetch_ingested_rows
+from src.ingestion_lambda import (
+    rows_to_parquet,
+    csv_to_parquet,
+    rows_to_json_in_s3,
+    compressed,
+    zip_dictionary,
+    format_to_json,
+)
+from decimal import Decimal
+from datetime import datetime
+import pytest, os, boto3, json, io
+import pandas as pd
+from moto import mock_aws
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        yield s3
+
+
+@pytest.fixture
+def s3_bucket(s3_client):
+    s3_client.create_bucket(
+        Bucket="test_bucket",
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+    )
+    yield s3_client
+
+
+def test_fetch_ingested_rows_reads_single_file(s3_bucket):
+    s3_bucket.upload_file(
+        Bucket="test_bucket",
+        Filename="test/test_data/currency/2024-11-20 15_22_10.531518.json",
+        Key="currency/2024-11-20 15_22_10.531518.json",
+    )
+
+    output_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "currency", "2024-11-20 15_22_10.531518"
+    )
+
+    assert isinstance(output_df, pd.DataFrame)
+    assert output_df["currency_code"].tolist() == ["GBP", "USD", "EUR"]
+
+
+def test_fetch_ingested_rows_concatenates_part_files_in_order(s3_bucket):
+    with open("test/test_data/currency/2024-11-20 15_22_10.531518.json") as f:
+        rows = json.load(f)
+
+    for i, part in enumerate([rows[:2], rows[2:]]):
+        s3_bucket.put_object(
+            Bucket="test_bucket",
+            Key=f"currency/2024-11-20 15_22_10.531518.part-{i:05d}.json",
+            Body=json.dumps(part),
+        )
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="currency/2024-11-21 09_38_15.221234.part-00000.json",
+        Body=json.dumps(rows[:1]),
+    )
+
+    output_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "currency", "2024-11-20 15_22_10.531518"
+    )
+
+    assert output_df["currency_code"].tolist() == ["GBP", "USD", "EUR"]
+    assert len(output_df.index) == 3
+
+
+def test_fetch_ingested_rows_reads_copy_csv_file(s3_bucket):
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="currency/2024-11-20 15_22_10.531518.csv",
+        Body=(
+            "currency_id,currency_code,created_at,last_updated\n"
+            + "1,GBP,2022-11-03 14:20:49.962,2022-11-03 14:20:49.962\n"
+            + "2,USD,2022-11-03 14:20:49.962,2022-11-03 14:20:49.962\n"
+        ),
+    )
+
+    output_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "currency", "2024-11-20 15_22_10.531518"
+    )
+
+    assert output_df["currency_id"].tolist() == [1, 2]
+    assert output_df["currency_code"].tolist() == ["GBP", "USD"]
+    assert output_df.loc[0, "created_at"] == "2022-11-03 14:20:49.962000"
+
+
+def test_fetch_ingested_rows_reads_copy_csv_like_the_equivalent_json(s3_bucket):
+    column_names = [
+        "address_id",
+        "address_line_1",
+        "address_line_2",
+        "district",
+        "city",
+        "postal_code",
+        "country",
+        "phone",
+        "created_at",
+        "last_updated",
+    ]
+    rows = [
+        [
+            1,
+            "6826 Herzog Via",
+            None,
+            "Avon",
+            "New Patienceburgh",
+            "01803",
+            "Turkey",
+            "1803 637401",
+            datetime(2022, 11, 3, 14, 20, 49, 962000),
+            datetime(2022, 11, 3, 14, 20, 49),
+        ],
+        [
+            2,
+            "179 Alexie Cliffs",
+            "",
+            None,
+            "Aliso Viejo",
+            "99305-7380",
+            "San Marino",
+            "9621 880720",
+            datetime(2022, 11, 3, 14, 20, 49, 962000),
+            datetime(2022, 11, 3, 14, 20, 49, 962000),
+        ],
+    ]
+
+    # As COPY ... TO STDOUT WITH (FORMAT csv, HEADER true) writes the rows
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="address/2024-11-20 15_22_10.531518.csv",
+        Body=(
+            ",".join(column_names)
+            + "\n"
+            + "1,6826 Herzog Via,,Avon,New Patienceburgh,01803,Turkey,1803 637401,"
+            + "2022-11-03 14:20:49.962,2022-11-03 14:20:49\n"
+            + '2,179 Alexie Cliffs,"",,Aliso Viejo,99305-7380,San Marino,'
+            + "9621 880720,2022-11-03 14:20:49.962,2022-11-03 14:20:49.962\n"
+        ),
+    )
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="address/2024-11-21 09_38_15.221234.json",
+        Body=format_to_json(zip_dictionary(rows, column_names)),
+    )
+
+    csv_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "address", "2024-11-20 15_22_10.531518"
+    )
+    json_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "address", "2024-11-21 09_38_15.221234"
+    )
+
+    pd.testing.assert_frame_equal(csv_df, json_df)
+    assert csv_df["postal_code"].tolist() == ["01803", "99305-7380"]
+    assert csv_df["address_line_2"].tolist() == [None, ""]
+
+
+def test_fetch_ingested_rows_reads_parquet_like_the_equivalent_json(s3_bucket):
+    columns = [
+        {"name": "sales_order_id", "type_oid": 23, "type_modifier": -1},
+        {"name": "created_at", "type_oid": 1114, "type_modifier": -1},
+        {"name": "unit_price", "type_oid": 1700, "type_modifier": 655366},
+        {"name": "agreed_delivery_date", "type_oid": 1043, "type_modifier": -1},
+    ]
+    rows = [
+        [11599, datetime(2024, 12, 11, 8, 5, 9, 817000), Decimal("2.93"), "2024-12-16"],
+        [11600, datetime(2024, 12, 11, 8, 6, 1, 1000), Decimal("12.50"), "2024-12-17"],
+    ]
+    column_names = [column["name"] for column in columns]
+
+    parquet_buffer = io.BytesIO()
+    rows_to_parquet(rows, columns, parquet_buffer)
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="sales_order/2024-12-11 17:06:41.003418.parquet",
+        Body=parquet_buffer.getvalue(),
+    )
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="sales_order/2024-12-11 17:21:41.003418.json",
+        Body=format_to_json(zip_dictionary(rows, column_names)),
+    )
+
+    parquet_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "sales_order", "2024-12-11 17:06:41.003418"
+    )
+    json_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "sales_order", "2024-12-11 17:21:41.003418"
+    )
+
+    assert parquet_df.to_dict("records") == json_df.to_dict("records")
+    assert parquet_df.loc[0, "created_at"] == "2024-12-11 08:05:09.817000"
+    assert parquet_df.loc[1, "unit_price"] == "12.50"
+
+
+def test_fetch_ingested_rows_reads_copy_parquet_like_the_row_path(s3_bucket):
+    columns = [
+        {"name": "address_id", "type_oid": 23, "type_modifier": -1},
+        {"name": "address_line_2", "type_oid": 1043, "type_modifier": -1},
+        {"name": "postal_code", "type_oid": 1043, "type_modifier": -1},
+        {"name": "phone", "type_oid": 1043, "type_modifier": -1},
+        {"name": "created_at", "type_oid": 1114, "type_modifier": -1},
+        {"name": "last_updated", "type_oid": 1114, "type_modifier": -1},
+    ]
+    rows = [
+        [
+            1,
+            None,
+            "01803",
+            "1803637401",
+            datetime(2022, 11, 3, 14, 20, 49, 962000),
+            datetime(2022, 11, 3, 14, 20, 49),
+        ],
+        [
+            2,
+            "",
+            "99305",
+            "9621880720",
+            datetime(2022, 11, 3, 14, 20, 49, 962000),
+            datetime(2022, 11, 3, 14, 20, 49, 962000),
+        ],
+    ]
+    column_names = [column["name"] for column in columns]
+
+    # As COPY ... TO STDOUT WITH (FORMAT csv, HEADER true) writes the rows
+    csv_buffer = io.BytesIO(
+        b"address_id,address_line_2,postal_code,phone,created_at,last_updated\n"
+        + b"1,,01803,1803637401,2022-11-03 14:20:49.962,2022-11-03 14:20:49\n"
+        + b'2,"",99305,9621880720,2022-11-03 14:20:49.962,2022-11-03 14:20:49.962\n'
+    )
+    copy_buffer = io.BytesIO()
+    csv_to_parquet(csv_buffer, columns, copy_buffer)
+    rows_buffer = io.BytesIO()
+    rows_to_parquet(rows, columns, rows_buffer)
+
+    for key, body in [
+        ("address/2024-12-11 17:06:41.003418.parquet", copy_buffer.getvalue()),
+        ("address/2024-12-11 17:21:41.003418.parquet", rows_buffer.getvalue()),
+        (
+            "address/2024-12-11 17:36:41.003418.json",
+            format_to_json(zip_dictionary(rows, column_names)),
+        ),
+    ]:
+        s3_bucket.put_object(Bucket="test_bucket", Key=key, Body=body)
+
+    copy_df, rows_df, json_df = [
+        fetch_ingested_rows(s3_bucket, "test_bucket", "address", check_time)
+        for check_time in [
+            "2024-12-11 17:06:41.003418",
+            "2024-12-11 17:21:41.003418",
+            "2024-12-11 17:36:41.003418",
+        ]
+    ]
+
+    pd.testing.assert_frame_equal(copy_df, rows_df)
+    assert copy_df.to_dict("records") == json_df.to_dict("records")
+    assert copy_df["postal_code"].tolist() == ["01803", "99305"]
+    assert copy_df["address_line_2"].tolist() == [None, ""]
+    assert copy_df.loc[0, "created_at"] == "2022-11-03 14:20:49.962000"
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_fetch_ingested_rows_decompresses_compressed_json_and_csv(
+    s3_bucket, compression
+):
+    with open("test/test_data/currency/2024-11-20 15_22_10.531518.json") as f:
+        rows = json.load(f)
+    columns = list(rows[0])
+
+    rows_to_json_in_s3(
+        s3_bucket,
+        [list(row.values()) for row in rows],
+        columns,
+        "test_bucket",
+        "currency",
+        "2024-11-20 15_22_10.531518.json",
+        compression,
+    )
+    keys = [
+        obj["Key"]
+        for obj in s3_bucket.list_objects_v2(Bucket="test_bucket")["Contents"]
+    ]
+    suffix = {"gzip": ".gz", "zstd": ".zst"}[compression]
+    assert keys == [f"currency/2024-11-20 15_22_10.531518.json{suffix}"]
+
+    output_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "currency", "2024-11-20 15_22_10.531518"
+    )
+    assert output_df.to_dict("records") == rows
+
+    csv_buffer = io.BytesIO()
+    with compressed(csv_buffer, compression) as stream:
+        stream.write(b"currency_id,currency_code\n1,GBP\n2,USD\n")
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key=f"currency/2024-11-21 09_38_15.221234.csv{suffix}",
+        Body=csv_buffer.getvalue(),
+    )
+
+    output_df = fetch_ingested_rows(
+        s3_bucket, "test_bucket", "currency", "2024-11-21 09_38_15.221234"
+    )
+    assert output_df["currency_id"].tolist() == [1, 2]
+    assert output_df["currency_code"].tolist() == ["GBP", "USD"]
@@ -1,4 +1,4 @@
-from src.processing_lambda import fetch_latest_row_versions
+from src.processing_lambda import fetch_latest_row_versions, update_latest_rows_snapshot
 import pytest, os, boto3
 import pandas as pd
 from moto import mock_aws
@@ -36,6 +36,7 @@ def test_single_file_with_correct_id_returns_expected_single_row_dataframe(s3_bu
         Filename="test/test_data/sales_order/2024-11-21 13_32_38.364280.json",
         Key="sales_order/2024-11-21 13_32_38.364280.json",
     )
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
     output_df = fetch_latest_row_versions(
         s3_bucket, "test_bucket", "sales_order", [11283]
     )
@@ -74,6 +75,7 @@ def test_seeking_one_id_in_multiple_matching_files_returns_expected_single_row_d
         Key="sales_order/2024-11-21 16_02_38.340563.json",
     )
 
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
     output_df = fetch_latest_row_versions(
         s3_bucket, "test_bucket", "sales_order", [11283]
     )
@@ -110,6 +112,7 @@ def test_seeking_multiple_ids_in_multiple_files_returns_expected_dataframe(s3_bu
         Key="sales_order/2024-11-21 16_02_38.340563.json",
     )
 
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
     output_df = fetch_latest_row_versions(
         s3_bucket, "test_bucket", "sales_order", [11283, 11285, 11291]
     )
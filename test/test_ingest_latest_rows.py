@@ -3,12 +3,13 @@ from decimal import Decimal
 from datetime import datetime
 from copy import deepcopy
 from moto import mock_aws
-import pytest, os, boto3
+import pytest, os, boto3, json, io
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 
 from src.ingestion_lambda import ingest_latest_rows
 
-
 ##########################################
 ####                                  ####
 ####     FIXTURES FOR MOCKING AWS     ####
@@ -273,7 +274,10 @@ def connection_patcher():
 @pytest.fixture
 def patch_data():
     def data_handler(mock_data):
-        return patch("src.ingestion_lambda.get_data", return_value=mock_data)
+        return patch(
+            "src.ingestion_lambda.get_table_data",
+            side_effect=lambda db, table, last_update: mock_data[table],
+        )
 
     return data_handler
 
@@ -466,3 +470,332 @@ def test_integration_ingest_latest_creates_json_file_in_s3(
     )
     object_data = object["Body"].read().decode("UTF-8")
     assert object_data == expected_json
+
+
+def test_integration_ingest_latest_in_batches_creates_numbered_part_files(
+    s3_with_bucket, connection_patcher, mock_sales_order_data
+):
+    last_update = "2024-12-11 16:51:37.123092"
+    current_update = "2024-12-11 17:06:41.003418"
+
+    rows, columns = mock_sales_order_data["sales_order"]
+    second_row = deepcopy(rows[0])
+    second_row[0] = 11600
+
+    def mock_stream(db, table, last_update, batch_size):
+        if table == "sales_order":
+            yield rows, columns
+            yield [second_row], columns
+
+    connection_patcher.start()
+    stream_patcher = patch(
+        "src.ingestion_lambda.stream_table_data", side_effect=mock_stream
+    )
+    stream_patcher.start()
+
+    output = ingest_latest_rows(
+        s3_with_bucket, "test-bucket", last_update, current_update, batch_size=1
+    )
+
+    stream_patcher.stop()
+    connection_patcher.stop()
+
+    assert output["HasNewRows"]["sales_order"] is True
+    assert output["HasNewRows"]["payment"] is False
+    assert output["LastCheckedTime"] == current_update
+
+    s3_objects = s3_with_bucket.list_objects_v2(Bucket="test-bucket")
+    assert [obj["Key"] for obj in s3_objects["Contents"]] == [
+        "sales_order/2024-12-11 17:06:41.003418.part-00000.json",
+        "sales_order/2024-12-11 17:06:41.003418.part-00001.json",
+    ]
+
+    object = s3_with_bucket.get_object(
+        Bucket="test-bucket",
+        Key="sales_order/2024-12-11 17:06:41.003418.part-00001.json",
+    )
+    object_data = json.loads(object["Body"].read().decode("UTF-8"))
+    assert len(object_data) == 1
+    assert object_data[0]["sales_order_id"] == 11600
+
+
+def test_concurrent_ingest_matches_sequential_output_and_bounds_connections(
+    s3_with_bucket, mock_empty_data, mock_sales_order_data, mock_payment_data
+):
+    last_update = "2024-12-11 16:51:37.123092"
+    current_update = "2024-12-11 17:06:41.003418"
+
+    mock_data = mock_empty_data
+    mock_data["sales_order"] = mock_sales_order_data["sales_order"]
+    mock_data["payment"] = mock_payment_data["payment"]
+
+    opened_connections = []
+
+    def mock_connect():
+        mock_conn = Mock()
+        mock_conn.close.return_value = None
+        opened_connections.append(mock_conn)
+        return mock_conn
+
+    def mock_get_table_data(db, table, last_update):
+        return mock_data[table]
+
+    connect_patcher = patch(
+        "src.ingestion_lambda.connect_to_db", side_effect=mock_connect
+    )
+    table_data_patcher = patch(
+        "src.ingestion_lambda.get_table_data", side_effect=mock_get_table_data
+    )
+    connect_patcher.start()
+    table_data_patcher.start()
+
+    output = ingest_latest_rows(
+        s3_with_bucket,
+        "test-bucket",
+        last_update,
+        current_update,
+        workers=4,
+        max_connections=2,
+    )
+
+    connect_patcher.stop()
+    table_data_patcher.stop()
+
+    assert output == {
+        "HasNewRows": {
+            "counterparty": False,
+            "currency": False,
+            "department": False,
+            "design": False,
+            "staff": False,
+            "sales_order": True,
+            "address": False,
+            "payment": True,
+            "purchase_order": False,
+            "payment_type": False,
+            "transaction": False,
+        },
+        "LastCheckedTime": "2024-12-11 17:06:41.003418",
+    }
+    assert list(output["HasNewRows"]) == list(mock_data)
+
+    assert 1 <= len(opened_connections) <= 2
+    for conn in opened_connections:
+        conn.close.assert_called_once()
+
+    s3_objects = s3_with_bucket.list_objects_v2(Bucket="test-bucket")
+    assert sorted(obj["Key"] for obj in s3_objects["Contents"]) == [
+        "payment/2024-12-11 17:06:41.003418.json",
+        "sales_order/2024-12-11 17:06:41.003418.json",
+    ]
+
+
+def test_sequential_ingest_uses_one_connection_for_every_table(
+    s3_with_bucket, patch_data, mock_empty_data
+):
+    opened_connections = []
+
+    def mock_connect():
+        mock_conn = Mock()
+        mock_conn.close.return_value = None
+        opened_connections.append(mock_conn)
+        return mock_conn
+
+    connect_patcher = patch(
+        "src.ingestion_lambda.connect_to_db", side_effect=mock_connect
+    )
+    connect_patcher.start()
+    data_patcher = patch_data(mock_empty_data)
+    data_mock = data_patcher.start()
+
+    ingest_latest_rows(
+        s3_with_bucket,
+        "test-bucket",
+        "2024-12-11 16:51:37.123092",
+        "2024-12-11 17:06:41.003418",
+    )
+
+    data_patcher.stop()
+    connect_patcher.stop()
+
+    assert len(opened_connections) == 1
+    opened_connections[0].close.assert_called_once()
+    assert [call.args[1] for call in data_mock.call_args_list] == list(mock_empty_data)
+
+
+def test_integration_ingest_latest_with_copy_uploads_csv_for_selected_tables(
+    s3_with_bucket, connection_patcher, patch_data, mock_empty_data
+):
+    last_update = "2024-12-11 16:51:37.123092"
+    current_update = "2024-12-11 17:06:41.003418"
+
+    csv_bytes = (
+        b"payment_type_id,payment_type_name,created_at,last_updated\n"
+        + b"1,SALES_RECEIPT,2022-11-03 14:20:49.962,2022-11-03 14:20:49.962\n"
+    )
+
+    def mock_copy(db, table, last_update, stream):
+        if table == "payment_type":
+            stream.write(csv_bytes)
+            return 1
+        return 0
+
+    connection_patcher.start()
+    copy_patcher = patch(
+        "src.ingestion_lambda.copy_table_to_stream", side_effect=mock_copy
+    )
+    table_data_patcher = patch(
+        "src.ingestion_lambda.get_table_data",
+        side_effect=lambda db, table, last_update: mock_empty_data[table],
+    )
+    copy_patcher.start()
+    table_data_patcher.start()
+
+    output = ingest_latest_rows(
+        s3_with_bucket,
+        "test-bucket",
+        last_update,
+        current_update,
+        copy_tables=["payment_type", "transaction"],
+    )
+
+    copy_patcher.stop()
+    table_data_patcher.stop()
+    connection_patcher.stop()
+
+    assert output["HasNewRows"]["payment_type"] is True
+    assert output["HasNewRows"]["transaction"] is False
+    assert output["HasNewRows"]["sales_order"] is False
+
+    s3_objects = s3_with_bucket.list_objects_v2(Bucket="test-bucket")
+    assert [obj["Key"] for obj in s3_objects["Contents"]] == [
+        "payment_type/2024-12-11 17:06:41.003418.csv"
+    ]
+
+    object = s3_with_bucket.get_object(
+        Bucket="test-bucket", Key="payment_type/2024-12-11 17:06:41.003418.csv"
+    )
+    assert object["Body"].read() == csv_bytes
+
+
+def test_integration_ingest_latest_as_parquet_writes_typed_columns(
+    s3_with_bucket, mock_empty_data, mock_sales_order_data
+):
+    last_update = "2024-12-11 16:51:37.123092"
+    current_update = "2024-12-11 17:06:41.003418"
+
+    mock_data = mock_empty_data
+    mock_data["sales_order"] = mock_sales_order_data["sales_order"]
+
+    type_oids = [23, 1114, 1114, 23, 23, 23, 23, 1700, 23, 1043, 1043, 23]
+    mock_conn = Mock()
+    mock_conn.close.return_value = None
+    mock_conn.columns = [
+        {
+            "name": name,
+            "type_oid": type_oid,
+            "type_modifier": 655366 if type_oid == 1700 else -1,
+        }
+        for name, type_oid in zip(mock_data["sales_order"][1], type_oids)
+    ]
+
+    connect_patcher = patch(
+        "src.ingestion_lambda.connect_to_db", return_value=mock_conn
+    )
+    table_data_patcher = patch(
+        "src.ingestion_lambda.get_table_data",
+        side_effect=lambda db, table, last_update: mock_data[table],
+    )
+    connect_patcher.start()
+    table_data_patcher.start()
+
+    output = ingest_latest_rows(
+        s3_with_bucket,
+        "test-bucket",
+        last_update,
+        current_update,
+        output_format="parquet",
+    )
+
+    connect_patcher.stop()
+    table_data_patcher.stop()
+
+    assert output["HasNewRows"]["sales_order"] is True
+    assert output["HasNewRows"]["payment"] is False
+
+    object = s3_with_bucket.get_object(
+        Bucket="test-bucket", Key="sales_order/2024-12-11 17:06:41.003418.parquet"
+    )
+    table = pq.read_table(io.BytesIO(object["Body"].read()))
+    assert table.column_names == mock_data["sales_order"][1]
+    assert table.schema.field("sales_order_id").type == pa.int32()
+    assert table.schema.field("created_at").type == pa.timestamp("us")
+    assert table.schema.field("unit_price").type == pa.decimal128(10, 2)
+    assert table.column("unit_price").to_pylist() == [Decimal("2.93")]
+
+
+def test_integration_ingest_latest_appends_entries_to_table_manifest(
+    s3_with_bucket,
+    connection_patcher,
+    patch_data,
+    mock_empty_data,
+    mock_sales_order_data,
+):
+    last_update = "2024-12-11 16:51:37.123092"
+    current_update = "2024-12-11 17:06:41.003418"
+
+    # An object written before manifests existed is picked up by the first one
+    s3_with_bucket.put_object(
+        Bucket="test-bucket",
+        Key="sales_order/2024-12-10 09:00:00.000000.json",
+        Body=b"[]",
+    )
+
+    connection_patcher.start()
+    mock_data = mock_empty_data
+    mock_data["sales_order"] = mock_sales_order_data["sales_order"]
+    data_patcher = patch_data(mock_data)
+    data_patcher.start()
+
+    ingest_latest_rows(
+        s3_with_bucket, "test-bucket", last_update, current_update, write_manifest=True
+    )
+    ingest_latest_rows(
+        s3_with_bucket,
+        "test-bucket",
+        current_update,
+        "2024-12-11 17:21:41.003418",
+        write_manifest=True,
+    )
+
+    data_patcher.stop()
+    connection_patcher.stop()
+
+    s3_objects = s3_with_bucket.list_objects_v2(Bucket="test-bucket", Prefix="_")
+    assert [obj["Key"] for obj in s3_objects["Contents"]] == [
+        "_manifests/sales_order.jsonl"
+    ]
+
+    manifest = s3_with_bucket.get_object(
+        Bucket="test-bucket", Key="_manifests/sales_order.jsonl"
+    )
+    entries = [json.loads(line) for line in manifest["Body"].read().splitlines()]
+    assert [entry["key"] for entry in entries] == [
+        "sales_order/2024-12-10 09:00:00.000000.json",
+        "sales_order/2024-12-11 17:06:41.003418.json",
+        "sales_order/2024-12-11 17:21:41.003418.json",
+    ]
+    assert entries[0]["rows"] is None
+    assert entries[0]["id_bloom"] is None
+    assert entries[1].pop("id_bloom")["k"] > 0
+    assert entries[1] == {
+        "key": "sales_order/2024-12-11 17:06:41.003418.json",
+        "rows": 1,
+        "bytes": s3_with_bucket.head_object(
+            Bucket="test-bucket", Key=entries[1]["key"]
+        )["ContentLength"],
+        "min_id": 11599,
+        "max_id": 11599,
+        "min_last_updated": "2024-12-11 08:05:09.817000",
+        "max_last_updated": "2024-12-11 08:05:09.817000",
+    }
@@ -124,6 +124,63 @@ def test_get_data_ouputs_the_correct_data_intact():
         )
 
 
+def test_stream_table_data_fetches_batches_from_named_cursor():
+    mocked_connection = Mock()
+    batches = [[[1, "a"], [2, "b"]], [[3, "c"]], []]
+    statements = []
+
+    def mock_run(sql, **params):
+        statements.append(sql)
+        if sql.startswith("FETCH"):
+            return batches.pop(0)
+        return None
+
+    mocked_connection.run.side_effect = mock_run
+    mocked_connection.columns = [{"name": "fake_column_1"}, {"name": "fake_column_2"}]
+
+    output = list(
+        stream_table_data(mocked_connection, "currency", "2024-11-20 15:22:10", 2)
+    )
+
+    assert output == [
+        ([[1, "a"], [2, "b"]], ["fake_column_1", "fake_column_2"]),
+        ([[3, "c"]], ["fake_column_1", "fake_column_2"]),
+    ]
+    assert statements[0] == "START TRANSACTION READ ONLY;"
+    assert statements[1].startswith('DECLARE "currency_cursor" NO SCROLL CURSOR FOR')
+    assert statements.count('FETCH FORWARD 2 FROM "currency_cursor";') == 3
+    assert statements[-1] == "COMMIT;"
+
+
+def test_copy_table_to_stream_runs_copy_with_inlined_last_update():
+    mocked_connection = Mock()
+    mocked_connection.row_count = 2
+    stream = Mock()
+
+    row_count = copy_table_to_stream(
+        mocked_connection, "transaction", "2024-11-20 15:22:10.531518", stream
+    )
+
+    assert row_count == 2
+    sql = mocked_connection.run.call_args.args[0]
+    assert sql.startswith('COPY (SELECT * FROM "transaction" ')
+    assert "WHERE last_updated >= '2024-11-20 15:22:10.531518'" in sql
+    assert sql.endswith("TO STDOUT WITH (FORMAT csv, HEADER true);")
+    assert mocked_connection.run.call_args.kwargs == {"stream": stream}
+
+
+def test_fetch_table_columns_reads_types_from_an_empty_query():
+    mocked_connection = Mock()
+    mocked_connection.columns = [
+        {"name": "address_id", "type_oid": 23, "type_modifier": -1}
+    ]
+
+    columns = fetch_table_columns(mocked_connection, "address")
+
+    assert columns == mocked_connection.columns
+    mocked_connection.run.assert_called_once_with('SELECT * FROM "address" LIMIT 0;')
+
+
 def test_ingestion_lambda_handler_logs_errors():
     with TestCase.assertLogs("logger", level="ERROR") as log:
         # Check whether ingestion bucket env variable exists
@@ -0,0 +1,110 @@
+from src.processing_lambda import (
+    latest_row_versions,
+    join_address_updates,
+    join_department_updates,
+)
+from src.utils.benchmark_dependent_row_updates import per_row_scan
+import pandas as pd
+
+
+def test_latest_row_versions_keeps_newest_version_newest_first():
+    frames = [
+        pd.DataFrame({"staff_id": [1, 2, 3], "department_id": [1, 1, 2]}),
+        pd.DataFrame({"staff_id": [2, 4], "department_id": [3, 3]}),
+    ]
+
+    output_df = latest_row_versions(frames, "staff_id")
+
+    assert output_df["staff_id"].tolist() == [4, 2, 3, 1]
+    assert output_df["department_id"].tolist() == [3, 3, 2, 1]
+
+
+def test_join_department_updates_skips_already_updated_staff():
+    staff_df = pd.DataFrame(
+        {
+            "staff_id": [1, 2, 3],
+            "first_name": ["Jeremie", "Deron", "Jeanette"],
+            "last_name": ["Franey", "Beier", "Erdman"],
+            "department_id": [2, 6, 6],
+            "email_address": ["a@terrifictotes.com"] * 3,
+        }
+    )
+    department_df = pd.DataFrame(
+        {"department_id": [6], "department_name": ["Facilities"], "location": [None]}
+    )
+
+    output_df = join_department_updates(staff_df, department_df, [3])
+
+    assert output_df["staff_id"].tolist() == [2]
+    assert output_df.loc[0, "department_name"] == "Facilities"
+    assert output_df.loc[0, "location"] == "Undefined"
+
+
+def counterparty_version(counterparty_id, legal_address_id, last_updated):
+    return {
+        "counterparty_id": counterparty_id,
+        "counterparty_legal_name": f"Name {counterparty_id}",
+        "legal_address_id": legal_address_id,
+        "commercial_contact": "Contact",
+        "delivery_contact": "Contact",
+        "created_at": "2024-11-20 15:22:10.531518",
+        "last_updated": last_updated,
+    }
+
+
+def test_join_address_updates_matches_per_row_scan_when_addresses_change():
+    old, new = "2024-11-20 15:22:10.531518", "2024-11-21 09:38:15.221234"
+    frames = [
+        pd.DataFrame(
+            [
+                counterparty_version(1, 7, old),
+                counterparty_version(2, 9, old),
+                counterparty_version(3, 7, old),
+                counterparty_version(4, 7, old),
+                counterparty_version(5, 8, old),
+            ]
+        ),
+        pd.DataFrame(
+            [
+                # Moves between two updated addresses
+                counterparty_version(1, 8, new),
+                # Moves on to an updated address
+                counterparty_version(2, 7, new),
+                # Moves away from an updated address
+                counterparty_version(3, 9, new),
+            ]
+        ),
+    ]
+    address_df = pd.DataFrame(
+        {
+            "address_id": [7, 8],
+            "address_line_1": ["7 Road", "8 Road"],
+            "address_line_2": None,
+            "district": None,
+            "city": ["Leeds", "York"],
+            "postal_code": "00000",
+            "country": "UK",
+            "phone": "0000 000000",
+            "created_at": new,
+            "last_updated": new,
+        }
+    )
+    # Already in the incoming dim_counterparty frame
+    already_updated_list = [4]
+
+    old_df = per_row_scan(frames, address_df, already_updated_list)
+    new_df = join_address_updates(
+        latest_row_versions(frames, "counterparty_id"), address_df, already_updated_list
+    )
+
+    # The per-row scan also picks up the stale version of counterparty 3,
+    # whose newest version no longer references an updated address
+    assert old_df["counterparty_id"].tolist() == [2, 1, 5, 3]
+    old_df = old_df[old_df["counterparty_id"] != 3]
+    assert new_df["counterparty_id"].tolist() == old_df["counterparty_id"].tolist()
+    assert new_df["counterparty_id"].tolist() == [2, 1, 5]
+    assert (
+        new_df["counterparty_legal_city"].tolist()
+        == old_df["city"].tolist()
+        == ["Leeds", "York", "York"]
+    )
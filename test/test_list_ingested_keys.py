@@ -0,0 +1,94 @@
+from src.processing_lambda import list_ingested_keys
+import pytest, os, boto3, json
+from moto import mock_aws
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        yield s3
+
+
+@pytest.fixture
+def s3_bucket(s3_client):
+    s3_client.create_bucket(
+        Bucket="test_bucket",
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+    )
+    yield s3_client
+
+
+def test_listing_without_manifest_is_paginated_past_1000_keys(s3_bucket):
+    keys = [f"design/2024-11-21 {i:06d}.json" for i in range(1001)]
+    for key in keys:
+        s3_bucket.put_object(Bucket="test_bucket", Key=key, Body=b"[]")
+
+    assert list_ingested_keys(s3_bucket, "test_bucket", "design") == keys
+    assert list_ingested_keys(
+        s3_bucket, "test_bucket", "design", start_after=keys[999]
+    ) == [keys[1000]]
+
+
+def test_listing_reads_keys_from_manifest_when_present(s3_bucket):
+    entries = [
+        {"key": "design/2024-11-21 10:00:00.000000.part-00000.json", "rows": 2},
+        {"key": "design/2024-11-21 10:00:00.000000.part-00001.json", "rows": 1},
+        {"key": "design/2024-11-21 11:00:00.000000.json", "rows": 5},
+    ]
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="_manifests/design.jsonl",
+        Body="".join(json.dumps(entry) + "\n" for entry in entries),
+    )
+    # An object the manifest leaves out, as when compaction has replaced it
+    s3_bucket.put_object(
+        Bucket="test_bucket", Key="design/2024-11-21 10:30:00.000000.json", Body=b"[]"
+    )
+
+    assert list_ingested_keys(s3_bucket, "test_bucket", "design") == [
+        entry["key"] for entry in entries
+    ]
+    assert list_ingested_keys(
+        s3_bucket, "test_bucket", "design", key_prefix="2024-11-21 10:00:00.000000."
+    ) == [entries[0]["key"], entries[1]["key"]]
+    assert list_ingested_keys(
+        s3_bucket, "test_bucket", "design", start_after=entries[1]["key"]
+    ) == [entries[2]["key"]]
+
+
+def test_listing_adds_objects_newer_than_the_manifest(s3_bucket):
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="_manifests/design.jsonl",
+        Body=json.dumps({"key": "design/2024-11-21 10:00:00.000000.json"}) + "\n",
+    )
+    # The newer objects were written while INGESTION_WRITE_MANIFEST was off
+    for key in [
+        "design/2024-11-21 10:00:00.000000.json",
+        "design/2024-11-21 11:00:00.000000.json",
+        "design/2024-11-21 12:00:00.000000.json",
+    ]:
+        s3_bucket.put_object(Bucket="test_bucket", Key=key, Body=b"[]")
+
+    assert list_ingested_keys(s3_bucket, "test_bucket", "design") == [
+        "design/2024-11-21 10:00:00.000000.json",
+        "design/2024-11-21 11:00:00.000000.json",
+        "design/2024-11-21 12:00:00.000000.json",
+    ]
+    assert list_ingested_keys(
+        s3_bucket,
+        "test_bucket",
+        "design",
+        start_after="design/2024-11-21 11:00:00.000000.json",
+    ) == ["design/2024-11-21 12:00:00.000000.json"]
@@ -0,0 +1,133 @@
+from src.processing_lambda import (
+    list_keys_for_ids,
+    may_contain_ids,
+    scan_latest_row_versions,
+)
+from src.ingestion_lambda import manifest_entry
+import pytest, os, boto3, json
+from moto import mock_aws
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        yield s3
+
+
+@pytest.fixture
+def s3_bucket(s3_client):
+    s3_client.create_bucket(
+        Bucket="test_bucket",
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+    )
+    yield s3_client
+
+
+columns = ["address_id", "city", "last_updated"]
+
+
+def make_entry(key, ids):
+    rows = [[value, "City", "2024-11-21 09:38:15.221234"] for value in ids]
+    return manifest_entry("address", key, 100, rows, columns)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    ids = list(range(1, 20000, 7))
+    entry = make_entry("address/a.json", ids)
+
+    assert all(may_contain_ids(entry, [value]) for value in ids)
+
+
+def test_bloom_filter_rules_out_most_absent_ids_within_range():
+    entry = make_entry("address/a.json", range(0, 20000, 2))
+
+    false_positives = sum(
+        may_contain_ids(entry, [value]) for value in range(1, 20000, 2)
+    )
+
+    assert false_positives < 10000 * 0.03
+
+
+def test_entries_without_stats_are_always_candidates():
+    entry = manifest_entry("address", "address/a.csv", 100, row_count=5)
+
+    assert may_contain_ids(entry, [1])
+    assert not may_contain_ids(entry, [])
+
+
+def test_only_objects_that_may_hold_requested_ids_are_listed(s3_bucket, caplog):
+    entries = [
+        make_entry("address/2024-11-20 15:22:10.531518.json", [1, 2, 3]),
+        make_entry("address/2024-11-21 09:38:15.221234.json", [40, 41, 42]),
+        make_entry("address/2024-11-22 09:38:15.221234.json", [2, 500]),
+        manifest_entry(
+            "address", "address/2024-11-23 09:38:15.221234.csv", 10, row_count=1
+        ),
+    ]
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="_manifests/address.jsonl",
+        Body="".join(json.dumps(entry) + "\n" for entry in entries),
+    )
+
+    # Written after the manifest, so it has no stats to judge it by
+    s3_bucket.put_object(
+        Bucket="test_bucket", Key="address/2024-11-24 09:38:15.221234.json", Body=b"[]"
+    )
+
+    with caplog.at_level("INFO", logger="logger"):
+        keys = list_keys_for_ids(s3_bucket, "test_bucket", "address", {2})
+
+    assert keys == [
+        "address/2024-11-20 15:22:10.531518.json",
+        "address/2024-11-22 09:38:15.221234.json",
+        "address/2024-11-23 09:38:15.221234.csv",
+        "address/2024-11-24 09:38:15.221234.json",
+    ]
+    assert "Skipped 1 of 5 'address' objects" in caplog.text
+
+
+def test_scan_latest_row_versions_reads_only_objects_that_may_hold_ids(s3_bucket):
+    rows_by_key = {
+        "address/2024-11-20 15:22:10.531518.json": [[1, "Leeds"], [2, "York"]],
+        "address/2024-11-21 09:38:15.221234.json": [[40, "Hull"]],
+        "address/2024-11-22 09:38:15.221234.json": [[2, "Bath"]],
+    }
+    entries = []
+    for key, rows in rows_by_key.items():
+        rows = [row + ["2024-11-21 09:38:15.221234"] for row in rows]
+        entries.append(manifest_entry("address", key, 100, rows, columns))
+        s3_bucket.put_object(
+            Bucket="test_bucket",
+            Key=key,
+            Body=json.dumps([dict(zip(columns, row)) for row in rows]),
+        )
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="_manifests/address.jsonl",
+        Body="".join(json.dumps(entry) + "\n" for entry in entries),
+    )
+    # Skipped by its id stats, so its unreadable body is never fetched
+    s3_bucket.put_object(
+        Bucket="test_bucket",
+        Key="address/2024-11-21 09:38:15.221234.json",
+        Body=b"not json",
+    )
+
+    output_df = scan_latest_row_versions(s3_bucket, "test_bucket", "address", [1, 2])
+
+    assert sorted(zip(output_df["address_id"], output_df["city"])) == [
+        (1, "Leeds"),
+        (2, "Bath"),
+    ]
@@ -0,0 +1,85 @@
+import threading, time
+
+from src.uploading_lambda import load_tables_in_dependency_order
+
+DEPENDENCIES = {
+    "fact_sales_order": {"dim_staff", "dim_currency"},
+    "dim_staff": set(),
+    "dim_currency": set(),
+    "dim_design": set(),
+}
+
+
+def test_loads_facts_only_after_their_dimensions():
+    finished = []
+
+    def load_table(table_name):
+        time.sleep(0.05 if table_name.startswith("dim") else 0)
+        finished.append(table_name)
+
+    status, _ = load_tables_in_dependency_order(
+        ["fact_sales_order", "dim_staff", "dim_currency", "dim_design"],
+        DEPENDENCIES,
+        load_table,
+    )
+
+    assert finished.index("fact_sales_order") > finished.index("dim_staff")
+    assert finished.index("fact_sales_order") > finished.index("dim_currency")
+    assert set(status.values()) == {"loaded"}
+
+
+def test_loads_independent_dimensions_concurrently():
+    # Every dimension has to be loading at once for the barrier to open
+    barrier = threading.Barrier(3, timeout=5)
+
+    def load_table(table_name):
+        if table_name.startswith("dim"):
+            barrier.wait()
+
+    status, _ = load_tables_in_dependency_order(
+        ["fact_sales_order", "dim_staff", "dim_currency", "dim_design"],
+        DEPENDENCIES,
+        load_table,
+        workers=3,
+    )
+
+    assert set(status.values()) == {"loaded"}
+
+
+def test_failed_dimension_skips_dependent_facts_only():
+    loaded = []
+
+    def load_table(table_name):
+        if table_name == "dim_staff":
+            raise ValueError("bad staff row")
+        loaded.append(table_name)
+        return {"inserted": 1, "updated": 0, "skipped": 0}
+
+    status, row_counts = load_tables_in_dependency_order(
+        ["fact_sales_order", "dim_staff", "dim_currency", "dim_design"],
+        DEPENDENCIES,
+        load_table,
+    )
+
+    assert status == {
+        "dim_staff": "failed: bad staff row",
+        "dim_currency": "loaded",
+        "dim_design": "loaded",
+        "fact_sales_order": "skipped: dim_staff did not load",
+    }
+    assert "fact_sales_order" not in loaded
+    assert sorted(row_counts) == ["dim_currency", "dim_design"]
+
+
+def test_circular_dependencies_are_skipped():
+    status, _ = load_tables_in_dependency_order(
+        ["a", "b", "c"],
+        {"a": {"b"}, "b": {"a"}, "c": set()},
+        lambda table_name: None,
+    )
+
+    assert status == {
+        "c": "loaded",
+        "a": "skipped: circular foreign keys",
+        "b": "skipped: circular foreign keys",
+    }
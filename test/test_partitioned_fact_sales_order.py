@@ -0,0 +1,188 @@
+from moto import mock_aws
+import pytest, os, boto3, io, json
+import pandas as pd
+from pyarrow import fs
+
+import src.processing_lambda
+from src.processing_lambda import (
+    save_processed_tables,
+    find_already_processed_tables,
+    compact_partitions,
+)
+from src.uploading_lambda import list_run_files
+from src.utils.read_fact_sales_order import read_fact_sales_order
+
+CHECK_TIME = "2024-11-20 15_22_10.531518"
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_with_bucket(aws_credentials, monkeypatch):
+    monkeypatch.setattr(
+        src.processing_lambda,
+        "PARTITION_COLUMNS",
+        {"fact_sales_order": "created_date"},
+    )
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3
+
+
+def make_sales_order_df(first_id=1):
+    return pd.DataFrame(
+        {
+            "sales_order_id": [first_id, first_id + 1, first_id + 2],
+            "created_date": ["2024-11-02", "2024-11-01", "2024-11-02"],
+            "units_sold": [10, 20, 30],
+        }
+    )
+
+
+def list_keys(s3_client):
+    response = s3_client.list_objects_v2(Bucket="test-bucket")
+    return sorted(obj["Key"] for obj in response.get("Contents", []))
+
+
+def test_saves_one_part_per_created_date_and_a_run_manifest(s3_with_bucket):
+    save_processed_tables(
+        s3_with_bucket,
+        "test-bucket",
+        {"fact_sales_order": make_sales_order_df()},
+        CHECK_TIME,
+        {"fact_sales_order": "abc123"},
+    )
+
+    assert list_keys(s3_with_bucket) == [
+        f"fact_sales_order/_runs/{CHECK_TIME}.json",
+        f"fact_sales_order/created_date=2024-11-01/part-{CHECK_TIME}.parquet",
+        f"fact_sales_order/created_date=2024-11-02/part-{CHECK_TIME}.parquet",
+    ]
+
+    part = s3_with_bucket.get_object(
+        Bucket="test-bucket",
+        Key=f"fact_sales_order/created_date=2024-11-02/part-{CHECK_TIME}.parquet",
+    )
+    part_df = pd.read_parquet(io.BytesIO(part["Body"].read()))
+    assert part_df["sales_order_id"].tolist() == [1, 3]
+    assert part_df["created_date"].tolist() == ["2024-11-02", "2024-11-02"]
+
+    manifest = s3_with_bucket.get_object(
+        Bucket="test-bucket", Key=f"fact_sales_order/_runs/{CHECK_TIME}.json"
+    )
+    assert manifest["Metadata"] == {"input-fingerprint": "abc123"}
+    assert json.loads(manifest["Body"].read())["parts"][0] == {
+        "key": f"fact_sales_order/created_date=2024-11-01/part-{CHECK_TIME}.parquet",
+        "created_date": "2024-11-01",
+        "rows": 1,
+    }
+
+    assert find_already_processed_tables(
+        s3_with_bucket, "test-bucket", {"fact_sales_order": "abc123"}, CHECK_TIME
+    ) == {"fact_sales_order"}
+
+
+def test_list_run_files_returns_run_parts_or_single_file(s3_with_bucket):
+    save_processed_tables(
+        s3_with_bucket,
+        "test-bucket",
+        {"fact_sales_order": make_sales_order_df()},
+        CHECK_TIME,
+    )
+
+    assert list_run_files(
+        s3_with_bucket, "test-bucket", "fact_sales_order", CHECK_TIME
+    ) == [
+        f"fact_sales_order/created_date=2024-11-01/part-{CHECK_TIME}.parquet",
+        f"fact_sales_order/created_date=2024-11-02/part-{CHECK_TIME}.parquet",
+    ]
+    assert list_run_files(s3_with_bucket, "test-bucket", "dim_staff", CHECK_TIME) == [
+        f"dim_staff/{CHECK_TIME}.parquet"
+    ]
+
+
+def test_compact_partitions_merges_old_parts_into_one(s3_with_bucket):
+    for check_time, first_id in [(CHECK_TIME, 1), ("2024-11-21 09_00_00.000000", 4)]:
+        save_processed_tables(
+            s3_with_bucket,
+            "test-bucket",
+            {"fact_sales_order": make_sales_order_df(first_id)},
+            check_time,
+        )
+
+    # A negative age counts every part written so far as old enough
+    assert (
+        compact_partitions(s3_with_bucket, "test-bucket", "fact_sales_order", -1) == 2
+    )
+
+    keys = list_keys(s3_with_bucket)
+    part_keys = [key for key in keys if "/created_date=2024-11-02/" in key]
+    assert len(part_keys) == 1
+    assert "/part-compacted-" in part_keys[0]
+
+    part = s3_with_bucket.get_object(Bucket="test-bucket", Key=part_keys[0])
+    part_df = pd.read_parquet(io.BytesIO(part["Body"].read()))
+    assert part_df["sales_order_id"].tolist() == [1, 3, 4, 6]
+
+
+def test_replayed_run_lists_compacted_parts_in_place_of_merged_ones(s3_with_bucket):
+    for check_time, first_id in [(CHECK_TIME, 1), ("2024-11-21 09_00_00.000000", 4)]:
+        save_processed_tables(
+            s3_with_bucket,
+            "test-bucket",
+            {"fact_sales_order": make_sales_order_df(first_id)},
+            check_time,
+            {"fact_sales_order": "abc123"},
+        )
+    compact_partitions(s3_with_bucket, "test-bucket", "fact_sales_order", -1)
+
+    # The run still counts as processed, so a replay goes on to upload it
+    assert find_already_processed_tables(
+        s3_with_bucket, "test-bucket", {"fact_sales_order": "abc123"}, CHECK_TIME
+    ) == {"fact_sales_order"}
+
+    file_keys = list_run_files(
+        s3_with_bucket, "test-bucket", "fact_sales_order", CHECK_TIME
+    )
+
+    assert [key.rsplit("/", 1)[0] for key in file_keys] == [
+        "fact_sales_order/created_date=2024-11-01",
+        "fact_sales_order/created_date=2024-11-02",
+    ]
+    for file_key in file_keys:
+        assert "/part-compacted-" in file_key
+        s3_with_bucket.head_object(Bucket="test-bucket", Key=file_key)
+
+
+def test_read_fact_sales_order_reads_only_partitions_in_range(tmp_path):
+    for created_date, sales_order_id in [
+        ("2024-11-01", 1),
+        ("2024-11-02", 2),
+        ("2024-11-03", 3),
+    ]:
+        partition = tmp_path / "fact_sales_order" / f"created_date={created_date}"
+        partition.mkdir(parents=True)
+        pd.DataFrame(
+            {"sales_order_id": [sales_order_id], "created_date": [created_date]}
+        ).to_parquet(partition / "part-0.parquet")
+
+    table = read_fact_sales_order(
+        str(tmp_path / "fact_sales_order"),
+        start_date="2024-11-02",
+        end_date="2024-11-03",
+        filesystem=fs.LocalFileSystem(),
+    )
+
+    assert sorted(table.column("sales_order_id").to_pylist()) == [2, 3]
@@ -0,0 +1,78 @@
+from src.processing_lambda import prefetch_ingested_objects, scan_latest_row_versions
+import pytest, os, boto3, json
+from moto import mock_aws
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        yield s3
+
+
+@pytest.fixture
+def s3_with_history(s3_client):
+    s3_client.create_bucket(
+        Bucket="test_bucket",
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+    )
+    # staff 1..20, each file holding a newer version of two staff rows
+    for i in range(10):
+        rows = [
+            {"staff_id": 2 * i + 1, "version": i},
+            {"staff_id": 2 * i + 2, "version": i},
+            {"staff_id": 1, "version": i},
+        ]
+        s3_client.put_object(
+            Bucket="test_bucket",
+            Key=f"staff/2024-11-{10 + i} 00:00:00.000000.json",
+            Body=json.dumps(rows),
+        )
+    yield s3_client
+
+
+def test_objects_are_yielded_in_key_order(s3_with_history):
+    keys = sorted(
+        obj["Key"]
+        for obj in s3_with_history.list_objects_v2(Bucket="test_bucket")["Contents"]
+    )
+
+    output = list(
+        prefetch_ingested_objects(
+            s3_with_history, "test_bucket", keys, workers=4, prefetch_depth=3
+        )
+    )
+
+    assert [key for key, _ in output] == keys
+    assert [df.loc[0, "version"] for _, df in output] == list(range(10))
+
+
+def test_scan_stops_once_every_id_is_found(s3_with_history, monkeypatch):
+    fetched_keys = []
+    get_object = s3_with_history.get_object
+
+    def recording_get_object(**kwargs):
+        fetched_keys.append(kwargs["Key"])
+        return get_object(**kwargs)
+
+    monkeypatch.setattr(s3_with_history, "get_object", recording_get_object)
+    monkeypatch.setattr("src.processing_lambda.READ_PREFETCH_DEPTH", 2, raising=True)
+
+    output_df = scan_latest_row_versions(
+        s3_with_history, "test_bucket", "staff", [1, 19]
+    )
+
+    assert sorted(output_df["staff_id"]) == [1, 19]
+    assert output_df.set_index("staff_id").loc[1, "version"] == 9
+    assert output_df.set_index("staff_id").loc[19, "version"] == 9
+    assert len(fetched_keys) < 10
@@ -1,4 +1,4 @@
-from src.processing_lambda import process_address_updates
+from src.processing_lambda import process_address_updates, update_latest_rows_snapshot
 from src.utils.fetch_latest_row_versions import fetch_latest_row_versions
 import pytest, os, boto3
 import pandas as pd
@@ -102,6 +102,7 @@ def test_process_address_updates_updates_counterparty_df_and_makes_location_df(
     )
 
     # Begin testing address update function
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "counterparty")
     output = process_address_updates(
         s3_bucket, "test_bucket", last_checked_time, dim_counterparty_df
     )
@@ -192,6 +193,7 @@ def test_process_address_updates_with_empty_counterparty_df(s3_bucket):
     last_checked_time = "2024-11-21 09_38_15.221234"
 
     # Begin testing address update function
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "counterparty")
     output = process_address_updates(s3_bucket, "test_bucket", last_checked_time)
 
     test_counterparty_df, test_location_df = output
@@ -1,4 +1,7 @@
-from src.processing_lambda import process_department_updates
+from src.processing_lambda import (
+    process_department_updates,
+    update_latest_rows_snapshot,
+)
 from src.utils.fetch_latest_row_versions import fetch_latest_row_versions
 import pytest, os, boto3
 import pandas as pd
@@ -92,6 +95,7 @@ def test_process_department_updates_updates_staff_df(s3_with_bucket):
     dim_staff_df["location"] = dim_staff_df["location"].fillna("Undefined")
 
     # Begin testing departments update function
+    update_latest_rows_snapshot(s3_with_bucket, "test_bucket", "staff")
     test_output_df = process_department_updates(
         s3_with_bucket, "test_bucket", last_checked_time, dim_staff_df
     )
@@ -129,6 +133,7 @@ def test_process_department_updates_with_empty_staff_df(s3_with_bucket):
     )
     last_checked_time = "2024-11-21 09_38_15.221234"
 
+    update_latest_rows_snapshot(s3_with_bucket, "test_bucket", "staff")
     test_output_df = process_department_updates(
         s3_with_bucket, "test_bucket", last_checked_time
     )
@@ -0,0 +1,85 @@
+from moto import mock_aws
+import pytest, os, boto3, glob, io
+import pandas as pd
+
+from src.processing_lambda import processing_lambda_handler
+
+CHECK_TIMES = ["2024-11-20 15_22_10.531518", "2024-11-21 09_38_15.221234"]
+TABLE_NAMES = [
+    "counterparty",
+    "currency",
+    "department",
+    "design",
+    "staff",
+    "sales_order",
+    "address",
+    "payment",
+    "purchase_order",
+    "payment_type",
+    "transaction",
+]
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_buckets(aws_credentials, monkeypatch):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        for bucket_name in ["ingestion-bucket", "processing-bucket"]:
+            s3.create_bucket(
+                Bucket=bucket_name,
+                CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+            )
+        monkeypatch.setenv("INGESTION_BUCKET_NAME", "ingestion-bucket")
+        monkeypatch.setenv("PROCESSING_BUCKET_NAME", "processing-bucket")
+        yield s3
+
+
+def run_processing(s3_client, check_time):
+    for file_path in glob.glob(f"test/test_data/*/{check_time}.json"):
+        table_name = file_path.split("/")[-2]
+        s3_client.upload_file(
+            Bucket="ingestion-bucket",
+            Filename=file_path,
+            Key=f"{table_name}/{check_time}.json",
+        )
+
+    has_new_rows = {
+        table_name: os.path.exists(f"test/test_data/{table_name}/{check_time}.json")
+        for table_name in TABLE_NAMES
+    }
+    processing_lambda_handler(
+        {"HasNewRows": has_new_rows, "LastCheckedTime": check_time}, {}
+    )
+
+
+def read_processed_ids(s3_client, table_name, check_time, id_col_name):
+    processed_object = s3_client.get_object(
+        Bucket="processing-bucket", Key=f"{table_name}/{check_time}.parquet"
+    )
+    processed_df = pd.read_parquet(io.BytesIO(processed_object["Body"].read()))
+    return processed_df[id_col_name].tolist()
+
+
+def test_rows_joined_to_updated_references_come_newest_first(s3_buckets):
+    for check_time in CHECK_TIMES:
+        run_processing(s3_buckets, check_time)
+
+    counterparty_ids = read_processed_ids(
+        s3_buckets, "dim_counterparty", CHECK_TIMES[1], "counterparty_id"
+    )
+    staff_ids = read_processed_ids(s3_buckets, "dim_staff", CHECK_TIMES[1], "staff_id")
+
+    # Updated rows first, then rows referencing an updated address or
+    # department, newest version first as a backwards scan of history finds them
+    assert counterparty_ids == [1, 4, 11, 18, 17, 15]
+    assert staff_ids == [1, 16, 3, 2]
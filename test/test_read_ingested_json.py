@@ -0,0 +1,78 @@
+import glob, json
+import pandas as pd
+import pytest
+
+from src.processing_lambda import read_ingested_json
+
+
+def decode_as_before(payload):
+    return pd.DataFrame.from_dict(json.loads(payload))
+
+
+@pytest.fixture
+def no_python_decode(monkeypatch):
+    def from_dict(*args, **kwargs):
+        raise AssertionError("decoded through Python objects")
+
+    monkeypatch.setattr(pd.DataFrame, "from_dict", from_dict)
+
+
+@pytest.mark.parametrize("file_path", sorted(glob.glob("test/test_data/*/*.json")))
+def test_read_ingested_json_gives_the_same_df_as_from_dict(file_path):
+    with open(file_path, "rb") as f:
+        payload = f.read()
+    table_name = file_path.split("/")[-2]
+
+    pd.testing.assert_frame_equal(
+        read_ingested_json(payload, table_name), decode_as_before(payload)
+    )
+
+
+def test_read_ingested_json_decodes_rows_straight_into_columns(no_python_decode):
+    payload = (
+        b'[{"address_id": 1, "address_line_1": "6826 Herzog Via", '
+        + b'"address_line_2": null, "district": "Avon", "city": "Leeds", '
+        + b'"postal_code": "28441", "country": "Turkey", "phone": "1803 637401", '
+        + b'"created_at": "2022-11-03 14:20:49.962000", '
+        + b'"last_updated": "2022-11-03 14:20:49.962000"}, '
+        + b'{"address_id": 2, "address_line_1": "179 Alexie Cliffs", '
+        + b'"address_line_2": null, "district": null, "city": "Aliso Viejo", '
+        + b'"postal_code": "99305-7380", "country": "San Marino", '
+        + b'"phone": "9621 880720", "created_at": "2022-11-03 14:20:49.962000", '
+        + b'"last_updated": "2022-11-03 14:20:49.962000"}]'
+    )
+
+    df = read_ingested_json(payload, "address")
+
+    assert df["address_id"].tolist() == [1, 2]
+    assert df["district"].tolist() == ["Avon", None]
+    assert df["address_line_2"].dtype == object
+    assert df["address_line_2"].tolist() == [None, None]
+
+
+CURRENCY_ROW = {
+    "currency_id": 1,
+    "currency_code": "GBP",
+    "created_at": "2022-11-03 14:20:49.962000",
+    "last_updated": "2022-11-03 14:20:49.962000",
+}
+
+
+@pytest.mark.parametrize(
+    "changed_row",
+    [
+        {"currency_code": "}, {"},
+        {"currency_code": 826},
+        {"extra_column": 1},
+    ],
+    ids=["row-separator-in-value", "changed-type", "unknown-column"],
+)
+def test_read_ingested_json_falls_back_for_payloads_the_schema_does_not_fit(
+    changed_row,
+):
+    rows = [{**CURRENCY_ROW, **changed_row}, {**CURRENCY_ROW, "currency_id": 2}]
+    payload = json.dumps(rows).encode("utf-8")
+
+    pd.testing.assert_frame_equal(
+        read_ingested_json(payload, "currency"), decode_as_before(payload)
+    )
@@ -0,0 +1,62 @@
+import logging, threading, time
+import pytest
+
+from src.processing_lambda import run_concurrently
+
+logger = logging.getLogger("logger")
+
+
+def logging_task(name, delay):
+    def task():
+        logger.info(f"{name} started")
+        time.sleep(delay)
+        logger.info(f"{name} finished")
+        return name
+
+    return task
+
+
+def test_run_concurrently_returns_results_in_task_order():
+    tasks = [logging_task("a", 0.1), logging_task("b", 0), logging_task("c", 0.05)]
+
+    assert run_concurrently(tasks, workers=3) == ["a", "b", "c"]
+
+
+def test_run_concurrently_runs_tasks_at_the_same_time():
+    # Every task has to be running at once for the barrier to open
+    barrier = threading.Barrier(3, timeout=5)
+
+    assert run_concurrently([barrier.wait] * 3, workers=3) is not None
+
+
+def test_run_concurrently_logs_each_task_together_in_task_order(caplog):
+    caplog.set_level(logging.INFO, logger="logger")
+    tasks = [logging_task("a", 0.1), logging_task("b", 0), logging_task("c", 0.05)]
+
+    run_concurrently(tasks, workers=3)
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "a started",
+        "a finished",
+        "b started",
+        "b finished",
+        "c started",
+        "c finished",
+    ]
+
+
+def test_run_concurrently_raises_task_errors_after_earlier_logs(caplog):
+    caplog.set_level(logging.INFO, logger="logger")
+
+    def failing_task():
+        logger.info("b started")
+        raise ValueError("b failed")
+
+    with pytest.raises(ValueError, match="b failed"):
+        run_concurrently([logging_task("a", 0.05), failing_task], workers=2)
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "a started",
+        "a finished",
+        "b started",
+    ]
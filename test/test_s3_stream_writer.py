@@ -0,0 +1,92 @@
+from src import ingestion_lambda, processing_lambda
+from moto import mock_aws
+import pytest, os, boto3
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_with_bucket(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3
+
+
+writer_classes = [ingestion_lambda.S3StreamWriter, processing_lambda.S3StreamWriter]
+
+
+@pytest.mark.parametrize("writer_class", writer_classes)
+def test_small_object_is_uploaded_in_a_single_put(s3_with_bucket, writer_class):
+    with writer_class(s3_with_bucket, "test-bucket", "folder/small.json") as writer:
+        writer.write("[1, ")
+        writer.write(b"2]")
+
+    assert writer.upload_id is None
+    assert writer.tell() == 6
+    response = s3_with_bucket.get_object(Bucket="test-bucket", Key="folder/small.json")
+    assert response["Body"].read() == b"[1, 2]"
+
+
+@pytest.mark.parametrize("writer_class", writer_classes)
+def test_large_object_is_uploaded_in_bounded_parts(s3_with_bucket, writer_class):
+    part_size = 5 * 1024 * 1024
+    chunk = os.urandom(1024 * 1024)
+
+    with writer_class(
+        s3_with_bucket, "test-bucket", "folder/large.bin", part_size
+    ) as writer:
+        for _ in range(12):
+            writer.write(chunk)
+            assert len(writer.buffer) < part_size
+
+    assert [part["PartNumber"] for part in writer.parts] == [1, 2, 3]
+    response = s3_with_bucket.get_object(Bucket="test-bucket", Key="folder/large.bin")
+    assert response["Body"].read() == chunk * 12
+
+
+@pytest.mark.parametrize("writer_class", writer_classes)
+def test_failed_write_aborts_upload_and_leaves_no_object(s3_with_bucket, writer_class):
+    part_size = 5 * 1024 * 1024
+
+    with pytest.raises(ValueError):
+        with writer_class(
+            s3_with_bucket, "test-bucket", "folder/failed.bin", part_size
+        ) as writer:
+            writer.write(os.urandom(part_size))
+            raise ValueError("encoding failed")
+
+    assert "Contents" not in s3_with_bucket.list_objects_v2(Bucket="test-bucket")
+    uploads = s3_with_bucket.list_multipart_uploads(Bucket="test-bucket")
+    assert "Uploads" not in uploads
+
+
+@pytest.mark.parametrize("writer_class", writer_classes)
+@pytest.mark.parametrize("size", [10, 6 * 1024 * 1024])
+def test_metadata_is_attached_to_small_and_multipart_objects(
+    s3_with_bucket, writer_class, size
+):
+    with writer_class(
+        s3_with_bucket,
+        "test-bucket",
+        "folder/tagged.bin",
+        5 * 1024 * 1024,
+        metadata={"source-key": "table/2024-11-21 13:32:38.364280.json"},
+    ) as writer:
+        writer.write(os.urandom(size))
+
+    response = s3_with_bucket.head_object(Bucket="test-bucket", Key="folder/tagged.bin")
+    assert response["Metadata"] == {
+        "source-key": "table/2024-11-21 13:32:38.364280.json"
+    }
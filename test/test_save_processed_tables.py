@@ -1,6 +1,5 @@
-from unittest.mock import patch, Mock
 from moto import mock_aws
-import pytest, os, boto3, io, random, string, json
+import pytest, os, boto3, io, json
 import pandas as pd
 
 from src.processing_lambda import save_processed_tables
@@ -174,46 +173,37 @@ def test_save_processed_tables_creates_parquet_and_uploads_to_s3_for_multiple_ta
     assert len(df_3.index) == 1
 
 
-def test_df_to_parquet_in_s3_makes_root_tmp_dir_if_none_exists(s3_with_bucket):
-    # Create patch for os.path.exists
-    path_exists_patcher = patch(
-        "src.processing_lambda.os.path.exists", return_value=False
-    )
-
-    # Create patch for os.mkdir
-    while True:
-        rand_dir = "".join(
-            random.choice(string.ascii_uppercase + string.digits) for _ in range(3)
-        )
-        if not os.path.exists(rand_dir):
-            break
-
-    def prepend_path(func):
-        def function_invoker(path):
-            func(rand_dir)
-            func(rand_dir + path)
-
-        return function_invoker
-
-    mkdir_patcher = patch(
-        "src.processing_lambda.os.mkdir", side_effect=prepend_path(os.mkdir)
-    )
-
-    # Begin testing
-    path_exists_patcher.start()
-    mkdir_patcher.start()
+def test_save_processed_tables_logs_size_and_timings_of_each_table(
+    s3_with_bucket, caplog
+):
+    caplog.set_level("INFO", logger="logger")
+    test_table_dict = {"dim_address": None}
+    with open("test/test_data/currency/2024-11-20 15_22_10.531518.json", "r") as f:
+        test_table_dict["dim_currency"] = pd.DataFrame.from_dict(json.load(f))
+    with open("test/test_data/design/2024-11-20 15_22_10.531518.json") as f:
+        test_table_dict["dim_design"] = pd.DataFrame.from_dict(json.load(f))
+    test_check_time = "2024-11-22 08_01_13.193846"
 
-    test_df = pd.DataFrame.from_dict([{"column": "value"}])
-    test_table_dict = {"test_table": test_df}
-    test_check_time = "2022-11-03 14:32:22.906020"
     save_processed_tables(
-        s3_with_bucket, "test-bucket", test_table_dict, test_check_time
+        s3_with_bucket,
+        "test-bucket",
+        test_table_dict,
+        test_check_time,
+        {"dim_currency": "test-fingerprint"},
     )
 
-    path_exists_patcher.stop()
-    mkdir_patcher.stop()
-
-    assert os.path.exists(f"{rand_dir}/tmp")
+    for table_name in ["dim_currency", "dim_design"]:
+        key = f"{table_name}/{test_check_time}.parquet"
+        size = s3_with_bucket.head_object(Bucket="test-bucket", Key=key)[
+            "ContentLength"
+        ]
+        assert any(
+            record.getMessage().startswith(f"{key}: {size} bytes, encoded in ")
+            and "s, uploaded in " in record.getMessage()
+            for record in caplog.records
+        )
 
-    os.rmdir(f"{rand_dir}/tmp")
-    os.rmdir(rand_dir)
+    response = s3_with_bucket.head_object(
+        Bucket="test-bucket", Key=f"dim_currency/{test_check_time}.parquet"
+    )
+    assert response["Metadata"] == {"input-fingerprint": "test-fingerprint"}
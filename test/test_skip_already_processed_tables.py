@@ -0,0 +1,120 @@
+from moto import mock_aws
+import pytest, os, boto3, glob
+
+import src.processing_lambda
+from src.processing_lambda import processing_lambda_handler
+
+CHECK_TIME = "2024-11-20 15_22_10.531518"
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        yield s3
+
+
+@pytest.fixture
+def s3_buckets(s3_client, monkeypatch):
+    for bucket_name in ["ingestion-bucket", "processing-bucket"]:
+        s3_client.create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+    for file_path in glob.glob(f"test/test_data/*/{CHECK_TIME}.json"):
+        table_name = file_path.split("/")[-2]
+        s3_client.upload_file(
+            Bucket="ingestion-bucket",
+            Filename=file_path,
+            Key=f"{table_name}/{CHECK_TIME}.json",
+        )
+    monkeypatch.setenv("INGESTION_BUCKET_NAME", "ingestion-bucket")
+    monkeypatch.setenv("PROCESSING_BUCKET_NAME", "processing-bucket")
+    yield s3_client
+
+
+@pytest.fixture
+def written_keys(monkeypatch):
+    keys = []
+    create_s3_client = src.processing_lambda.create_s3_client
+
+    def recording_s3_client():
+        s3_client = create_s3_client()
+        for operation in ["PutObject", "CreateMultipartUpload"]:
+            s3_client.meta.events.register(
+                f"provide-client-params.s3.{operation}",
+                lambda params, **kwargs: keys.append(params["Key"]),
+            )
+        return s3_client
+
+    monkeypatch.setattr(src.processing_lambda, "create_s3_client", recording_s3_client)
+    yield keys
+
+
+def make_event():
+    has_new_rows = {
+        table_name: os.path.exists(f"test/test_data/{table_name}/{CHECK_TIME}.json")
+        for table_name in [
+            "counterparty",
+            "currency",
+            "department",
+            "design",
+            "staff",
+            "sales_order",
+            "address",
+            "payment",
+            "purchase_order",
+            "payment_type",
+            "transaction",
+        ]
+    }
+    return {"HasNewRows": has_new_rows, "LastCheckedTime": CHECK_TIME}
+
+
+def processing_outputs(written_keys):
+    return sorted(key for key in written_keys if not key.startswith("_"))
+
+
+def test_replayed_event_skips_tables_and_returns_same_output(s3_buckets, written_keys):
+    first_output = processing_lambda_handler(make_event(), {})
+    assert processing_outputs(written_keys) == [
+        f"dim_counterparty/{CHECK_TIME}.parquet",
+        f"dim_currency/{CHECK_TIME}.parquet",
+        f"dim_design/{CHECK_TIME}.parquet",
+        f"dim_location/{CHECK_TIME}.parquet",
+        f"dim_staff/{CHECK_TIME}.parquet",
+    ]
+
+    written_keys.clear()
+    second_output = processing_lambda_handler(make_event(), {})
+
+    assert written_keys == []
+    assert second_output == first_output
+
+
+def test_changed_input_rebuilds_only_the_tables_built_from_it(s3_buckets, written_keys):
+    processing_lambda_handler(make_event(), {})
+    s3_buckets.put_object(
+        Bucket="ingestion-bucket",
+        Key=f"currency/{CHECK_TIME}.json",
+        Body=b'[{"currency_id": 1, "currency_code": "GBP", '
+        + b'"created_at": "2022-11-03 14:20:49.962000", '
+        + b'"last_updated": "2022-11-03 14:20:49.962000"}]',
+    )
+
+    written_keys.clear()
+    output = processing_lambda_handler(make_event(), {})
+
+    assert processing_outputs(written_keys) == [f"dim_currency/{CHECK_TIME}.parquet"]
+    assert output["HasNewRows"]["dim_counterparty"] is True
+    assert output["HasNewRows"]["fact_sales_order"] is False
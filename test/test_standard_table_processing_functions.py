@@ -10,6 +10,7 @@ from src.processing_lambda import (
     process_design_updates,
     process_staff_updates,
     process_sales_order_updates,
+    update_latest_rows_snapshot,
 )
 
 
@@ -52,6 +53,7 @@ def test_process_counterparty_updates_returns_expected_dataframe(s3_with_bucket)
     )
     current_check_time = "2024-11-20 15_22_10.531518"
 
+    update_latest_rows_snapshot(s3_with_bucket, "test-bucket", "address")
     dim_counterparty_df = process_counterparty_updates(
         s3_with_bucket, "test-bucket", current_check_time
     )
@@ -150,6 +152,7 @@ def test_process_counterparty_updates_returns_expected_dataframe(s3_with_bucket)
     )
     current_check_time = "2024-11-21 09_38_15.221234"
 
+    update_latest_rows_snapshot(s3_with_bucket, "test-bucket", "address")
     dim_counterparty_df_2 = process_counterparty_updates(
         s3_with_bucket, "test-bucket", current_check_time
     )
@@ -370,6 +373,7 @@ def test_process_staff_updates_returns_expected_dataframe(s3_with_bucket):
     )
     current_check_time = "2024-11-20 15_22_10.531518"
 
+    update_latest_rows_snapshot(s3_with_bucket, "test-bucket", "department")
     dim_staff_df = process_staff_updates(
         s3_with_bucket, "test-bucket", current_check_time
     )
@@ -418,6 +422,7 @@ def test_process_staff_updates_returns_expected_dataframe(s3_with_bucket):
     )
     current_check_time = "2024-11-21 09_38_15.221234"
 
+    update_latest_rows_snapshot(s3_with_bucket, "test-bucket", "department")
     dim_staff_df_2 = process_staff_updates(
         s3_with_bucket, "test-bucket", current_check_time
     )
@@ -0,0 +1,155 @@
+from src.processing_lambda import (
+    update_latest_rows_snapshot,
+    read_latest_rows_snapshot,
+    read_snapshot_source_key,
+    fetch_snapshot_rows,
+)
+import pytest, os, boto3, io
+import pyarrow.parquet as pq
+from moto import mock_aws
+
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    """Mocked AWS Credentials for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        yield s3
+
+
+@pytest.fixture
+def s3_bucket(s3_client):
+    s3_client.create_bucket(
+        Bucket="test_bucket",
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+    )
+    yield s3_client
+
+
+def upload_sales_order_file(s3_client, file_name):
+    s3_client.upload_file(
+        Bucket="test_bucket",
+        Filename=f"test/test_data/sales_order/{file_name}",
+        Key=f"sales_order/{file_name}",
+    )
+
+
+def test_snapshot_is_created_from_all_ingested_files(s3_bucket):
+    upload_sales_order_file(s3_bucket, "2024-11-21 13_32_38.364280.json")
+    upload_sales_order_file(s3_bucket, "2024-11-21 15_47_38.454675.json")
+
+    assert update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order") == 2
+
+    source_key = read_snapshot_source_key(s3_bucket, "test_bucket", "sales_order")
+    assert source_key == "sales_order/2024-11-21 15_47_38.454675.json"
+    snapshot_df = read_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
+    assert snapshot_df["sales_order_id"].is_unique
+    assert len(snapshot_df.index) == 4
+
+
+def test_snapshot_keeps_newest_version_of_each_row(s3_bucket):
+    upload_sales_order_file(s3_bucket, "2024-11-21 13_32_38.364280.json")
+    upload_sales_order_file(s3_bucket, "2024-11-21 16_02_38.340563.json")
+
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
+
+    snapshot_df = read_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
+    row = snapshot_df[snapshot_df["sales_order_id"] == 11283].iloc[0]
+    assert row["last_updated"] == "2024-11-21 15:54:09.995000"
+    assert row["unit_price"] == 2.54
+
+
+def test_snapshot_only_reads_files_ingested_since_last_update(s3_bucket):
+    upload_sales_order_file(s3_bucket, "2024-11-21 13_32_38.364280.json")
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
+
+    # Removing an already folded-in file must not affect the snapshot
+    s3_bucket.delete_object(
+        Bucket="test_bucket", Key="sales_order/2024-11-21 13_32_38.364280.json"
+    )
+    upload_sales_order_file(s3_bucket, "2024-11-21 16_02_38.340563.json")
+
+    assert update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order") == 1
+    assert update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order") == 0
+
+    snapshot_df = read_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
+    assert 11285 in snapshot_df["sales_order_id"].values
+    row = snapshot_df[snapshot_df["sales_order_id"] == 11283].iloc[0]
+    assert row["last_updated"] == "2024-11-21 15:54:09.995000"
+    source_key = read_snapshot_source_key(s3_bucket, "test_bucket", "sales_order")
+    assert source_key == "sales_order/2024-11-21 16_02_38.340563.json"
+
+
+def test_mixed_type_columns_survive_the_snapshot(s3_bucket):
+    upload_sales_order_file(s3_bucket, "2024-11-21 13_32_38.364280.json")
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
+
+    snapshot_df = read_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
+
+    assert "2.03" in snapshot_df["unit_price"].values
+    assert 2.29 in snapshot_df["unit_price"].values
+
+
+def test_table_with_no_ingested_files_returns_empty_dataframe(s3_bucket):
+    output_df = fetch_snapshot_rows(
+        s3_bucket, "test_bucket", "address", "address_id", [1, 2]
+    )
+
+    assert output_df.empty
+    assert read_snapshot_source_key(s3_bucket, "test_bucket", "address") is None
+
+
+def test_lookups_only_read_the_snapshot(s3_bucket):
+    upload_sales_order_file(s3_bucket, "2024-11-21 13_32_38.364280.json")
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "sales_order")
+    upload_sales_order_file(s3_bucket, "2024-11-21 15_47_38.454675.json")
+
+    output_df = fetch_snapshot_rows(
+        s3_bucket, "test_bucket", "sales_order", "sales_order_id", [11283]
+    )
+
+    # The newer file is only folded in by the next refresh
+    assert output_df.loc[0, "last_updated"] == "2024-11-21 13:21:09.941000"
+    assert read_snapshot_source_key(s3_bucket, "test_bucket", "sales_order") == (
+        "sales_order/2024-11-21 13_32_38.364280.json"
+    )
+
+
+def test_reverse_index_returns_latest_rows_referencing_given_ids(s3_bucket):
+    for file_name in [
+        "2024-11-20 15_22_10.531518.json",
+        "2024-11-21 09_38_15.221234.json",
+    ]:
+        s3_bucket.upload_file(
+            Bucket="test_bucket",
+            Filename=f"test/test_data/counterparty/{file_name}",
+            Key=f"counterparty/{file_name}",
+        )
+
+    update_latest_rows_snapshot(s3_bucket, "test_bucket", "counterparty")
+    output_df = fetch_snapshot_rows(
+        s3_bucket, "test_bucket", "counterparty", "legal_address_id", [15, 28]
+    )
+    snapshot_df = read_latest_rows_snapshot(s3_bucket, "test_bucket", "counterparty")
+
+    expected_df = snapshot_df[snapshot_df["legal_address_id"].isin([15, 28])]
+    assert (
+        output_df["counterparty_id"].tolist() == expected_df["counterparty_id"].tolist()
+    )
+
+    # Stored sorted by the index column, read back newest first
+    snapshot_object = s3_bucket.get_object(
+        Bucket="test_bucket", Key="_snapshots/counterparty.parquet"
+    )
+    stored_table = pq.read_table(io.BytesIO(snapshot_object["Body"].read()))
+    assert stored_table.column("legal_address_id").to_pandas().is_monotonic_increasing
+    assert snapshot_df["counterparty_id"].tolist()[:4] == [11, 4, 1, 20]
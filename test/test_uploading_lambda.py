@@ -42,6 +42,50 @@ def test_util_read_parquet_from_s3():
     assert isinstance(output, pd.DataFrame)
 
 
+@mock_aws
+def test_util_read_parquet_file_from_s3_reads_only_requested_ranges(monkeypatch):
+    s3_client = boto3.client("s3")
+    s3_client.create_bucket(
+        Bucket="processing-test-bucket",
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+    )
+    rng = np.random.default_rng(0)
+    test_table = pa.table(
+        {
+            "currency_id": np.arange(100000),
+            "currency_name": rng.integers(0, 2**62, 100000).astype(str),
+        }
+    )
+    buffer = io.BytesIO()
+    pq.write_table(test_table, buffer, row_group_size=10000)
+    put_response = s3_client.put_object(
+        Bucket="processing-test-bucket", Key="test.parquet", Body=buffer.getvalue()
+    )
+
+    fetched_ranges = []
+    get_object = s3_client.get_object
+
+    def recording_get_object(**kwargs):
+        fetched_ranges.append(kwargs["Range"])
+        return get_object(**kwargs)
+
+    monkeypatch.setattr(s3_client, "get_object", recording_get_object)
+    monkeypatch.setattr("src.uploading_lambda.S3_READ_BUFFER_SIZE", 64 * 1024)
+
+    parquet_file, etag = read_parquet_file_from_s3(
+        s3_client, "processing-test-bucket", "test.parquet"
+    )
+    output = parquet_file.read_row_group(3, columns=["currency_id"])
+
+    assert output.column("currency_id").to_pylist() == list(range(30000, 40000))
+    fetched_bytes = 0
+    for fetched_range in fetched_ranges:
+        start, end = fetched_range[len("bytes=") :].split("-")
+        fetched_bytes += int(end) - int(start) + 1
+    assert fetched_bytes < len(buffer.getvalue()) / 4
+    assert etag == put_response["ETag"]
+
+
 def test_util_insert_row_into_data_warehouse():
 
     test_dict = {
@@ -111,6 +155,136 @@ def test_util_updates_row_in_dim_table_if_exists():
     db.close()
 
 
+def test_util_upsert_keeps_last_row_for_repeated_id():
+
+    test_dict = {
+        "currency_id": [1, 2, 1],
+        "currency_code": ["GBP", "USD", "EUR"],
+        "currency_name": ["British pound sterling", "US dollar", "Euro"],
+    }
+    test_df = pd.DataFrame(test_dict)
+    db = connect_to_db()
+    db.run("DROP TABLE IF EXISTS dim_currency;")
+    db.run(
+        "CREATE TABLE IF NOT EXISTS dim_currency (currency_id INT PRIMARY KEY, currency_code VARCHAR, currency_name VARCHAR);"
+    )
+    insert_into_dw(test_df, db, "dim_currency")
+    assert db.run("SELECT * FROM dim_currency ORDER BY currency_id;") == (
+        [1, "EUR", "Euro"],
+        [2, "USD", "US dollar"],
+    )
+    db.close()
+
+
+def test_util_upsert_skips_unchanged_rows():
+
+    test_dict = {
+        "currency_id": [1, 2],
+        "currency_code": ["GBP", "USD"],
+        "currency_name": ["British pound sterling", None],
+    }
+    test_df = pd.DataFrame(test_dict)
+    db = connect_to_db()
+    db.run("DROP TABLE IF EXISTS dim_currency;")
+    db.run(
+        "CREATE TABLE IF NOT EXISTS dim_currency (currency_id INT PRIMARY KEY, currency_code VARCHAR, currency_name VARCHAR);"
+    )
+    assert insert_into_dw(test_df, db, "dim_currency") == {
+        "inserted": 2,
+        "updated": 0,
+        "skipped": 0,
+    }
+    test_dict2 = {
+        "currency_id": [1, 2, 3],
+        "currency_code": ["GBP", "USD", "EUR"],
+        "currency_name": ["British pound sterling", "US dollar", "Euro"],
+    }
+    test_df2 = pd.DataFrame(test_dict2)
+    assert insert_into_dw(test_df2, db, "dim_currency") == {
+        "inserted": 1,
+        "updated": 1,
+        "skipped": 1,
+    }
+    db.close()
+
+
+def test_util_insert_parquet_skips_file_already_in_load_ledger():
+
+    test_dict = {
+        "currency_id": [1, 2],
+        "currency_code": ["GBP", "USD"],
+        "currency_name": ["British pound sterling", "US dollar"],
+    }
+    buffer = io.BytesIO()
+    pd.DataFrame(test_dict).to_parquet(buffer)
+    db = connect_to_db()
+    db.run("DROP TABLE IF EXISTS dim_currency;")
+    db.run("DROP TABLE IF EXISTS load_ledger;")
+    db.run(
+        "CREATE TABLE IF NOT EXISTS dim_currency (currency_id INT PRIMARY KEY, currency_code VARCHAR, currency_name VARCHAR);"
+    )
+    create_load_ledger(db)
+    source = ("dim_currency/test.parquet", '"test-etag"')
+    for expected_counts in [
+        {"inserted": 2, "updated": 0, "skipped": 0, "already_loaded": 0},
+        {"inserted": 0, "updated": 0, "skipped": 0, "already_loaded": 2},
+    ]:
+        parquet_file = pq.ParquetFile(io.BytesIO(buffer.getvalue()))
+        assert (
+            insert_parquet_into_dw(parquet_file, db, "dim_currency", source=source)
+            == expected_counts
+        )
+    assert db.run("SELECT table_name, source_key, etag, rows FROM load_ledger;") == (
+        ["dim_currency", "dim_currency/test.parquet", '"test-etag"', 2],
+    )
+    db.close()
+
+
+def test_util_df_to_copy_csv_distinguishes_nulls_from_empty_strings():
+    test_df = pd.DataFrame(
+        {
+            "location_id": [1, 2],
+            "address_line_2": [None, ""],
+            "district": ['Quoted "district", with comma', "Line\nbreak"],
+        }
+    )
+
+    output = df_to_copy_csv(test_df).read().decode("utf-8")
+
+    assert output == (
+        '1,\\N,"Quoted ""district"", with comma"\n' + '2,,"Line\nbreak"\n'
+    )
+
+
+def test_util_encode_binary_copy_frames_rows_and_nulls():
+    batch = pa.record_batch({"id": [1, None], "name": [None, "ab"]})
+
+    output = b"".join(encode_binary_copy([batch], [(23, -1), (1043, -1)]))
+
+    assert output == (
+        b"PGCOPY\n\xff\r\n\x00"
+        + bytes(8)
+        + b"\x00\x02\x00\x00\x00\x04\x00\x00\x00\x01\xff\xff\xff\xff"
+        + b"\x00\x02\xff\xff\xff\xff\x00\x00\x00\x02ab"
+        + b"\xff\xff"
+    )
+
+
+def test_util_binary_encoders_write_postgres_binary_formats():
+    numeric_typmod = (10 << 16 | 2) + 4
+
+    date_cells, _ = encode_dates(pa.array(["2000-01-02"]), -1)
+    time_cells, _ = encode_times(pa.array(["00:00:01.5"]), -1)
+    numeric_cells, _ = encode_numerics(pa.array([-1234.5]), numeric_typmod)
+
+    assert date_cells.tobytes() == b"\x00\x00\x00\x04\x00\x00\x00\x01"
+    assert time_cells.tobytes() == b"\x00\x00\x00\x08" + (1500000).to_bytes(8, "big")
+    # three base-10000 digits (0, 1234, 5000), weight 1, negative, scale 2
+    assert numeric_cells.tobytes() == b"\x00\x00\x00\x0e" + b"".join(
+        value.to_bytes(2, "big") for value in [3, 1, 0x4000, 2, 0, 1234, 5000]
+    )
+
+
 """test below was updating the actual datawarehouse, DO NOT re-run otherwise will duplicate rows in fact_sales_order table"""
 # def test_uploading_lambda_insert():
 
@@ -0,0 +1,89 @@
+import io
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import src.processing_lambda
+from src.processing_lambda import load_parquet_options, write_processed_parquet
+
+
+@pytest.fixture
+def parquet_options(monkeypatch):
+    options = load_parquet_options("""
+        {
+            "default": {"compression": "snappy"},
+            "tables": {
+                "fact_sales_order": {
+                    "compression": "zstd",
+                    "compression_level": 9,
+                    "row_group_size": 2,
+                    "use_dictionary": ["currency_code"],
+                    "write_statistics": ["created_date"],
+                    "sort_by": ["created_date"]
+                }
+            }
+        }
+        """)
+    monkeypatch.setattr(src.processing_lambda, "PARQUET_OPTIONS", options)
+
+
+def make_sales_order_df():
+    return pd.DataFrame(
+        {
+            "sales_order_id": [1, 2, 3, 4, 5],
+            "created_date": [
+                "2024-11-03",
+                "2024-11-01",
+                "2024-11-02",
+                "2024-11-01",
+                "2024-11-03",
+            ],
+            "currency_code": ["GBP", "USD", "GBP", "GBP", "EUR"],
+        }
+    )
+
+
+def test_write_processed_parquet_applies_table_options(parquet_options):
+    buffer = io.BytesIO()
+    write_processed_parquet(make_sales_order_df(), buffer, "fact_sales_order")
+
+    metadata = pq.ParquetFile(io.BytesIO(buffer.getvalue())).metadata
+    assert metadata.num_row_groups == 3
+    columns = {
+        metadata.row_group(0).column(i).path_in_schema: metadata.row_group(0).column(i)
+        for i in range(metadata.num_columns)
+    }
+    assert columns["created_date"].compression == "ZSTD"
+    assert columns["created_date"].statistics.min == "2024-11-01"
+    assert columns["created_date"].statistics.max == "2024-11-01"
+    assert columns["sales_order_id"].statistics is None
+    assert "RLE_DICTIONARY" in columns["currency_code"].encodings
+    assert "RLE_DICTIONARY" not in columns["created_date"].encodings
+
+
+def test_write_processed_parquet_sorts_rows_and_keeps_a_plain_index(
+    parquet_options,
+):
+    buffer = io.BytesIO()
+    write_processed_parquet(make_sales_order_df(), buffer, "fact_sales_order")
+
+    df = pd.read_parquet(io.BytesIO(buffer.getvalue()))
+    assert df["sales_order_id"].tolist() == [2, 4, 3, 1, 5]
+    assert df.index.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_write_processed_parquet_uses_default_options_for_other_tables(
+    parquet_options,
+):
+    buffer = io.BytesIO()
+    write_processed_parquet(make_sales_order_df(), buffer, "dim_currency")
+
+    parquet_file = pq.ParquetFile(io.BytesIO(buffer.getvalue()))
+    assert parquet_file.metadata.num_row_groups == 1
+    assert parquet_file.metadata.row_group(0).column(0).compression == "SNAPPY"
+    assert parquet_file.read().column("sales_order_id").to_pylist() == [1, 2, 3, 4, 5]
+
+
+def test_load_parquet_options_rejects_unknown_options():
+    with pytest.raises(ValueError, match="compresion"):
+        load_parquet_options('{"tables": {"dim_staff": {"compresion": "zstd"}}}')